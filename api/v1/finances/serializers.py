@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from finances.models import Budget, Expense, FinancialReport
+from rest_framework.reverse import reverse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from finances.models import Budget, Expense, ExportJob, FinancialReport
+from finances.timeseries import BUCKETS, GROUPS
 
 class BudgetSerializer(serializers.ModelSerializer):
     total_expenses = serializers.ReadOnlyField()
@@ -28,4 +31,45 @@ class FinancialReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = FinancialReport
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at', 'balance']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'updated_at', 'balance']
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.ReadOnlyField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'model_label', 'export_format', 'filters', 'since', 'status', 'progress',
+            'total_rows', 'processed_rows', 'error', 'download_url', 'watermark',
+            'created_at', 'started_at', 'completed_at',
+        ]
+        read_only_fields = [
+            'id', 'status', 'total_rows', 'processed_rows', 'error', 'watermark',
+            'created_at', 'started_at', 'completed_at',
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        return reverse('exportjob-download', kwargs={'pk': obj.pk}, request=self.context.get('request'))
+
+    def validate(self, attrs):
+        job = ExportJob(**attrs)
+        try:
+            job.clean()
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.message_dict)
+        return attrs
+
+class TimeseriesQuerySerializer(serializers.Serializer):
+    bucket = serializers.ChoiceField(choices=list(BUCKETS), default='month')
+    group_by = serializers.ChoiceField(choices=list(GROUPS), default='budget')
+    project = serializers.ListField(child=serializers.UUIDField(), required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'end': 'End must not be before start'})
+        return attrs
@@ -1,12 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from finances.views import financial_dashboard
 from . import views
 
 router = DefaultRouter()
 router.register(r'budgets', views.BudgetViewSet)
 router.register(r'expenses', views.ExpenseViewSet)
 router.register(r'financial-reports', views.FinancialReportViewSet)
+router.register(r'export-jobs', views.ExportJobViewSet)
 
 urlpatterns = [
+    path('dashboard/', financial_dashboard, name='financial-dashboard'),
+    path('timeseries/', views.spend_timeseries_view, name='financial-timeseries'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,9 +1,17 @@
-from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+import os
+from django.db import transaction
+from django.http import FileResponse
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from finances.models import Budget, Expense, FinancialReport
-from .serializers import BudgetSerializer, ExpenseSerializer, FinancialReportSerializer
+from finances.models import Budget, Expense, ExportJob, FinancialReport
+from finances.dashboard import dashboard_scope
+from finances.tasks import export_financial_data_async
+from finances.timeseries import spend_timeseries
+from .serializers import (
+    BudgetSerializer, ExpenseSerializer, ExportJobSerializer, FinancialReportSerializer, TimeseriesQuerySerializer
+)
 
 class BudgetViewSet(viewsets.ModelViewSet):
     queryset = Budget.objects.all()
@@ -27,7 +35,7 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     serializer_class = ExpenseSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['budget', 'status', 'payment_method', 'expense_date']
+    filterset_fields = ['budget', 'status', 'payment_method', 'date']
     
     def get_queryset(self):
         return Expense.objects.select_related('budget__project', 'approved_by')
@@ -53,4 +61,47 @@ class FinancialReportViewSet(viewsets.ModelViewSet):
     filterset_fields = ['project', 'report_period', 'is_finalized']
     
     def get_queryset(self):
-        return FinancialReport.objects.select_related('project', 'prepared_by')
\ No newline at end of file
+        return FinancialReport.objects.select_related('project', 'prepared_by')
+
+class ExportJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Submit background exports, poll their progress and download the result"""
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(requested_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(requested_by=request.user)
+        # Queue only once the job row is visible to the worker
+        transaction.on_commit(lambda: export_financial_data_async.delay(str(job.pk)))
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'completed' or not job.file:
+            return Response(
+                {'error': 'Export is not ready', 'status': job.status, 'progress': job.progress},
+                status=status.HTTP_409_CONFLICT
+            )
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=os.path.basename(job.file.name))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def spend_timeseries_view(request):
+    """Cumulative spend against allocation per bucket, as columnar arrays"""
+    query = TimeseriesQuerySerializer(data={
+        **request.query_params.dict(), 'project': request.query_params.getlist('project')
+    })
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+    projects, _ = dashboard_scope(request.user, params.get('project'))
+    return Response(spend_timeseries(
+        bucket=params['bucket'], group_by=params['group_by'], projects=projects,
+        start=params.get('start'), end=params.get('end'),
+    ))
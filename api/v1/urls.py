@@ -1,7 +1,8 @@
 from django.urls import path, include
 
 urlpatterns = [
+    path('', include('core.api.urls')),
     path('finances/', include('api.v1.finances.urls')),
-    path('projects/', include('projects.api.urls')),
     path('farmers/', include('farmers.api.urls')),
+    path('sales/', include('sales.api.urls')),
 ]
\ No newline at end of file
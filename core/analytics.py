@@ -1,53 +1,66 @@
-import pandas as pd
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.cache import cache
 from django.db.models import Count, Sum, Avg, Q, F, Max
 from django.utils import timezone
 
 class AnalyticsEngine:
-    '''Engine for automated metrics computation and analytics'''
+    '''Engine for automated metrics computation and analytics
+
+    Every table is read with a single aggregate query using conditional
+    aggregates (``Count(filter=Q(...))``) rather than one query per figure.
+    The project and expense totals are shared by the project and financial
+    sections, so a full dashboard summary costs a fixed number of queries.
+    '''
 
     @staticmethod
-    def get_project_metrics():
-        '''Get comprehensive project metrics'''
+    def aggregate_projects():
+        '''All project-level figures in one scan of the projects table'''
         from projects.models import Project
-        from finances.models import Expense
 
-        total_projects = Project.objects.count()
-        active_projects = Project.objects.filter(status='active').count()
-        completed_projects = Project.objects.filter(status='completed').count()
-
-        # Budget metrics
-        budget_metrics = Project.objects.aggregate(
+        return Project.objects.aggregate(
+            total_projects=Count('id'),
+            active_projects=Count('id', filter=Q(status='active')),
+            completed_projects=Count('id', filter=Q(status='completed')),
             total_budget=Sum('budget'),
             avg_budget=Avg('budget'),
-            max_budget=Max('budget')
-        )
-
-        # Progress metrics
-        progress_metrics = Project.objects.aggregate(
+            max_budget=Max('budget'),
             avg_progress=Avg('progress'),
             on_track=Count('id', filter=Q(progress__gte=75)),
-            behind=Count('id', filter=Q(progress__lt=50))
+            behind=Count('id', filter=Q(progress__lt=50)),
         )
 
-        # Financial metrics - use safe aggregation
-        total_expenses = Expense.objects.aggregate(total=Sum('amount'))
-        total_expenses_value = total_expenses['total'] or 0 if total_expenses else 0
+    @staticmethod
+    def aggregate_expenses():
+        '''Expense total and count in one scan of the expenses table'''
+        from finances.models import Expense
+
+        return Expense.objects.aggregate(total=Sum('amount'), count=Count('id'))
+
+    @staticmethod
+    def get_project_metrics(projects=None, expenses=None):
+        '''Get comprehensive project metrics'''
+        if projects is None:
+            projects = AnalyticsEngine.aggregate_projects()
+        if expenses is None:
+            expenses = AnalyticsEngine.aggregate_expenses()
 
-        budget_utilization = (total_expenses_value / budget_metrics['total_budget'] * 100) if budget_metrics['total_budget'] else 0
+        total_budget = projects['total_budget'] or 0
+        total_expenses = expenses['total'] or 0
+        budget_utilization = (total_expenses / total_budget * 100) if total_budget else 0
 
         return {
-            'total_projects': total_projects,
-            'active_projects': active_projects,
-            'completed_projects': completed_projects,
-            'total_budget': float(budget_metrics['total_budget'] or 0),
-            'average_budget': float(budget_metrics['avg_budget'] or 0),
-            'average_progress': float(progress_metrics['avg_progress'] or 0),
-            'projects_on_track': progress_metrics['on_track'],
-            'projects_behind': progress_metrics['behind'],
-            'total_expenses': float(total_expenses_value),
+            'total_projects': projects['total_projects'],
+            'active_projects': projects['active_projects'],
+            'completed_projects': projects['completed_projects'],
+            'total_budget': float(total_budget),
+            'average_budget': float(projects['avg_budget'] or 0),
+            'average_progress': float(projects['avg_progress'] or 0),
+            'projects_on_track': projects['on_track'],
+            'projects_behind': projects['behind'],
+            'total_expenses': float(total_expenses),
             'budget_utilization_rate': float(budget_utilization),
-            'remaining_budget': float((budget_metrics['total_budget'] or 0) - total_expenses_value)
+            'remaining_budget': float(total_budget - total_expenses)
         }
 
     @staticmethod
@@ -55,67 +68,65 @@ class AnalyticsEngine:
         '''Get comprehensive farmer metrics'''
         from farmers.models import Farmer, Household, FarmPlot
 
-        total_farmers = Farmer.objects.count()
-        total_households = Household.objects.count()
-        total_farm_plots = FarmPlot.objects.count()
-
-        # Gender distribution - use safe query
-        gender_stats = Farmer.objects.values('gender').annotate(count=Count('id'))
-        gender_distribution = {stat['gender']: stat['count'] for stat in gender_stats}
-
-        # Age analysis - use safe queries
-        farmers_with_age = Farmer.objects.exclude(date_of_birth__isnull=True)
-        age_stats = farmers_with_age.aggregate(
-            young_farmers=Count('id', filter=Q(date_of_birth__gte=timezone.now() - timedelta(days=365*35))),
-            experienced_farmers=Count('id', filter=Q(date_of_birth__lt=timezone.now() - timedelta(days=365*35)))
+        # Farmers younger than 35 were born after this date
+        young_cutoff = timezone.now().date() - timedelta(days=365*35)
+        genders = [value for value, label in Farmer.GENDER_CHOICES]
+        gender_counts = {f'gender_{value}': Count('id', filter=Q(gender=value)) for value in genders}
+        # Blank or legacy values outside the choices are still counted
+        gender_counts['gender_unknown'] = Count('id', filter=~Q(gender__in=genders))
+        farmer_stats = Farmer.objects.aggregate(
+            total_farmers=Count('id'),
+            young_farmers=Count('id', filter=Q(date_of_birth__gte=young_cutoff)),
+            experienced_farmers=Count('id', filter=Q(date_of_birth__lt=young_cutoff)),
+            **gender_counts
         )
+        gender_distribution = {
+            value: farmer_stats[f'gender_{value}']
+            for value in genders + ['unknown']
+            if farmer_stats[f'gender_{value}']
+        }
 
-        # Farm size analysis
         farm_size_stats = FarmPlot.objects.aggregate(
+            total_farm_plots=Count('id'),
             total_land=Sum('size_acres'),
             avg_farm_size=Avg('size_acres'),
             largest_farm=Max('size_acres')
         )
 
         return {
-            'total_farmers': total_farmers,
-            'total_households': total_households,
-            'total_farm_plots': total_farm_plots,
+            'total_farmers': farmer_stats['total_farmers'],
+            'total_households': Household.objects.count(),
+            'total_farm_plots': farm_size_stats['total_farm_plots'],
             'gender_distribution': gender_distribution,
             'average_farm_size': float(farm_size_stats['avg_farm_size'] or 0),
             'total_land_area': float(farm_size_stats['total_land'] or 0),
-            'young_farmers': age_stats['young_farmers'],
-            'experienced_farmers': age_stats['experienced_farmers']
+            'young_farmers': farmer_stats['young_farmers'],
+            'experienced_farmers': farmer_stats['experienced_farmers']
         }
 
     @staticmethod
-    def get_financial_metrics():
-        '''Get comprehensive financial metrics - completely safe version'''
-        from finances.models import Expense
-        from projects.models import Project
-
-        # Budget vs Actuals - use safe aggregation
-        total_budget = Project.objects.aggregate(total=Sum('budget'))
-        total_budget_value = total_budget['total'] or 0 if total_budget else 0
+    def get_financial_metrics(projects=None, expenses=None):
+        '''Get comprehensive financial metrics'''
+        if projects is None:
+            projects = AnalyticsEngine.aggregate_projects()
+        if expenses is None:
+            expenses = AnalyticsEngine.aggregate_expenses()
 
-        total_expenses = Expense.objects.aggregate(total=Sum('amount'))
-        total_expenses_value = total_expenses['total'] or 0 if total_expenses else 0
+        total_budget = projects['total_budget'] or 0
+        total_expenses = expenses['total'] or 0
 
         # Skip category analysis entirely to avoid database errors
         expense_by_category = []
         monthly_expenses = []
 
-        # Count expenses safely
-        total_expenses_count = Expense.objects.count()
-
         return {
-            'total_budget': float(total_budget_value),
-            'total_expenses': float(total_expenses_value),
-            'budget_variance': float(total_budget_value - total_expenses_value),
-            'utilization_rate': (total_expenses_value / total_budget_value * 100) if total_budget_value else 0,
+            'total_budget': float(total_budget),
+            'total_expenses': float(total_expenses),
+            'budget_variance': float(total_budget - total_expenses),
+            'utilization_rate': float(total_expenses / total_budget * 100) if total_budget else 0,
             'expense_by_category': expense_by_category,
             'monthly_trends': monthly_expenses,
-            'total_expenses_count': total_expenses_count
+            'total_expenses_count': expenses['count']
         }
 
     @staticmethod
@@ -123,19 +134,24 @@ class AnalyticsEngine:
         '''Get performance indicator metrics'''
         from indicators.models import PerformanceIndicator
 
-        indicators = PerformanceIndicator.objects.all()
+        indicators = PerformanceIndicator.objects.values(
+            'project__name', 'category', 'measurement_date', 'current_value', 'target_value'
+        )
+        categories = dict(PerformanceIndicator.CATEGORY_CHOICES)
         indicator_data = {}
 
         for indicator in indicators:
-            current_value = indicator.current_value or 0
-            target_value = indicator.target_value or 1
+            current_value = indicator['current_value'] or 0
+            target_value = indicator['target_value'] or 1
             achievement_rate = (current_value / target_value * 100) if target_value else 0
 
-            indicator_data[indicator.name] = {
+            # Same label as PerformanceIndicator.__str__, without loading the project per row
+            name = f"{indicator['project__name']} - {indicator['category']} ({indicator['measurement_date']})"
+            indicator_data[name] = {
                 'current_value': float(current_value),
                 'target_value': float(target_value),
                 'achievement_rate': float(achievement_rate),
-                'unit': indicator.unit,
+                'category': categories.get(indicator['category'], indicator['category']),
                 'status': 'Achieved' if achievement_rate >= 100 else 'In Progress'
             }
 
@@ -145,20 +161,118 @@ class AnalyticsEngine:
     def get_dashboard_summary():
         '''Get complete dashboard summary'''
         try:
+            projects = AnalyticsEngine.aggregate_projects()
+            expenses = AnalyticsEngine.aggregate_expenses()
             return {
-                'projects': AnalyticsEngine.get_project_metrics(),
+                'projects': AnalyticsEngine.get_project_metrics(projects, expenses),
                 'farmers': AnalyticsEngine.get_farmer_metrics(),
-                'finances': AnalyticsEngine.get_financial_metrics(),
+                'finances': AnalyticsEngine.get_financial_metrics(projects, expenses),
                 'performance_indicators': AnalyticsEngine.get_performance_indicators(),
                 'last_updated': timezone.now().isoformat()
             }
         except Exception as e:
-            # Return basic metrics even if there are errors
-            return {
-                'projects': {'total_projects': 0, 'active_projects': 0, 'completed_projects': 0, 'total_budget': 0},
-                'farmers': {'total_farmers': 0, 'total_households': 0, 'total_farm_plots': 0},
-                'finances': {'total_budget': 0, 'total_expenses': 0, 'total_expenses_count': 0},
-                'performance_indicators': {},
-                'last_updated': timezone.now().isoformat(),
-                'error': 'Some metrics unavailable due to database configuration'
-            }
+            return AnalyticsEngine.get_unavailable_summary()
+
+    @staticmethod
+    def get_cached_dashboard_summary():
+        '''Dashboard summary assembled from the per-section cache'''
+        try:
+            entries = {section: get_dashboard_section(section) for section in DASHBOARD_SECTIONS}
+        except Exception as e:
+            return AnalyticsEngine.get_unavailable_summary()
+        summary = {section: entry['value'] for section, entry in entries.items()}
+        # Report the age of the oldest section rather than the time of this request
+        oldest = min(entry['computed_at'] for entry in entries.values())
+        summary['last_updated'] = datetime.fromtimestamp(oldest, tz=dt_timezone.utc).isoformat()
+        return summary
+
+    @staticmethod
+    def get_unavailable_summary():
+        '''Basic metrics returned when the real ones cannot be computed'''
+        return {
+            'projects': {'total_projects': 0, 'active_projects': 0, 'completed_projects': 0, 'total_budget': 0},
+            'farmers': {'total_farmers': 0, 'total_households': 0, 'total_farm_plots': 0},
+            'finances': {'total_budget': 0, 'total_expenses': 0, 'total_expenses_count': 0},
+            'performance_indicators': {},
+            'last_updated': timezone.now().isoformat(),
+            'error': 'Some metrics unavailable due to database configuration'
+        }
+
+
+# Dashboard summary cache
+#
+# Each section is cached on its own so a change to one table only recomputes
+# the sections that read it. A section is fresh for DASHBOARD_CACHE_TTL
+# seconds. Once it expires or is invalidated it is still served, for up to
+# DASHBOARD_CACHE_STALE_TTL more seconds, while a single background task
+# recomputes it (stale-while-revalidate), so readers never wait on the
+# aggregation unless the section is missing altogether.
+DASHBOARD_CACHE_TTL = 60
+DASHBOARD_CACHE_STALE_TTL = 60 * 10
+DASHBOARD_REFRESH_LOCK_TTL = 60
+
+DASHBOARD_SECTIONS = {
+    'projects': AnalyticsEngine.get_project_metrics,
+    'farmers': AnalyticsEngine.get_farmer_metrics,
+    'finances': AnalyticsEngine.get_financial_metrics,
+    'performance_indicators': AnalyticsEngine.get_performance_indicators,
+}
+
+# Sections that read each model, invalidated by core.signals when it changes
+DASHBOARD_SECTION_DEPENDENCIES = {
+    'projects.Project': ['projects', 'finances', 'performance_indicators'],
+    'finances.Expense': ['projects', 'finances'],
+    'farmers.Farmer': ['farmers'],
+    'farmers.Household': ['farmers'],
+    'farmers.FarmPlot': ['farmers'],
+    'indicators.PerformanceIndicator': ['performance_indicators'],
+}
+
+
+def dashboard_cache_key(section):
+    return f'dashboard:{section}'
+
+
+def compute_dashboard_section(section):
+    '''Recompute a section and cache it as fresh'''
+    key = dashboard_cache_key(section)
+    # Cleared before computing, so an invalidation that lands mid-computation survives
+    cache.delete(f'{key}:stale')
+    entry = {'value': DASHBOARD_SECTIONS[section](), 'computed_at': time.time()}
+    cache.set(key, entry, DASHBOARD_CACHE_TTL + DASHBOARD_CACHE_STALE_TTL)
+    return entry
+
+
+def refresh_dashboard_section(section):
+    '''Recompute a stale section and release its refresh lock'''
+    try:
+        compute_dashboard_section(section)
+    finally:
+        cache.delete(f'{dashboard_cache_key(section)}:refreshing')
+
+
+def get_dashboard_section(section):
+    '''A cached section entry ({'value', 'computed_at'}), refreshed in the background when stale'''
+    key = dashboard_cache_key(section)
+    cached = cache.get_many([key, f'{key}:stale'])
+    entry = cached.get(key)
+    if entry is None:
+        return compute_dashboard_section(section)
+
+    expired = time.time() - entry['computed_at'] > DASHBOARD_CACHE_TTL
+    if (expired or cached.get(f'{key}:stale')) and cache.add(f'{key}:refreshing', True, DASHBOARD_REFRESH_LOCK_TTL):
+        from .tasks import refresh_dashboard_section_task
+        try:
+            refresh_dashboard_section_task.delay(section)
+        except Exception:
+            # No broker: keep serving the stale entry; the lock expiring allows another attempt
+            pass
+    return entry
+
+
+def invalidate_dashboard_sections(*sections):
+    '''Mark sections stale; readers get the old value until the refresh completes'''
+    cache.set_many(
+        {f'{dashboard_cache_key(section)}:stale': True for section in sections},
+        DASHBOARD_CACHE_TTL + DASHBOARD_CACHE_STALE_TTL
+    )
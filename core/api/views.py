@@ -1,18 +1,23 @@
+import logging
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import IsAuthenticated
 from core.analytics import AnalyticsEngine
 
+logger = logging.getLogger(__name__)
+
 @api_view(['GET'])
-@permission_classes([AllowAny])
+@permission_classes([IsAuthenticated])
 def dashboard_metrics(request):
     'Get comprehensive dashboard metrics'
     try:
-        metrics = AnalyticsEngine.get_dashboard_summary()
+        metrics = AnalyticsEngine.get_cached_dashboard_summary()
         return Response(metrics)
-    except Exception as e:
+    except Exception:
+        # The exception text can name tables and queries, so it is logged rather than returned
+        logger.exception('Dashboard metrics failed')
         return Response(
-            {'error': str(e)},
+            {'error': 'Dashboard metrics are unavailable'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .signals import connect_dashboard_invalidation, connect_deletion_tracking
+        connect_deletion_tracking()
+        connect_dashboard_invalidation()
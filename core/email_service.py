@@ -1,4 +1,4 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
@@ -52,31 +52,38 @@ def send_expense_approved_notification(expense):
         fail_silently=False,
     )
 
+def budget_alert_message(budget, threshold, utilization):
+    """Budget alert email for the budget's creator, or None when there is no one to notify"""
+    if budget.created_by is None or not budget.created_by.email:
+        return None
+    subject = f"Budget Alert: {budget.budget_type} - {budget.project.name}"
+
+    context = {
+        'budget': budget,
+        'utilization': utilization,
+        'threshold': threshold,
+        'project': budget.project,
+    }
+
+    html_message = render_to_string('emails/budget_alert.html', context)
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=strip_tags(html_message),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[budget.created_by.email],
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+def send_budget_alert_notifications(alerts):
+    """Send (budget, threshold, utilization) alerts over one mail connection; returns the number sent"""
+    messages = [message for message in (budget_alert_message(*alert) for alert in alerts) if message]
+    if not messages:
+        return 0
+    return get_connection(fail_silently=False).send_messages(messages)
+
 def send_budget_alert_notification(budget, threshold=80):
     """Send notification when budget utilization exceeds threshold"""
-    utilization = budget.utilization_percentage
-    
+    utilization = budget.utilization_rate
     if utilization >= threshold:
-        subject = f"Budget Alert: {budget.budget_type} - {budget.project.name}"
-        
-        context = {
-            'budget': budget,
-            'utilization': utilization,
-            'threshold': threshold,
-            'project': budget.project,
-        }
-        
-        html_message = render_to_string('emails/budget_alert.html', context)
-        plain_message = strip_tags(html_message)
-        
-        # Notify project manager and finance officers
-        recipients = [budget.created_by.email]
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipients,
-            html_message=html_message,
-            fail_silently=False,
-        )
\ No newline at end of file
+        send_budget_alert_notifications([(budget, threshold, utilization)])
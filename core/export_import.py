@@ -1,79 +1,747 @@
 import csv
-import pandas as pd
-from django.http import HttpResponse
-from io import StringIO, BytesIO
+import tempfile
+import uuid
+from itertools import chain, islice
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.core.exceptions import BadRequest, FieldDoesNotExist
+from django.db.models import Aggregate, Count, ExpressionWrapper, F, FloatField, Manager, Model, OuterRef, Subquery, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Coalesce, NullIf
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from openpyxl import Workbook
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
+
+# Rows fetched per database round trip and written per streamed chunk
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Excel limits worksheet titles to 31 characters
+EXCEL_SHEET_TITLE_LENGTH = 31
+
+# PDF table layout, in points
+PDF_MARGIN = 36
+PDF_LINE_HEIGHT = 14
+PDF_FONT_SIZE = 8
+
+# Response header carrying the watermark to pass as ``since`` on the next delta export
+WATERMARK_HEADER = 'X-Export-Watermark'
+
+# A row's updated_at is set before its transaction commits, so a row committed
+# after a watermark can carry an earlier timestamp. Delta exports reach back this
+# far before ``since``; consumers dedupe the overlap by ID.
+DELTA_COMMIT_LAG = timedelta(minutes=5)
+
+# Models outside ExportableModel whose views serve delta exports, so their
+# deletions need tombstones too (see core.signals)
+DELTA_EXPORT_MODELS = [
+    'farmer_engagement.CBOGroup',
+    'farmer_engagement.CBOMeeting',
+    'farmer_engagement.FarmerAttendance',
+]
+
+# Codec for Parquet pages and Arrow IPC buffers
+COLUMNAR_COMPRESSION = 'zstd'
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': XLSX_CONTENT_TYPE,
+    'pdf': 'application/pdf',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+
+def format_datetime(value):
+    '''Render a datetime the way all exports show timestamps'''
+    return value.strftime('%Y-%m-%d %H:%M')
+
+
+def format_percent(value):
+    '''Render a percentage with one decimal place'''
+    return f'{value:.1f}%'
+
+
+def percentage_of(numerator, denominator):
+    '''Annotation for numerator / denominator as a percentage, 0 when the denominator is 0'''
+    return Coalesce(
+        ExpressionWrapper(numerator * Value(100.0) / NullIf(denominator, 0), output_field=FloatField()),
+        Value(0.0),
+    )
+
+
+def resolve_field_path(obj, path):
+    '''Follow a Django-style "a__b__c" path from obj, returning None on a missing link
+
+    A to-many relation on the path yields the comma-separated values of every
+    related object, read from the prefetch cache set up by plan_queryset.
+    '''
+    value = obj
+    parts = path.split(LOOKUP_SEP)
+    for index, part in enumerate(parts):
+        if value is None:
+            return None
+        value = getattr(value, part)
+        if isinstance(value, Manager):
+            rest = LOOKUP_SEP.join(parts[index + 1:])
+            items = [resolve_field_path(item, rest) if rest else item for item in value.all()]
+            return ', '.join(str(item) for item in items if item is not None)
+        if callable(value):
+            value = value()
+    return value
+
+
+class ExportColumn:
+    """A single export column: the header and where each row's value comes from.
+
+    ``source`` is one of:
+
+    * a field path in Django lookup syntax (``'household__location__name'``);
+      the relations it crosses are joined or prefetched by plan_queryset
+    * an expression such as ``Count('projects')`` or ``Sum('expenses__amount')``,
+      computed in the export query as an annotation
+    * a callable that receives the row object, for values the database cannot
+      produce (it must not issue queries of its own)
+
+    ``formatter`` is applied to non-empty values before they are written.
+    """
+
+    def __init__(self, header, source, formatter=None):
+        self.header = header
+        self.source = source
+        self.formatter = formatter
+        self.alias = None
+
+    @property
+    def is_annotation(self):
+        return hasattr(self.source, 'resolve_expression')
+
+    def raw_value(self, obj):
+        '''The value before formatting, as typed columnar formats store it'''
+        if isinstance(obj, DeletedRow):
+            return obj.values.get(self.alias)
+        if self.is_annotation:
+            return getattr(obj, self.alias)
+        if callable(self.source):
+            return self.source(obj)
+        return resolve_field_path(obj, self.source)
+
+    def value(self, obj):
+        value = self.raw_value(obj)
+        if value is not None and self.formatter is not None:
+            value = self.formatter(value)
+        return value
+
+
+def normalize_columns(columns):
+    '''Accept ExportColumn instances or (header, source[, formatter]) tuples'''
+    normalized = []
+    for index, column in enumerate(columns):
+        if isinstance(column, ExportColumn):
+            column = ExportColumn(column.header, column.source, column.formatter)
+        else:
+            column = ExportColumn(*column)
+        column.alias = f'export_column_{index}'
+        normalized.append(column)
+    return normalized
+
+
+class DeletedRow:
+    '''A row deleted since the last delta export: only its key and change type are known'''
+
+    def __init__(self, values):
+        self.values = values
+
+
+def parse_since(value):
+    '''Parse a ``since`` watermark; timestamps without an offset are taken as UTC'''
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        raise BadRequest(f'Invalid since timestamp "{value}"')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    return since
+
+
+def export_since(request):
+    '''The ``since`` watermark of an export request, or None for a full export'''
+    return parse_since(request.GET.get('since'))
+
+
+def format_watermark(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def delta_columns(model, columns):
+    '''Prefix export columns with the row key and change type a delta consumer needs'''
+    return [ExportColumn('ID', model._meta.pk.name), ExportColumn('Change', Value('changed'))] + list(columns)
+
+
+def plan_delta(queryset, columns, since, until):
+    '''Restrict an export to rows changed in (since - DELTA_COMMIT_LAG, until] and list the rows deleted in it
+
+    ``columns`` are the normalized output of delta_columns(); deleted rows
+    carry only the ID and Change columns. Returns (queryset, deleted rows).
+    '''
+    from core.models import DeletedRecord
+
+    model = queryset.model
+    try:
+        model._meta.get_field('updated_at')
+    except FieldDoesNotExist:
+        raise BadRequest(f'{model._meta.label} does not support delta exports')
+    queryset = queryset.filter(updated_at__gt=since - DELTA_COMMIT_LAG, updated_at__lte=until)
+
+    id_column, change_column = columns[:2]
+    deleted = DeletedRecord.objects.filter(
+        model_label=model._meta.label, deleted_at__gt=since - DELTA_COMMIT_LAG, deleted_at__lte=until
+    ).order_by('deleted_at').values_list('object_id', flat=True)
+    rows = (
+        DeletedRow({id_column.alias: model._meta.pk.to_python(object_id), change_column.alias: 'deleted'})
+        for object_id in deleted.iterator()
+    )
+    return queryset, rows
+
+
+def prepare_export(queryset, columns, since=None, until=None):
+    '''Normalize and plan an export, narrowing it to a delta when ``since`` is given
+
+    Returns (queryset, columns, deleted rows to append after the queryset).
+    '''
+    deleted = ()
+    if since is None:
+        columns = normalize_columns(columns)
+    else:
+        columns = normalize_columns(delta_columns(queryset.model, columns))
+        queryset, deleted = plan_delta(queryset, columns, since, until or timezone.now())
+    return plan_queryset(queryset, columns), columns, deleted
+
+
+def relation_paths(model, path):
+    '''Split the relations a field path crosses into (select_related, prefetch_related) paths'''
+    opts = model._meta
+    joined = []
+    for part in path.split(LOOKUP_SEP):
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        joined.append(part)
+        if field.many_to_many or field.one_to_many:
+            return (LOOKUP_SEP.join(joined[:-1]) or None), LOOKUP_SEP.join(joined)
+        opts = field.related_model._meta
+    return (LOOKUP_SEP.join(joined) or None), None
+
+
+def aggregate_subquery(model, aggregate):
+    '''Rewrite an aggregate over a to-many relation as a correlated subquery
+
+    Annotating several aggregates over different relations with plain joins
+    multiplies rows; a subquery per aggregate keeps each one exact while the
+    export still runs as a single query.
+    '''
+    source = aggregate.source_expressions[0] if len(aggregate.source_expressions) == 1 else None
+    if aggregate.filter is not None or not isinstance(source, F):
+        return aggregate
+    first, _, rest = source.name.partition(LOOKUP_SEP)
+    try:
+        field = model._meta.get_field(first)
+    except FieldDoesNotExist:
+        return aggregate
+    if not (field.is_relation and (field.many_to_many or field.one_to_many)):
+        return aggregate
+
+    remote = field.field.name if field.auto_created else field.related_query_name()
+    inner = type(aggregate)(rest or 'pk', distinct=aggregate.distinct)
+    related = field.related_model._default_manager.filter(**{remote: OuterRef('pk')})
+    related = related.order_by().values(remote).annotate(value=inner).values('value')
+    output_field = related.query.annotations['value'].output_field
+    default = 0 if isinstance(aggregate, Count) else aggregate.default
+    subquery = Subquery(related, output_field=output_field)
+    if default is None:
+        return subquery
+    return Coalesce(subquery, Value(default), output_field=output_field)
+
+
+def rewrite_aggregates(model, expression):
+    '''Replace every to-many aggregate inside an annotation expression with a subquery'''
+    if isinstance(expression, Aggregate):
+        return aggregate_subquery(model, expression)
+    if not hasattr(expression, 'get_source_expressions'):
+        return expression
+    expression = expression.copy()
+    expression.set_source_expressions([
+        rewrite_aggregates(model, source) if source is not None else None
+        for source in expression.get_source_expressions()
+    ])
+    return expression
+
+
+def plan_queryset(queryset, columns):
+    '''Add the joins, prefetches and annotations the columns need
+
+    Forward foreign keys on a field path become select_related, to-many
+    relations become prefetch_related and expression columns are annotated,
+    so an export costs a fixed number of queries however many rows it has.
+    '''
+    select, prefetch, annotations = set(), set(), {}
+    for column in columns:
+        if column.is_annotation:
+            annotations[column.alias] = rewrite_aggregates(queryset.model, column.source)
+        elif isinstance(column.source, str):
+            joined, many = relation_paths(queryset.model, column.source)
+            if joined:
+                select.add(joined)
+            if many:
+                prefetch.add(many)
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*sorted(prefetch))
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    return queryset
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer that hands each written row back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE, progress=None, deleted=()):
+    '''Read a queryset with a server-side iterator, reporting the row count after every chunk
+
+    Rows for deleted objects (delta exports) follow the queryset rows.
+    '''
+    count = 0
+    for obj in chain(queryset.iterator(chunk_size=chunk_size), deleted):
+        yield obj
+        count += 1
+        if progress is not None and count % chunk_size == 0:
+            progress(count)
+    if progress is not None and count % chunk_size:
+        progress(count)
+
+
+def iter_csv(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE, progress=None, deleted=()):
+    '''Yield CSV text in chunks of rows, reading the queryset with a server-side iterator'''
+    writer = csv.writer(Echo())
+    yield writer.writerow([column.header for column in columns])
+
+    buffer = []
+    for obj in iter_rows(queryset, chunk_size, progress, deleted):
+        buffer.append(writer.writerow([column.value(obj) for column in columns]))
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_csv(queryset, columns, filename, chunk_size=EXPORT_CHUNK_SIZE, since=None):
+    '''Stream a queryset as a CSV download without materialising it in memory
+
+    With ``since`` only rows changed after that time are written, followed by
+    the rows deleted since then (see plan_delta).
+    '''
+    until = timezone.now()
+    queryset, columns, deleted = prepare_export(queryset, columns, since, until)
+    response = StreamingHttpResponse(iter_csv(queryset, columns, chunk_size, deleted=deleted), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response[WATERMARK_HEADER] = format_watermark(until)
+    return response
+
+
+def excel_value(value):
+    '''Convert a resolved column value into something openpyxl can store in a cell'''
+    if value is None or isinstance(value, (str, int, float, Decimal)):
+        return value
+    if isinstance(value, datetime):
+        # Excel has no notion of time zones
+        return timezone.make_naive(value) if timezone.is_aware(value) else value
+    if hasattr(value, 'isoformat'):
+        return value
+    return str(value)
+
+
+def write_csv(queryset, columns, fileobj, title=None, chunk_size=EXPORT_CHUNK_SIZE, progress=None, deleted=()):
+    '''Write a queryset into a binary file as UTF-8 CSV, a chunk of rows at a time'''
+    for chunk in iter_csv(queryset, columns, chunk_size, progress, deleted):
+        fileobj.write(chunk.encode('utf-8'))
+
+
+def write_xlsx(queryset, columns, fileobj, title, chunk_size=EXPORT_CHUNK_SIZE, progress=None, deleted=()):
+    '''Write a queryset into fileobj as a write-only workbook, one row at a time'''
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:EXCEL_SHEET_TITLE_LENGTH])
+    sheet.append([column.header for column in columns])
+    for obj in iter_rows(queryset, chunk_size, progress, deleted):
+        sheet.append([excel_value(column.value(obj)) for column in columns])
+    workbook.save(fileobj)
+
+
+def write_pdf(queryset, columns, fileobj, title, chunk_size=EXPORT_CHUNK_SIZE, progress=None, deleted=()):
+    '''Write a queryset into fileobj as a paginated PDF table, drawing rows as they are read'''
+    page_width, page_height = landscape(A4)
+    column_width = (page_width - 2 * PDF_MARGIN) / len(columns)
+    # Rough character budget per cell for Helvetica at the table font size
+    max_chars = max(int(column_width / (PDF_FONT_SIZE * 0.55)), 1)
+    pdf = canvas.Canvas(fileobj, pagesize=(page_width, page_height), pageCompression=1)
+    pdf.setTitle(title)
+
+    def draw_row(y, values):
+        for index, value in enumerate(values):
+            text = '' if value is None else str(value)
+            pdf.drawString(PDF_MARGIN + index * column_width, y, text[:max_chars])
+
+    def start_page():
+        y = page_height - PDF_MARGIN
+        pdf.setFont('Helvetica-Bold', 12)
+        pdf.drawString(PDF_MARGIN, y, title)
+        y -= 2 * PDF_LINE_HEIGHT
+        pdf.setFont('Helvetica-Bold', PDF_FONT_SIZE)
+        draw_row(y, [column.header for column in columns])
+        pdf.setFont('Helvetica', PDF_FONT_SIZE)
+        return y - PDF_LINE_HEIGHT
+
+    y = start_page()
+    for obj in iter_rows(queryset, chunk_size, progress, deleted):
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            y = start_page()
+        draw_row(y, [column.value(obj) for column in columns])
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+
+
+def column_field(queryset, column):
+    '''The model field holding a column's values, or None when they need the row object
+
+    Field paths across forward relations resolve to the final field (a foreign
+    key resolves to the key it stores, unless a formatter renders the related
+    object); annotations resolve to their output field. Properties, methods,
+    callables and to-many paths return None.
+    '''
+    if column.is_annotation:
+        return queryset.query.annotations[column.alias].output_field
+    if not isinstance(column.source, str):
+        return None
+    opts = queryset.model._meta
+    parts = column.source.split(LOOKUP_SEP)
+    for index, part in enumerate(parts):
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if field.many_to_many or field.one_to_many or (field.is_relation and not field.concrete):
+            return None
+        if index == len(parts) - 1:
+            if not field.is_relation:
+                return field
+            return field.target_field if column.formatter is None else None
+        if not field.is_relation:
+            return None
+        opts = field.related_model._meta
+    return None
+
+
+def arrow_type(field):
+    '''Arrow type for a Django model field; text for anything without a closer match'''
+    import pyarrow as pa
+
+    if field is None:
+        return pa.string()
+    internal_type = field.get_internal_type()
+    if internal_type == 'DecimalField':
+        if field.max_digits is None or field.decimal_places is None:
+            return pa.decimal128(38, 10)
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if internal_type.endswith('IntegerField') or internal_type.endswith('AutoField'):
+        return pa.int64()
+    if internal_type == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    types = {
+        'FloatField': pa.float64(),
+        'BooleanField': pa.bool_(),
+        'DateField': pa.date32(),
+        'TimeField': pa.time64('us'),
+        'DurationField': pa.duration('us'),
+        'UUIDField': pa.uuid(),
+    }
+    return types.get(internal_type, pa.string())
+
+
+def arrow_array(values, arrow_type):
+    '''Build one column of a record batch, coercing values to the column type'''
+    import pyarrow as pa
+
+    if pa.types.is_string(arrow_type):
+        values = [None if value is None else str(value) for value in values]
+    elif pa.types.is_decimal(arrow_type):
+        # Computed decimals can carry more places than the column declares
+        exponent = Decimal(1).scaleb(-arrow_type.scale)
+        values = [None if value is None else Decimal(value).quantize(exponent) for value in values]
+    return pa.array(values, type=arrow_type)
+
+
+def infer_arrow_type(values):
+    '''Arrow type for a computed column, inferred from its first chunk of values'''
+    import pyarrow as pa
+
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, bool):
+        return pa.bool_()
+    if isinstance(sample, int):
+        return pa.int64()
+    if isinstance(sample, float):
+        return pa.float64()
+    if isinstance(sample, Decimal):
+        scale = max(-value.as_tuple().exponent for value in values if isinstance(value, Decimal))
+        return pa.decimal128(38, max(scale, 0))
+    if isinstance(sample, datetime):
+        return pa.timestamp('us', tz='UTC' if timezone.is_aware(sample) else None)
+    if isinstance(sample, date):
+        return pa.date32()
+    if isinstance(sample, uuid.UUID):
+        return pa.uuid()
+    return pa.string()
+
+
+def iter_record_batches(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE, progress=None, deleted=()):
+    '''Yield record batches of chunk_size rows, all sharing one schema
+
+    When every column maps to a field or annotation the rows are read with
+    values_list(), skipping model instantiation entirely; otherwise they are
+    read as objects. Column types come from the model fields, or are inferred
+    from the first chunk for computed columns. Formatters are not applied -
+    columnar exports keep typed values so consumers do not parse them back.
+    '''
+    import pyarrow as pa
+
+    fields = [column_field(queryset, column) for column in columns]
+    if all(field is not None for field in fields):
+        sources = [column.alias if column.is_annotation else column.source for column in columns]
+        rows = chain(
+            queryset.values_list(*sources).iterator(chunk_size=chunk_size),
+            ([row.values.get(column.alias) for column in columns] for row in deleted),
+        )
+    else:
+        def typed_values(obj):
+            values = []
+            for column, field in zip(columns, fields):
+                value = column.raw_value(obj)
+                if field is not None and isinstance(value, Model):
+                    # A foreign key path: store the key, as values_list() would
+                    value = getattr(value, field.attname)
+                values.append(value)
+            return values
+
+        rows = (typed_values(obj) for obj in chain(queryset.iterator(chunk_size=chunk_size), deleted))
+
+    schema = None
+    count = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk and count:
+            break
+        values = list(zip(*chunk)) if chunk else [() for _ in columns]
+        if schema is None:
+            schema = pa.schema([
+                pa.field(column.header, arrow_type(field) if field is not None else infer_arrow_type(column_values))
+                for column, field, column_values in zip(columns, fields, values)
+            ])
+        arrays = [arrow_array(column_values, field.type) for column_values, field in zip(values, schema)]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+        count += len(chunk)
+        if progress is not None and chunk:
+            progress(count)
+        if len(chunk) < chunk_size:
+            break
+
+
+def write_parquet(queryset, columns, fileobj, title=None, chunk_size=EXPORT_CHUNK_SIZE, progress=None, deleted=()):
+    '''Write a queryset into fileobj as a compressed Parquet file, one row group per chunk'''
+    import pyarrow.parquet as pq
+
+    writer = None
+    for batch in iter_record_batches(queryset, columns, chunk_size, progress, deleted):
+        if writer is None:
+            writer = pq.ParquetWriter(fileobj, batch.schema, compression=COLUMNAR_COMPRESSION)
+        writer.write_batch(batch)
+    writer.close()
+
+
+def write_arrow(queryset, columns, fileobj, title=None, chunk_size=EXPORT_CHUNK_SIZE, progress=None, deleted=()):
+    '''Write a queryset into fileobj as a compressed Arrow IPC file, one record batch per chunk'''
+    import pyarrow as pa
+
+    writer = None
+    for batch in iter_record_batches(queryset, columns, chunk_size, progress, deleted):
+        if writer is None:
+            options = pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION)
+            writer = pa.ipc.new_file(fileobj, batch.schema, options=options)
+        writer.write_batch(batch)
+    writer.close()
+
+
+EXPORT_WRITERS = {
+    'csv': write_csv,
+    'xlsx': write_xlsx,
+    'pdf': write_pdf,
+    'parquet': write_parquet,
+    'arrow': write_arrow,
+}
+
+
+def write_export(export_format, queryset, columns, fileobj, title, chunk_size=EXPORT_CHUNK_SIZE,
+                 progress=None, since=None, until=None):
+    '''Plan the queryset for the columns and write it to fileobj in the given format
+
+    ``progress`` is called with the number of rows written after every chunk,
+    which lets background jobs report how far along they are. ``since`` and
+    ``until`` turn the export into a delta (see prepare_export).
+    '''
+    queryset, columns, deleted = prepare_export(queryset, columns, since, until)
+    EXPORT_WRITERS[export_format](queryset, columns, fileobj, title, chunk_size, progress, deleted)
+
+
+def export_response(export_format, queryset, columns, filename, title, chunk_size=EXPORT_CHUNK_SIZE, since=None):
+    '''Build a download in a temporary file and stream it back
+
+    The writers keep at most one chunk of rows in memory and the finished
+    file is served from disk, so memory stays flat however many rows are
+    exported. The temporary file is removed once the response closes.
+    '''
+    until = timezone.now()
+    output = tempfile.TemporaryFile(suffix=f'.{export_format}')
+    try:
+        write_export(export_format, queryset, columns, output, title, chunk_size, since=since, until=until)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    response = FileResponse(
+        output, as_attachment=True, filename=filename,
+        content_type=EXPORT_CONTENT_TYPES[export_format]
+    )
+    response[WATERMARK_HEADER] = format_watermark(until)
+    return response
+
+
+def xlsx_response(queryset, columns, filename, sheet_title, chunk_size=EXPORT_CHUNK_SIZE, since=None):
+    '''Excel download built with a write-only workbook'''
+    return export_response('xlsx', queryset, columns, filename, sheet_title, chunk_size, since)
+
+
+def parquet_response(queryset, columns, filename, chunk_size=EXPORT_CHUNK_SIZE, since=None):
+    '''Typed, compressed Parquet download for analytics consumers'''
+    return export_response('parquet', queryset, columns, filename, None, chunk_size, since)
+
 
 class ExportableModel:
-    """Base class for models that can be exported - provides the interface"""
-    
-    @classmethod
-    def export_to_csv(cls, queryset=None):
-        """Base CSV export method - should be overridden by models"""
-        raise NotImplementedError("Models must implement export_to_csv method")
-    
-    @classmethod
-    def export_to_excel(cls, queryset=None):
-        """Base Excel export method - should be overridden by models"""
-        raise NotImplementedError("Models must implement export_to_excel method")
+    """Base class for models that can be exported - provides the interface
 
-class AutoExportMixin(ExportableModel):
-    """Mixin for automatic field-based export (uses all model fields)"""
-    
-    def to_csv_row(self):
-        '''Convert model instance to CSV row using all fields'''
-        return [str(getattr(self, field.name)) for field in self._meta.fields]
+    Models describe their export with ``export_columns`` (see ExportColumn) and
+    optionally ``export_filename``; the CSV and Excel exports are then
+    streamed for them. Passing ``since`` exports only what changed after that
+    time, with tombstone rows for deleted objects.
+    """
+
+    export_columns = None
+    export_filename = None
 
     @classmethod
-    def get_csv_headers(cls):
-        '''Get CSV headers from model fields'''
-        return [field.verbose_name or field.name for field in cls._meta.fields]
+    def get_export_columns(cls):
+        if cls.export_columns is None:
+            raise NotImplementedError("Models must declare export_columns")
+        return normalize_columns(cls.export_columns)
 
     @classmethod
-    def export_to_csv(cls, queryset=None):
-        '''Export model data to CSV using all fields'''
-        if queryset is None:
-            queryset = cls.objects.all()
+    def get_export_filename(cls):
+        return cls.export_filename or f'{cls._meta.model_name}s'
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{cls._meta.model_name}s.csv"'
+    @classmethod
+    def get_export_queryset(cls):
+        '''Queryset exported when the caller does not pass one'''
+        return cls.objects.all()
 
-        writer = csv.writer(response)
-        writer.writerow(cls.get_csv_headers())
+    @classmethod
+    def export_to_csv(cls, queryset=None, since=None):
+        '''Stream model data to CSV using the declared export columns'''
+        if queryset is None:
+            queryset = cls.get_export_queryset()
+        return stream_csv(queryset, cls.get_export_columns(), f'{cls.get_export_filename()}.csv', since=since)
 
-        for obj in queryset:
-            writer.writerow(obj.to_csv_row())
+    @classmethod
+    def get_export_title(cls):
+        '''Title used for Excel sheets and PDF headings'''
+        return str(cls._meta.verbose_name_plural).title()
 
-        return response
+    @classmethod
+    def export_to_excel(cls, queryset=None, since=None):
+        '''Export model data to an Excel workbook using the declared export columns'''
+        if queryset is None:
+            queryset = cls.get_export_queryset()
+        return xlsx_response(
+            queryset, cls.get_export_columns(),
+            f'{cls.get_export_filename()}.xlsx', cls.get_export_title(), since=since
+        )
 
     @classmethod
-    def export_to_excel(cls, queryset=None):
-        '''Export model data to Excel using all fields'''
+    def export_to_parquet(cls, queryset=None, since=None):
+        '''Export model data to a typed Parquet file using the declared export columns'''
         if queryset is None:
-            queryset = cls.objects.all()
+            queryset = cls.get_export_queryset()
+        return parquet_response(
+            queryset, cls.get_export_columns(), f'{cls.get_export_filename()}.parquet', since=since
+        )
 
-        data = []
-        data.append(cls.get_csv_headers())
+    @classmethod
+    def write_export(cls, export_format, fileobj, queryset=None, progress=None, since=None, until=None):
+        '''Write an export in any supported format to a binary file (used by background export jobs)'''
+        if queryset is None:
+            queryset = cls.get_export_queryset()
+        write_export(
+            export_format, queryset, cls.get_export_columns(), fileobj,
+            cls.get_export_title(), progress=progress, since=since, until=until
+        )
 
-        for obj in queryset:
-            data.append(obj.to_csv_row())
+class AutoExportMixin(ExportableModel):
+    """Mixin for automatic field-based export (uses all model fields)"""
 
-        df = pd.DataFrame(data[1:], columns=data[0])
+    def to_csv_row(self):
+        '''Convert model instance to CSV row using all fields'''
+        return [str(getattr(self, field.name)) for field in self._meta.fields]
 
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=cls._meta.verbose_name_plural[:31], index=False)
+    @classmethod
+    def get_csv_headers(cls):
+        '''Get CSV headers from model fields'''
+        return [field.verbose_name or field.name for field in cls._meta.fields]
 
-        response = HttpResponse(
-            output.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{cls._meta.model_name}s.xlsx"'
-        return response
+    @classmethod
+    def get_export_columns(cls):
+        '''Declared export columns if present, otherwise one column per model field'''
+        if cls.export_columns is not None:
+            return super().get_export_columns()
+        return [
+            ExportColumn(field.verbose_name or field.name, field.name, str)
+            for field in cls._meta.fields
+        ]
 
 class CustomExportMixin(ExportableModel):
-    """Mixin for models that implement their own custom export methods"""
-    
-    # This mixin doesn't implement export methods - models must provide their own
+    """Mixin for models that declare their own export columns"""
+
+    # This mixin doesn't add behaviour - models provide export_columns.
     # It serves as a marker and provides the ExportableModel interface
     pass
 
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.rollups import ROLLUPS, refresh_rollups
+
+class Command(BaseCommand):
+    help = 'Refresh the daily rollup tables read by the dashboards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rollups', nargs='*', help=f'Rollups to refresh: {", ".join(ROLLUPS)} (default: all)')
+        parser.add_argument('--full', action='store_true', help='Rebuild every day instead of only the changed ones')
+
+    def handle(self, *args, **options):
+        unknown = set(options['rollups']) - set(ROLLUPS)
+        if unknown:
+            raise CommandError(f'Unknown rollups: {", ".join(sorted(unknown))}')
+
+        written = refresh_rollups(options['rollups'], full=options['full'])
+        for name, rows in written.items():
+            self.stdout.write(self.style.SUCCESS(f'{name}: {rows} rollup rows written'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100)),
+                ('object_id', models.CharField(max_length=64)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-deleted_at'],
+                'indexes': [models.Index(fields=['model_label', 'deleted_at'], name='core_delete_model_l_e2dc16_idx')],
+            },
+        ),
+    ]
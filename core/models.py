@@ -32,3 +32,34 @@ class AuditModel(TimeStampedModel, AutoExportMixin):
 
     class Meta:
         abstract = True
+
+class DeletedRecord(models.Model):
+    '''Tombstone left when an exportable object is deleted, reported by delta exports'''
+    model_label = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.model_label} {self.object_id}'
+
+    class Meta:
+        ordering = ['-deleted_at']
+        indexes = [
+            models.Index(fields=['model_label', 'deleted_at']),
+        ]
+
+class RollupState(models.Model):
+    '''When a daily rollup table (see core.rollups) was last refreshed'''
+    name = models.CharField(max_length=50, unique=True)
+    refreshed_at = models.DateTimeField(help_text='Source rows changed before this time are rolled up')
+
+    def __str__(self):
+        return f'{self.name} @ {self.refreshed_at}'
+
+class NumberSequence(models.Model):
+    '''Last number allocated in a document number sequence, such as one day's sale numbers (see core.sequences)'''
+    key = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.key}: {self.last_value}'
@@ -0,0 +1,152 @@
+'''Daily rollup tables
+
+Dashboards that aggregate raw transaction tables over "last 30 days" windows
+read pre-aggregated per-day fact tables instead. Each rollup is rebuilt day by
+day from its source table by the refresh_rollups command (and the beat task in
+core.tasks): an incremental refresh recomputes only the days holding rows
+changed since the previous run, plus a short trailing window. Readers check
+rollup_is_fresh() and fall back to the source table when a rollup has not been
+refreshed recently.
+'''
+from datetime import timedelta
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# Rollups refreshed longer ago than this are ignored by readers
+ROLLUP_MAX_AGE = timedelta(hours=2)
+
+# Days always recomputed by an incremental refresh. Catches deletions without
+# a tombstone and edits that move a row out of its old day; the nightly full
+# rebuild corrects anything older.
+ROLLUP_TRAILING_DAYS = 2
+
+
+class Rollup:
+    '''Per-day aggregate of a source model, stored in a rollup model
+
+    ``dimensions`` maps rollup fields to the source fields grouped on and
+    ``measures`` maps rollup fields to the aggregates computed per group.
+    ``filters`` is a Q restricting the rows aggregated, e.g. paid sales only.
+    '''
+
+    def __init__(self, name, model_label, source_label, date_field, dimensions, measures, filters=None):
+        self.name = name
+        self.model_label = model_label
+        self.source_label = source_label
+        self.date_field = date_field
+        self.dimensions = dimensions
+        self.measures = measures
+        self.filters = filters or Q()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def source(self):
+        return apps.get_model(self.source_label)
+
+    def source_queryset(self):
+        '''Every source row annotated with the day it is rolled up into'''
+        field = self.source._meta.get_field(self.date_field)
+        day = TruncDate(self.date_field) if isinstance(field, models.DateTimeField) else F(self.date_field)
+        return self.source.objects.annotate(day=day)
+
+    def changed_days(self, since):
+        '''Days holding source rows created or updated after since'''
+        # Unfiltered, so a row leaving the filter (e.g. a cancelled sale) still marks its day
+        changed = self.source_queryset().filter(updated_at__gt=since)
+        return set(changed.values_list('day', flat=True).distinct())
+
+    def rebuild(self, days=None):
+        '''Recompute the rollup rows for days, or for every day when None; returns rows written'''
+        rows = self.source_queryset().filter(self.filters)
+        existing = self.model.objects.all()
+        if days is not None:
+            rows = rows.filter(day__in=days)
+            existing = existing.filter(day__in=days)
+
+        rows = rows.values('day', *self.dimensions.values()).annotate(**self.measures).order_by()
+        objects = [
+            self.model(
+                day=row['day'],
+                **{field: row[source] for field, source in self.dimensions.items()},
+                **{field: row[field] for field in self.measures}
+            )
+            for row in rows
+        ]
+        # Readers never see a day half rebuilt
+        with transaction.atomic():
+            existing.delete()
+            self.model.objects.bulk_create(objects, batch_size=1000)
+        return len(objects)
+
+
+ROLLUPS = {
+    rollup.name: rollup for rollup in [
+        Rollup(
+            'sales', 'sales.DailySalesRollup', 'sales.Sale', 'sale_date',
+            dimensions={'location_id': 'sale_location_id', 'channel': 'sales_channel'},
+            measures={'sales_count': Count('id'), 'revenue': Sum('final_amount')},
+            filters=Q(status='paid'),
+        ),
+        Rollup(
+            'purchases', 'sales.DailyPurchaseRollup', 'sales.Purchase', 'purchase_date',
+            dimensions={},
+            measures={'purchases_count': Count('id'), 'purchase_amount': Sum('total_amount')},
+            filters=Q(status='received'),
+        ),
+        Rollup(
+            'expenses', 'finances.DailyExpenseRollup', 'finances.Expense', 'date',
+            dimensions={'budget_id': 'budget_id', 'category': 'category'},
+            measures={'expenses_count': Count('id'), 'expenses_total': Sum('amount')},
+            # finances.budgets.UTILIZED_EXPENSES: rejected expenses are not spend
+            filters=~Q(status='rejected'),
+        ),
+        Rollup(
+            'attendance', 'farmer_engagement.DailyAttendanceRollup', 'farmer_engagement.CBOMeeting', 'meeting_date',
+            dimensions={'cbo_group_id': 'cbo_group_id'},
+            measures={
+                'meetings_count': Count('id'),
+                'expected_attendance': Sum('expected_attendance'),
+                'actual_attendance': Sum('actual_attendance'),
+            },
+        ),
+    ]
+}
+
+
+def refresh_rollup(rollup, full=False):
+    '''Bring a rollup up to date; returns the number of rollup rows written'''
+    from .models import DeletedRecord, RollupState
+
+    # Taken before reading, so rows changed during the rebuild are picked up next time
+    started = timezone.now()
+    state = RollupState.objects.filter(name=rollup.name).first()
+    days = None
+    if not full and state is not None:
+        deleted = DeletedRecord.objects.filter(model_label=rollup.source_label, deleted_at__gt=state.refreshed_at)
+        # A tombstone does not say which day the row was on, so rebuild everything
+        if not deleted.exists():
+            today = timezone.localdate(started)
+            days = rollup.changed_days(state.refreshed_at)
+            days.update(today - timedelta(days=n) for n in range(ROLLUP_TRAILING_DAYS))
+
+    written = rollup.rebuild(days)
+    RollupState.objects.update_or_create(name=rollup.name, defaults={'refreshed_at': started})
+    return written
+
+
+def refresh_rollups(names=None, full=False):
+    '''Refresh the named rollups (all by default); returns rows written per rollup'''
+    return {name: refresh_rollup(ROLLUPS[name], full=full) for name in (names or ROLLUPS)}
+
+
+def rollup_is_fresh(name):
+    '''Whether readers should use the rollup rather than its source table'''
+    from .models import RollupState
+
+    return RollupState.objects.filter(name=name, refreshed_at__gte=timezone.now() - ROLLUP_MAX_AGE).exists()
@@ -0,0 +1,47 @@
+'''
+Document number allocation
+
+Numbers such as SALE-20250101-0001 come from a NumberSequence row per prefix
+and day. Allocating a block is a single UPDATE ... SET last_value =
+last_value + n, so the row stays locked until the surrounding transaction
+ends and concurrent writers queue behind it instead of reading the same
+maximum and colliding. A rolled back transaction releases its numbers.
+'''
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import NumberSequence
+
+
+def allocate_numbers(key, count=1, initial=None):
+    '''Reserve `count` consecutive numbers in a sequence; returns the first
+
+    `initial` is called once, when the sequence is created, for the last
+    number already in use.
+    '''
+    sequence = NumberSequence.objects.filter(key=key)
+    with transaction.atomic():
+        if not sequence.update(last_value=F('last_value') + count):
+            try:
+                with transaction.atomic():
+                    NumberSequence.objects.create(key=key, last_value=(initial() if initial else 0) + count)
+            except IntegrityError:
+                # Created by a concurrent writer in the meantime
+                sequence.update(last_value=F('last_value') + count)
+        last = sequence.values_list('last_value', flat=True).get()
+    return last - count + 1
+
+
+def last_used_number(model, field, prefix):
+    '''Highest number already stored on model.field under prefix, e.g. 12 for SALE-20250101-0012'''
+    last = (model.objects.filter(**{f'{field}__startswith': f'{prefix}-'})
+            .order_by(f'-{field}').values_list(field, flat=True).first())
+    return int(last.rsplit('-', 1)[-1]) if last else 0
+
+
+def document_numbers(model, field, prefix, count=1):
+    '''`count` new numbers for model.field of the form PREFIX-YYYYMMDD-NNNN, today's date'''
+    day_prefix = f"{prefix}-{timezone.now().strftime('%Y%m%d')}"
+    first = allocate_numbers(day_prefix, count, initial=lambda: last_used_number(model, field, day_prefix))
+    return [f'{day_prefix}-{number:04d}' for number in range(first, first + count)]
@@ -0,0 +1,38 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from .analytics import DASHBOARD_SECTION_DEPENDENCIES, invalidate_dashboard_sections
+from .export_import import DELTA_EXPORT_MODELS, ExportableModel
+from .rollups import ROLLUPS
+from .models import DeletedRecord
+
+
+def record_deletion(sender, instance, **kwargs):
+    """Leave a tombstone so delta exports can report the deleted row"""
+    DeletedRecord.objects.create(model_label=sender._meta.label, object_id=str(instance.pk))
+
+
+def connect_deletion_tracking():
+    """Track deletions of every model with a delta export or a rollup
+
+    Receivers are connected per model rather than for all senders, so other
+    models keep Django's fast bulk delete path.
+    """
+    tracked = set(DELTA_EXPORT_MODELS) | {rollup.source_label for rollup in ROLLUPS.values()}
+    for model in apps.get_models():
+        if issubclass(model, ExportableModel) or model._meta.label in tracked:
+            post_delete.connect(record_deletion, sender=model, dispatch_uid=f'export_tombstone_{model._meta.label}')
+
+
+def invalidate_dashboard(sender, **kwargs):
+    """Mark the dashboard sections that read this model as stale once the write commits"""
+    sections = DASHBOARD_SECTION_DEPENDENCIES[sender._meta.label]
+    transaction.on_commit(lambda: invalidate_dashboard_sections(*sections))
+
+
+def connect_dashboard_invalidation():
+    """Invalidate cached dashboard sections when the models behind them change"""
+    for label in DASHBOARD_SECTION_DEPENDENCIES:
+        model = apps.get_model(label)
+        post_save.connect(invalidate_dashboard, sender=model, dispatch_uid=f'dashboard_save_{label}')
+        post_delete.connect(invalidate_dashboard, sender=model, dispatch_uid=f'dashboard_delete_{label}')
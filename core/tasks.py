@@ -0,0 +1,13 @@
+from celery import shared_task
+from .analytics import refresh_dashboard_section
+from .rollups import refresh_rollups
+
+@shared_task
+def refresh_dashboard_section_task(section):
+    """Recompute a stale dashboard section in the background"""
+    refresh_dashboard_section(section)
+
+@shared_task
+def refresh_rollups_task(full=False):
+    """Keep the daily rollup tables current (scheduled by celery beat)"""
+    return refresh_rollups(full=full)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmer_engagement', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('meetings_count', models.PositiveIntegerField(default=0)),
+                ('expected_attendance', models.IntegerField(default=0)),
+                ('actual_attendance', models.IntegerField(default=0)),
+                ('cbo_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='farmer_engagement.cbogroup')),
+            ],
+            options={
+                'db_table': 'farmer_engagement_daily_attendance',
+                'indexes': [models.Index(fields=['day', 'cbo_group'], name='farmer_enga_day_532b79_idx')],
+            },
+        ),
+    ]
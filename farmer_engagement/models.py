@@ -344,6 +344,23 @@ class CBOMeeting(TimeStampedModel):
     def is_ongoing(self):
         return self.status == 'ongoing'
 
+class DailyAttendanceRollup(models.Model):
+    """Meetings and attendance per day and CBO group, maintained by core.rollups"""
+    day = models.DateField()
+    cbo_group = models.ForeignKey(CBOGroup, on_delete=models.CASCADE, related_name='+')
+    meetings_count = models.PositiveIntegerField(default=0)
+    expected_attendance = models.IntegerField(default=0)
+    actual_attendance = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'farmer_engagement_daily_attendance'
+        indexes = [
+            models.Index(fields=['day', 'cbo_group']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.cbo_group_id}: {self.meetings_count} meetings"
+
 class FarmerAttendance(TimeStampedModel):
     """Detailed farmer attendance tracking with digital check-in"""
     
@@ -20,6 +20,7 @@ urlpatterns = [
     
     # Attendance - WORKING
     path('attendance/export/', views.export_attendance, name='export_attendance'),
+    path('attendance/export/parquet/', views.export_attendance_parquet, name='export_attendance_parquet'),
     
     # Reports - WORKING
     path('reports/attendance/', views.AttendanceReport.as_view(), name='attendance_report'),
@@ -1,5 +1,4 @@
 # farmer_engagement/views.py
-import csv
 import json
 from django.http import HttpResponse, JsonResponse
 from django.views.generic import ListView, DetailView, CreateView, TemplateView
@@ -10,7 +9,9 @@ from django.db.models import Count, Avg, Sum
 from django.contrib import messages
 from datetime import datetime, timedelta
 
-from .models import CBOGroup, CBOMeeting, FarmerAttendance, CBOTraining
+from core.export_import import export_since, format_datetime, format_percent, parquet_response, stream_csv
+from core.rollups import rollup_is_fresh
+from .models import CBOGroup, CBOMeeting, DailyAttendanceRollup, FarmerAttendance, CBOTraining
 from staff_performance.models import StaffMember
 
 class FarmerEngagementDashboard(LoginRequiredMixin, TemplateView):
@@ -23,16 +24,27 @@ class FarmerEngagementDashboard(LoginRequiredMixin, TemplateView):
         # Key statistics
         total_cbo_groups = CBOGroup.objects.filter(status='active').count()
         total_farmers = CBOGroup.objects.aggregate(total=Sum('total_members'))['total'] or 0
-        total_meetings = CBOMeeting.objects.count()
+
+        # Meeting totals and attendance rate, from the daily rollup when it is fresh
+        if rollup_is_fresh('attendance'):
+            meeting_totals = DailyAttendanceRollup.objects.aggregate(
+                total_meetings=Sum('meetings_count'),
+                expected=Sum('expected_attendance'),
+                actual=Sum('actual_attendance'),
+            )
+        else:
+            meeting_totals = CBOMeeting.objects.aggregate(
+                total_meetings=Count('id'),
+                expected=Sum('expected_attendance'),
+                actual=Sum('actual_attendance'),
+            )
+        total_meetings = meeting_totals['total_meetings'] or 0
+        expected = meeting_totals['expected'] or 0
+        avg_attendance_rate = (meeting_totals['actual'] or 0) / expected * 100 if expected else 0
         
         # Recent meetings
         recent_meetings = CBOMeeting.objects.select_related('cbo_group', 'facilitator__user').order_by('-meeting_date')[:5]
         
-        # Attendance rates
-        avg_attendance_rate = CBOMeeting.objects.aggregate(
-            avg_rate=Avg('actual_attendance') / Avg('expected_attendance') * 100
-        )['avg_rate'] or 0
-        
         # Staff engagement stats
         staff_engagement = StaffMember.objects.annotate(
             meetings_facilitated=Count('facilitated_meetings'),
@@ -105,33 +117,44 @@ class EngagementReport(LoginRequiredMixin, TemplateView):
     template_name = 'farmer_engagement/engagement_report.html'
 
 # Function-based views
+CBO_GROUP_EXPORT_COLUMNS = [
+    ('Group Name', 'name'),
+    ('Type', 'get_group_type_display'),
+    ('District', 'district'),
+    ('Sub-County', 'sub_county'),
+    ('Village', 'village'),
+    ('Total Members', 'total_members'),
+    ('Female Members', 'female_members'),
+    ('Male Members', 'male_members'),
+    ('Formation Date', 'formation_date'),
+    ('Status', 'get_status_display'),
+]
+
+MEETING_EXPORT_COLUMNS = [
+    ('CBO Group', 'cbo_group__name'),
+    ('Meeting Title', 'title'),
+    ('Type', 'get_meeting_type_display'),
+    ('Meeting Date', 'meeting_date', format_datetime),
+    ('Venue', 'venue'),
+    ('Facilitator', 'facilitator__user__get_full_name'),
+    ('Expected Attendance', 'expected_attendance'),
+    ('Actual Attendance', 'actual_attendance'),
+    ('Attendance Rate', 'attendance_rate', format_percent),
+]
+
+ATTENDANCE_EXPORT_COLUMNS = [
+    ('Farmer Name', 'farmer', str),
+    ('CBO Group', 'meeting__cbo_group__name'),
+    ('Meeting Title', 'meeting__title'),
+    ('Meeting Date', 'meeting__meeting_date', format_datetime),
+    ('Attendance Status', 'get_attendance_status_display'),
+    ('Check-in Time', 'check_in_time', format_datetime),
+    ('Check-in Method', 'get_checkin_method_display'),
+]
+
 def export_cbo_groups(request):
     """Export CBO groups to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="cbo_groups.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Group Name', 'Type', 'District', 'Sub-County', 'Village', 
-        'Total Members', 'Female Members', 'Male Members', 'Formation Date', 'Status'
-    ])
-    
-    groups = CBOGroup.objects.all()
-    for group in groups:
-        writer.writerow([
-            group.name,
-            group.get_group_type_display(),
-            group.district,
-            group.sub_county,
-            group.village,
-            group.total_members,
-            group.female_members,
-            group.male_members,
-            group.formation_date.strftime('%Y-%m-%d'),
-            group.get_status_display()
-        ])
-    
-    return response
+    return stream_csv(CBOGroup.objects.all(), CBO_GROUP_EXPORT_COLUMNS, 'cbo_groups.csv', since=export_since(request))
 
 def import_cbo_groups(request):
     """Import CBO groups from CSV"""
@@ -143,58 +166,15 @@ def import_cbo_groups(request):
 
 def export_meetings(request):
     """Export meetings to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="cbo_meetings.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'CBO Group', 'Meeting Title', 'Type', 'Meeting Date', 'Venue', 
-        'Facilitator', 'Expected Attendance', 'Actual Attendance', 'Attendance Rate'
-    ])
-    
-    meetings = CBOMeeting.objects.select_related('cbo_group', 'facilitator__user').all()
-    for meeting in meetings:
-        writer.writerow([
-            meeting.cbo_group.name,
-            meeting.title,
-            meeting.get_meeting_type_display(),
-            meeting.meeting_date.strftime('%Y-%m-%d %H:%M'),
-            meeting.venue,
-            meeting.facilitator.user.get_full_name(),
-            meeting.expected_attendance,
-            meeting.actual_attendance,
-            f"{meeting.attendance_rate:.1f}%"
-        ])
-    
-    return response
+    return stream_csv(CBOMeeting.objects.all(), MEETING_EXPORT_COLUMNS, 'cbo_meetings.csv', since=export_since(request))
 
 def export_attendance(request):
     """Export attendance records to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="farmer_attendance.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Farmer Name', 'CBO Group', 'Meeting Title', 'Meeting Date', 
-        'Attendance Status', 'Check-in Time', 'Check-in Method'
-    ])
-    
-    attendance_records = FarmerAttendance.objects.select_related(
-        'farmer', 'meeting__cbo_group'
-    ).all()
-    
-    for record in attendance_records:
-        writer.writerow([
-            record.farmer.full_name,
-            record.meeting.cbo_group.name,
-            record.meeting.title,
-            record.meeting.meeting_date.strftime('%Y-%m-%d %H:%M'),
-            record.get_attendance_status_display(),
-            record.check_in_time.strftime('%Y-%m-%d %H:%M') if record.check_in_time else '',
-            record.get_checkin_method_display()
-        ])
-    
-    return response
+    return stream_csv(FarmerAttendance.objects.all(), ATTENDANCE_EXPORT_COLUMNS, 'farmer_attendance.csv', since=export_since(request))
+
+def export_attendance_parquet(request):
+    """Export attendance records to Parquet for analytics"""
+    return parquet_response(FarmerAttendance.objects.all(), ATTENDANCE_EXPORT_COLUMNS, 'farmer_attendance.parquet', since=export_since(request))
 
 def qr_code_checkin(request, meeting_id):
     """QR code check-in endpoint"""
@@ -1,6 +1,7 @@
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, permissions
+from core.export_import import export_since
 from farmers.models import Farmer, Household, Location
 from .serializers import FarmerSerializer, HouseholdSerializer, LocationSerializer
 
@@ -11,11 +12,11 @@ class LocationViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return Location.export_to_csv()
+        return Location.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return Location.export_to_excel()
+        return Location.export_to_excel(since=export_since(request))
 
 class HouseholdViewSet(viewsets.ModelViewSet):
     queryset = Household.objects.all()
@@ -24,11 +25,11 @@ class HouseholdViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return Household.export_to_csv()
+        return Household.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return Household.export_to_excel()
+        return Household.export_to_excel(since=export_since(request))
 
 class FarmerViewSet(viewsets.ModelViewSet):
     queryset = Farmer.objects.all()
@@ -37,8 +38,8 @@ class FarmerViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return Farmer.export_to_csv()
+        return Farmer.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return Farmer.export_to_excel()
+        return Farmer.export_to_excel(since=export_since(request))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Count
 from core.models import TimeStampedModel
 from core.export_import import CustomExportMixin
 from projects.models import Project
@@ -12,52 +13,12 @@ class Location(TimeStampedModel, CustomExportMixin):
     def __str__(self):
         return f'{self.name}, {self.district}'
 
-    @classmethod
-    def export_to_csv(cls):
-        'Export locations to CSV'
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=\"locations.csv\"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Name', 'District', 'Region', 'Country'])
-        
-        for location in cls.objects.all():
-            writer.writerow([
-                location.name,
-                location.district,
-                location.region,
-                location.country
-            ])
-        
-        return response
-
-    @classmethod
-    def export_to_excel(cls):
-        'Export locations to Excel'
-        import pandas as pd
-        from django.http import HttpResponse
-        from io import BytesIO
-        
-        data = []
-        for location in cls.objects.all():
-            data.append({
-                'Name': location.name,
-                'District': location.district,
-                'Region': location.region,
-                'Country': location.country
-            })
-        
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Locations', index=False)
-        
-        response = HttpResponse(output.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=\"locations.xlsx\"'
-        return response
+    export_columns = [
+        ('Name', 'name'),
+        ('District', 'district'),
+        ('Region', 'region'),
+        ('Country', 'country'),
+    ]
 
 class Household(TimeStampedModel, CustomExportMixin):
     head_of_household = models.CharField(max_length=100)
@@ -73,58 +34,15 @@ class Household(TimeStampedModel, CustomExportMixin):
     def __str__(self):
         return self.head_of_household
 
-    @classmethod
-    def export_to_csv(cls):
-        'Export households to CSV'
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=\"households.csv\"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Head of Household', 'Phone Number', 'Family Size', 'Income Level', 'Location', 'District', 'Region'])
-        
-        for household in cls.objects.all():
-            writer.writerow([
-                household.head_of_household,
-                household.phone_number or '',
-                household.family_size,
-                household.income_level,
-                household.location.name,
-                household.location.district,
-                household.location.region
-            ])
-        
-        return response
-
-    @classmethod
-    def export_to_excel(cls):
-        'Export households to Excel'
-        import pandas as pd
-        from django.http import HttpResponse
-        from io import BytesIO
-        
-        data = []
-        for household in cls.objects.all():
-            data.append({
-                'Head of Household': household.head_of_household,
-                'Phone Number': household.phone_number or '',
-                'Family Size': household.family_size,
-                'Income Level': household.income_level,
-                'Location': household.location.name,
-                'District': household.location.district,
-                'Region': household.location.region
-            })
-        
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Households', index=False)
-        
-        response = HttpResponse(output.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=\"households.xlsx\"'
-        return response
+    export_columns = [
+        ('Head of Household', 'head_of_household'),
+        ('Phone Number', 'phone_number'),
+        ('Family Size', 'family_size'),
+        ('Income Level', 'income_level'),
+        ('Location', 'location__name'),
+        ('District', 'location__district'),
+        ('Region', 'location__region'),
+    ]
 
 class Farmer(TimeStampedModel, CustomExportMixin):
     GENDER_CHOICES = [
@@ -156,62 +74,17 @@ class Farmer(TimeStampedModel, CustomExportMixin):
             )
         return None
 
-    @classmethod
-    def export_to_csv(cls):
-        'Export farmers to CSV'
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=\"farmers.csv\"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['First Name', 'Last Name', 'Gender', 'Age', 'Phone Number', 'Education Level', 'Household', 'Location', 'Projects Count'])
-        
-        for farmer in cls.objects.all():
-            writer.writerow([
-                farmer.first_name,
-                farmer.last_name,
-                farmer.gender,
-                farmer.age or '',
-                farmer.phone_number or '',
-                farmer.education_level or '',
-                farmer.household.head_of_household,
-                farmer.household.location.name,
-                farmer.projects.count()
-            ])
-        
-        return response
-
-    @classmethod
-    def export_to_excel(cls):
-        'Export farmers to Excel'
-        import pandas as pd
-        from django.http import HttpResponse
-        from io import BytesIO
-        
-        data = []
-        for farmer in cls.objects.all():
-            data.append({
-                'First Name': farmer.first_name,
-                'Last Name': farmer.last_name,
-                'Gender': farmer.gender,
-                'Age': farmer.age or '',
-                'Phone Number': farmer.phone_number or '',
-                'Education Level': farmer.education_level or '',
-                'Household': farmer.household.head_of_household,
-                'Location': farmer.household.location.name,
-                'Projects Count': farmer.projects.count()
-            })
-        
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Farmers', index=False)
-        
-        response = HttpResponse(output.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=\"farmers.xlsx\"'
-        return response
+    export_columns = [
+        ('First Name', 'first_name'),
+        ('Last Name', 'last_name'),
+        ('Gender', 'gender'),
+        ('Age', 'age'),
+        ('Phone Number', 'phone_number'),
+        ('Education Level', 'education_level'),
+        ('Household', 'household__head_of_household'),
+        ('Location', 'household__location__name'),
+        ('Projects Count', Count('projects')),
+    ]
 
 class FarmPlot(TimeStampedModel, CustomExportMixin):
     farmer = models.ForeignKey(Farmer, on_delete=models.CASCADE, related_name='farm_plots')
@@ -223,51 +96,11 @@ class FarmPlot(TimeStampedModel, CustomExportMixin):
     def __str__(self):
         return f'{self.farmer} plot ({self.size_acres} acres)'
 
-    @classmethod
-    def export_to_csv(cls):
-        'Export farm plots to CSV'
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=\"farm_plots.csv\"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Farmer', 'Size (Acres)', 'Soil Type', 'GPS Coordinates', 'Location'])
-        
-        for plot in cls.objects.all():
-            writer.writerow([
-                f'{plot.farmer.first_name} {plot.farmer.last_name}',
-                plot.size_acres,
-                plot.soil_type or '',
-                plot.gps_coordinates or '',
-                plot.location.name if plot.location else ''
-            ])
-        
-        return response
-
-    @classmethod
-    def export_to_excel(cls):
-        'Export farm plots to Excel'
-        import pandas as pd
-        from django.http import HttpResponse
-        from io import BytesIO
-        
-        data = []
-        for plot in cls.objects.all():
-            data.append({
-                'Farmer': f'{plot.farmer.first_name} {plot.farmer.last_name}',
-                'Size (Acres)': plot.size_acres,
-                'Soil Type': plot.soil_type or '',
-                'GPS Coordinates': plot.gps_coordinates or '',
-                'Location': plot.location.name if plot.location else ''
-            })
-        
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Farm Plots', index=False)
-        
-        response = HttpResponse(output.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=\"farm_plots.xlsx\"'
-        return response
+    export_filename = 'farm_plots'
+    export_columns = [
+        ('Farmer', 'farmer', str),
+        ('Size (Acres)', 'size_acres'),
+        ('Soil Type', 'soil_type'),
+        ('GPS Coordinates', 'gps_coordinates'),
+        ('Location', 'location__name'),
+    ]
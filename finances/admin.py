@@ -1,6 +1,6 @@
 
 from django.contrib import admin
-from .models import Budget, Expense, FinancialReport
+from .models import Budget, Expense, ExportJob, FinancialReport
 
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
@@ -13,3 +13,9 @@ class ExpenseAdmin(admin.ModelAdmin):
 @admin.register(FinancialReport)
 class FinancialReportAdmin(admin.ModelAdmin):
     actions = ['delete_selected']
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['model_label', 'export_format', 'status', 'processed_rows', 'total_rows', 'requested_by', 'created_at']
+    list_filter = ['status', 'export_format']
+    actions = ['delete_selected']
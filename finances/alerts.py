@@ -0,0 +1,61 @@
+"""
+Budget utilization alerts
+
+Each budget is alerted once per threshold in BUDGET_ALERT_THRESHOLDS. The
+thresholds are applied in the query: budgets are annotated with their
+utilization and the highest threshold it reaches, and budgets already
+alerted at that threshold or above are left out through BudgetAlertState.
+A budget that crosses several thresholds between runs gets one alert, for
+the highest. When utilization falls back below a threshold (an expense is
+rejected or the allocation raised) its state is cleared so it can fire again.
+"""
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Value, When
+from core.email_service import send_budget_alert_notifications
+from core.export_import import percentage_of
+from .models import Budget, BudgetAlertState
+
+BUDGET_ALERT_THRESHOLDS = [80, 90, 95]
+ALERT_BATCH_SIZE = 500
+
+
+def utilization():
+    """Budget utilization as a percentage of the allocation"""
+    return percentage_of(F('utilized_amount'), 'allocated_amount')
+
+
+def due_budget_alerts():
+    """Budgets owed an alert, annotated with utilization and the threshold reached"""
+    tier = Case(
+        *[When(utilization__gte=threshold, then=Value(threshold)) for threshold in sorted(BUDGET_ALERT_THRESHOLDS, reverse=True)],
+        output_field=IntegerField(),
+    )
+    alerted = BudgetAlertState.objects.filter(budget=OuterRef('pk'), threshold__gte=OuterRef('threshold'))
+    return (Budget.objects.annotate(utilization=utilization()).annotate(threshold=tier)
+            .filter(~Exists(alerted), threshold__isnull=False)
+            .select_related('project', 'created_by').order_by())
+
+
+def rearm_budget_alerts():
+    """Clear alert states for thresholds the budget's utilization has fallen below"""
+    below = Budget.objects.annotate(utilization=utilization()).filter(
+        pk=OuterRef('budget'), utilization__lt=OuterRef('threshold')
+    )
+    return BudgetAlertState.objects.filter(Exists(below)).delete()[0]
+
+
+def send_budget_alerts():
+    """Alert every budget that has reached a new threshold; returns the number of budgets alerted"""
+    rearm_budget_alerts()
+    budgets = list(due_budget_alerts())
+    for start in range(0, len(budgets), ALERT_BATCH_SIZE):
+        batch = budgets[start:start + ALERT_BATCH_SIZE]
+        # States are written with the sends, so a failed send is retried on the next run
+        with transaction.atomic():
+            BudgetAlertState.objects.bulk_create([
+                BudgetAlertState(budget=budget, threshold=threshold)
+                for budget in batch for threshold in BUDGET_ALERT_THRESHOLDS if threshold <= budget.threshold
+            ], ignore_conflicts=True)
+            send_budget_alert_notifications((budget, budget.threshold, budget.utilization) for budget in batch)
+    return len(budgets)
@@ -1,6 +1,7 @@
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, status
+from core.export_import import export_since
 from ..models import Budget, Expense, FinancialReport
 from .serializers import BudgetSerializer, ExpenseSerializer, FinancialReportSerializer
 
@@ -10,11 +11,15 @@ class BudgetViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return Budget.export_to_csv()
+        return Budget.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return Budget.export_to_excel()
+        return Budget.export_to_excel(since=export_since(request))
+
+    @action(detail=False, methods=['get'])
+    def export_parquet(self, request):
+        return Budget.export_to_parquet(since=export_since(request))
 
 class ExpenseViewSet(viewsets.ModelViewSet):
     queryset = Expense.objects.all()
@@ -22,11 +27,15 @@ class ExpenseViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return Expense.export_to_csv()
+        return Expense.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return Expense.export_to_excel()
+        return Expense.export_to_excel(since=export_since(request))
+
+    @action(detail=False, methods=['get'])
+    def export_parquet(self, request):
+        return Expense.export_to_parquet(since=export_since(request))
 
 class FinancialReportViewSet(viewsets.ModelViewSet):
     queryset = FinancialReport.objects.all()
@@ -34,8 +43,12 @@ class FinancialReportViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return FinancialReport.export_to_csv()
+        return FinancialReport.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return FinancialReport.export_to_excel()
+        return FinancialReport.export_to_excel(since=export_since(request))
+
+    @action(detail=False, methods=['get'])
+    def export_parquet(self, request):
+        return FinancialReport.export_to_parquet(since=export_since(request))
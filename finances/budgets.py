@@ -0,0 +1,62 @@
+"""
+Budget utilization
+
+Budget.utilized_amount is the stored total of the budget's expenses, leaving
+out rejected ones. Expense.save moves it with one F() UPDATE when an expense
+is created, changes amount or budget, or moves in or out of the rejected
+status, and deleting an expense takes its amount back off, so reading a
+budget's utilization never aggregates its expenses. budget_drift and
+reconcile_budgets check and rebuild the column from one grouped aggregate,
+for backfills and for writes that bypass Expense.save.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Budget, Expense
+
+# Expenses that count against their budget
+UTILIZED_EXPENSES = ~Q(status='rejected')
+
+
+def apply_utilization(budget_id, amount):
+    """Move a budget's utilized_amount by `amount`"""
+    Budget.objects.filter(pk=budget_id).update(
+        utilized_amount=F('utilized_amount') + amount,
+        updated_at=timezone.now(),  # update() skips auto_now; delta exports read updated_at
+    )
+
+
+def utilization_changed(before, after):
+    """Apply the change in an expense's contribution, each a (budget pk, amount) or None"""
+    deltas = defaultdict(Decimal)
+    for contribution, sign in ((before, -1), (after, 1)):
+        if contribution and contribution[0] is not None:
+            budget_id, amount = contribution
+            deltas[budget_id] += sign * Decimal(amount)
+    for budget_id, amount in deltas.items():
+        if amount:
+            apply_utilization(budget_id, amount)
+
+
+def expense_total():
+    """Budget.utilized_amount as rebuilt from the budget's expenses"""
+    expenses = (Expense.objects.filter(UTILIZED_EXPENSES, budget=OuterRef('pk'))
+                .values('budget').annotate(total=Sum('amount')).values('total'))
+    return Coalesce(Subquery(expenses), Decimal('0'))
+
+
+def budget_drift():
+    """Budgets whose utilized_amount differs from their expenses, annotated with expense_total"""
+    return Budget.objects.annotate(expense_total=expense_total()).filter(~Q(utilized_amount=F('expense_total')))
+
+
+def reconcile_budgets():
+    """Reset drifted budgets' utilized_amount to their expense total; returns the number changed"""
+    with transaction.atomic():
+        drifted = list(budget_drift().select_for_update().values_list('pk', flat=True))
+        Budget.objects.filter(pk__in=drifted).update(utilized_amount=expense_total(), updated_at=timezone.now())
+    return len(drifted)
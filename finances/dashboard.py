@@ -0,0 +1,108 @@
+"""
+Financial dashboard
+
+financial_dashboard_data builds the finances dashboard from four queries
+whatever the data size: budgets grouped by type (from which the summary is
+totalled), a rollup freshness check and the monthly trend read through
+Expense.get_monthly_spending, and the latest expenses. Spend is read from the
+stored Budget.utilized_amount, so allocations are never joined to expenses
+and cannot be counted once per expense. Each caller's project scope is cached
+for FINANCIAL_DASHBOARD_CACHE_TTL seconds.
+"""
+
+import hashlib
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+from projects.models import Project
+from .budgets import UTILIZED_EXPENSES
+from .models import Budget, Expense
+
+FINANCIAL_DASHBOARD_CACHE_TTL = 30
+RECENT_EXPENSES = 10
+
+
+def percentage(part, whole):
+    return float(part / whole * 100) if whole else 0.0
+
+
+def dashboard_scope(user, project_ids=None):
+    """Projects the user's dashboard covers, or None for all, and the cache key naming them
+
+    Project managers see the projects they manage; `project_ids` narrows the
+    scope to those projects.
+    """
+    projects, key = None, 'all'
+    if getattr(user, 'role', None) == 'project_manager' and not user.is_superuser:
+        projects = Project.objects.filter(project_manager=user) | Project.objects.filter(manager=user)
+        key = f'manager:{user.pk}'
+    if project_ids:
+        projects = (projects if projects is not None else Project.objects.all()).filter(pk__in=project_ids)
+        key += ':' + ','.join(sorted(map(str, project_ids)))
+    return projects, 'finances:dashboard:' + hashlib.md5(key.encode()).hexdigest()
+
+
+def financial_dashboard_data(projects=None):
+    """Dashboard sections for the budgets and expenses of `projects` (all by default)"""
+    budgets = Budget.objects.all()
+    expenses = Expense.objects.filter(UTILIZED_EXPENSES)
+    if projects is not None:
+        budgets = budgets.filter(project__in=projects)
+        expenses = expenses.filter(budget__project__in=projects)
+    since = timezone.localdate() - timedelta(days=30)
+
+    by_type = list(
+        budgets.values('budget_type').annotate(
+            budgets=Count('id'), allocated=Sum('allocated_amount'), spent=Sum('utilized_amount')
+        ).order_by('budget_type')
+    )
+    monthly = Expense.get_monthly_spending(since, projects)
+    recent = expenses.order_by('-date', '-created_at').values(
+        'budget__project__name', 'description', 'amount', 'date', 'status'
+    )[:RECENT_EXPENSES]
+
+    total_allocated = sum((row['allocated'] for row in by_type), Decimal('0'))
+    total_spent = sum((row['spent'] for row in by_type), Decimal('0'))
+    return {
+        'summary': {
+            'total_budgets': sum(row['budgets'] for row in by_type),
+            'total_allocated': float(total_allocated),
+            'total_expenses': float(total_spent),
+            'remaining_budget': float(total_allocated - total_spent),
+            'overall_utilization': percentage(total_spent, total_allocated),
+        },
+        'budget_utilization': [
+            {
+                'budget_type': row['budget_type'],
+                'allocated': float(row['allocated']),
+                'spent': float(row['spent']),
+                'utilization': percentage(row['spent'], row['allocated']),
+            }
+            for row in by_type
+        ],
+        'monthly_trend': [
+            {'month': row['month'].isoformat(), 'total': float(row['total'])} for row in monthly
+        ],
+        'recent_expenses': [
+            {
+                'project': row['budget__project__name'],
+                'description': row['description'],
+                'amount': float(row['amount']),
+                'date': row['date'].isoformat(),
+                'status': row['status'],
+            }
+            for row in recent
+        ],
+    }
+
+
+def get_financial_dashboard(user, project_ids=None):
+    """The user's dashboard, from the cache when it was built in the last FINANCIAL_DASHBOARD_CACHE_TTL seconds"""
+    projects, key = dashboard_scope(user, project_ids)
+    data = cache.get(key)
+    if data is None:
+        data = financial_dashboard_data(projects)
+        cache.set(key, data, FINANCIAL_DASHBOARD_CACHE_TTL)
+    return data
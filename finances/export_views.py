@@ -1,5 +1,4 @@
 import io
-import csv
 from datetime import datetime
 from django.http import HttpResponse
 from django.views import View
@@ -11,6 +10,8 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
 from openpyxl import Workbook
+from django.db.models import F
+from core.export_import import format_percent, percentage_of, stream_csv
 from .models import Budget, Expense, FinancialReport
 
 class ExportBaseView(View):
@@ -19,25 +20,18 @@ class ExportBaseView(View):
         return super().dispatch(*args, **kwargs)
 
 class ExportBudgetsCSV(ExportBaseView):
+    columns = [
+        ('Project', 'project__name'),
+        ('Budget Type', 'get_budget_type_display'),
+        ('Allocated Amount', 'allocated_amount'),
+        ('Total Expenses', 'utilized_amount'),
+        ('Remaining', F('allocated_amount') - F('utilized_amount')),
+        ('Utilization %', percentage_of(F('utilized_amount'), 'allocated_amount'), format_percent),
+    ]
+
     def get(self, request):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="budgets_{datetime.now().strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Project', 'Budget Type', 'Allocated Amount', 'Total Expenses', 'Remaining', 'Utilization %'])
-        
-        budgets = Budget.objects.select_related('project').prefetch_related('expenses')
-        for budget in budgets:
-            writer.writerow([
-                budget.project.name,
-                budget.get_budget_type_display(),
-                budget.allocated_amount,
-                budget.total_expenses,
-                budget.remaining_amount,
-                f"{budget.utilization_percentage:.1f}%"
-            ])
-        
-        return response
+        budgets = Budget.objects.all()
+        return stream_csv(budgets, self.columns, f'budgets_{datetime.now().strftime("%Y%m%d")}.csv')
 
 class ExportExpensesExcel(ExportBaseView):
     def get(self, request):
@@ -0,0 +1,16 @@
+import time
+from datetime import date
+from django.core.management.base import BaseCommand
+from finances.reports import generate_monthly_reports
+
+class Command(BaseCommand):
+    help = "Generate each project's monthly financial report, skipping projects already reported"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=date.fromisoformat, help='Any date in the month to report (default: last month)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = generate_monthly_reports(options['month'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Created {created} monthly financial reports in {elapsed:.1f}s'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from finances.budgets import budget_drift, reconcile_budgets
+
+class Command(BaseCommand):
+    help = 'Rebuild Budget.utilized_amount from the budgets\' expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report budgets whose utilization has drifted')
+
+    def handle(self, *args, **options):
+        drifted = budget_drift().values_list('name', 'utilized_amount', 'expense_total')
+        for name, utilized, total in drifted:
+            self.stdout.write(f'{name}: utilized {utilized}, expenses {total}')
+        if options['check']:
+            self.stdout.write(f'{len(drifted)} budgets drifted from their expenses')
+            return
+
+        fixed = reconcile_budgets()
+        self.stdout.write(self.style.SUCCESS(f'Reset utilization for {fixed} budgets from their expenses'))
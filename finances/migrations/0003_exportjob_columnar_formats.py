@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0002_exportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='export_format',
+            field=models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel'), ('pdf', 'PDF'), ('parquet', 'Parquet'), ('arrow', 'Arrow IPC')], default='csv', max_length=10),
+        ),
+    ]
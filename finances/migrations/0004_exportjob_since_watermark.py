@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0003_exportjob_columnar_formats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='since',
+            field=models.DateTimeField(blank=True, help_text='Only export rows changed after this time', null=True),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='watermark',
+            field=models.DateTimeField(blank=True, help_text='Pass as since on the next delta export', null=True),
+        ),
+    ]
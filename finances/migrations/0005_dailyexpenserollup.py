@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0004_exportjob_since_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=50)),
+                ('expenses_count', models.PositiveIntegerField(default=0)),
+                ('expenses_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='finances.budget')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'budget'], name='finances_da_day_bd18e1_idx')],
+            },
+        ),
+    ]
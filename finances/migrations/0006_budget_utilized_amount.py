@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:01
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def total_expenses(apps, schema_editor):
+    Budget = apps.get_model('finances', 'Budget')
+    Expense = apps.get_model('finances', 'Expense')
+    expenses = (Expense.objects.filter(~Q(status='rejected'), budget=OuterRef('pk'))
+                .values('budget').annotate(total=Sum('amount')).values('total'))
+    Budget.objects.update(utilized_amount=Coalesce(Subquery(expenses), Decimal('0')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0005_dailyexpenserollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='utilized_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Total of non-rejected expenses, maintained by finances.budgets', max_digits=15),
+        ),
+        migrations.RunPython(total_expenses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0006_budget_utilized_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetAlertState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold', models.PositiveSmallIntegerField()),
+                ('alerted_at', models.DateTimeField(auto_now_add=True)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_states', to='finances.budget')),
+            ],
+            options={
+                'unique_together': {('budget', 'threshold')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0007_budgetalertstate'),
+        ('projects', '0006_alter_project_project_manager_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='financialreport',
+            constraint=models.UniqueConstraint(condition=models.Q(('report_type', 'monthly')), fields=('project', 'period_start', 'period_end'), name='unique_monthly_financial_report'),
+        ),
+    ]
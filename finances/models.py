@@ -1,7 +1,10 @@
-from django.db import models
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.db.models.functions import TruncMonth
 from django.conf import settings
 from core.models import TimeStampedModel
-from core.export_import import CustomExportMixin
+from core.export_import import EXPORT_WRITERS, CustomExportMixin, ExportableModel, format_percent, percentage_of
 from projects.models import Project
 
 class Budget(TimeStampedModel, CustomExportMixin):
@@ -22,6 +25,10 @@ class Budget(TimeStampedModel, CustomExportMixin):
     
     # Financial Details
     allocated_amount = models.DecimalField(max_digits=15, decimal_places=2)
+    utilized_amount = models.DecimalField(
+        max_digits=15, decimal_places=2, default=0, editable=False,
+        help_text='Total of non-rejected expenses, maintained by finances.budgets'
+    )
     description = models.TextField(blank=True, null=True)
     
     # Timeline
@@ -40,11 +47,6 @@ class Budget(TimeStampedModel, CustomExportMixin):
     def __str__(self):
         return f'{self.project.code} - {self.name} - {self.budget_type}'
 
-    @property
-    def utilized_amount(self):
-        'Calculate utilized amount from expenses'
-        return self.expenses.aggregate(total=models.Sum('amount'))['total'] or 0
-
     @property
     def utilization_rate(self):
         'Calculate budget utilization rate'
@@ -62,60 +64,16 @@ class Budget(TimeStampedModel, CustomExportMixin):
         today = timezone.now().date()
         return self.start_date <= today <= self.end_date
 
-    @classmethod
-    def export_to_csv(cls):
-        'Export budgets to CSV'
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=\"budgets.csv\"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Project', 'Name', 'Budget Type', 'Category', 'Allocated Amount', 'Start Date', 'End Date', 'Utilization Rate'])
-        
-        for budget in cls.objects.all():
-            writer.writerow([
-                budget.project.code,
-                budget.name,
-                budget.budget_type,
-                budget.category,
-                budget.allocated_amount,
-                budget.start_date,
-                budget.end_date,
-                f'{budget.utilization_rate:.1f}%'
-            ])
-        
-        return response
-
-    @classmethod
-    def export_to_excel(cls):
-        'Export budgets to Excel'
-        import pandas as pd
-        from django.http import HttpResponse
-        from io import BytesIO
-        
-        data = []
-        for budget in cls.objects.all():
-            data.append({
-                'Project': budget.project.code,
-                'Name': budget.name,
-                'Budget Type': budget.budget_type,
-                'Category': budget.category,
-                'Allocated Amount': budget.allocated_amount,
-                'Start Date': budget.start_date,
-                'End Date': budget.end_date,
-                'Utilization Rate': f'{budget.utilization_rate:.1f}%'
-            })
-        
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Budgets', index=False)
-        
-        response = HttpResponse(output.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=\"budgets.xlsx\"'
-        return response
+    export_columns = [
+        ('Project', 'project__code'),
+        ('Name', 'name'),
+        ('Budget Type', 'budget_type'),
+        ('Category', 'category'),
+        ('Allocated Amount', 'allocated_amount'),
+        ('Start Date', 'start_date'),
+        ('End Date', 'end_date'),
+        ('Utilization Rate', percentage_of(models.F('utilized_amount'), 'allocated_amount'), format_percent),
+    ]
 
     class Meta:
         ordering = ['-created_at']
@@ -193,68 +151,58 @@ class Expense(TimeStampedModel, CustomExportMixin):
         return self.status == 'paid'
 
     @classmethod
-    def export_to_csv(cls):
-        'Export expenses to CSV'
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=\"expenses.csv\"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Project', 'Budget', 'Description', 'Amount', 'Date', 'Category', 'Payment Method', 'Status', 'Receipt Number'])
-        
-        for expense in cls.objects.all():
-            writer.writerow([
-                expense.project.code,
-                expense.budget.name,
-                expense.description[:100],
-                expense.amount,
-                expense.date,
-                expense.category,
-                expense.payment_method,
-                expense.status,
-                expense.receipt_number or ''
-            ])
-        
-        return response
+    def get_monthly_spending(cls, start_date, projects=None):
+        '''Spend per month from start_date for projects (all by default), from the daily rollup when it is fresh
 
-    @classmethod
-    def export_to_excel(cls):
-        'Export expenses to Excel'
-        import pandas as pd
-        from django.http import HttpResponse
-        from io import BytesIO
-        
-        data = []
-        for expense in cls.objects.all():
-            data.append({
-                'Project': expense.project.code,
-                'Budget': expense.budget.name,
-                'Description': expense.description[:100],
-                'Amount': expense.amount,
-                'Date': expense.date,
-                'Category': expense.category,
-                'Payment Method': expense.payment_method,
-                'Status': expense.status,
-                'Receipt Number': expense.receipt_number or ''
-            })
-        
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Expenses', index=False)
-        
-        response = HttpResponse(output.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=\"expenses.xlsx\"'
-        return response
+        Rejected expenses are left out on both paths, as they are from budget utilization.
+        '''
+        from core.rollups import rollup_is_fresh
+        from .budgets import UTILIZED_EXPENSES
+
+        if rollup_is_fresh('expenses'):
+            rows = DailyExpenseRollup.objects.filter(day__gte=start_date)
+            if projects is not None:
+                rows = rows.filter(budget__project__in=projects)
+            rows = rows.annotate(month=TruncMonth('day')).values('month').annotate(total=models.Sum('expenses_total'))
+        else:
+            rows = cls.objects.filter(UTILIZED_EXPENSES, date__gte=start_date)
+            if projects is not None:
+                rows = rows.filter(budget__project__in=projects)
+            rows = rows.annotate(month=TruncMonth('date')).values('month').annotate(total=models.Sum('amount'))
+        return list(rows.order_by('month'))
+
+    export_columns = [
+        ('Project', 'project__code'),
+        ('Budget', 'budget__name'),
+        ('Description', 'description', lambda description: description[:100]),
+        ('Amount', 'amount'),
+        ('Date', 'date'),
+        ('Category', 'category'),
+        ('Payment Method', 'payment_method'),
+        ('Status', 'status'),
+        ('Receipt Number', 'receipt_number'),
+    ]
 
     def save(self, *args, **kwargs):
         # Auto-set submitted_by if not set and creating
         if not self.pk and not self.submitted_by:
             # This would typically be set by the view, but as fallback
             pass
-        super().save(*args, **kwargs)
+
+        # Move the budget's utilized amount when the expense's contribution changes
+        from .budgets import utilization_changed
+        with transaction.atomic():
+            # Lock the stored row so concurrent saves cannot both apply the same change
+            stored = None if self._state.adding else (
+                Expense.objects.select_for_update().filter(pk=self.pk).values_list('status', 'budget_id', 'amount').first()
+            )
+            previous = stored[1:] if stored and stored[0] != 'rejected' else None
+            super().save(*args, **kwargs)
+            utilization_changed(previous, self.utilized_contribution())
+
+    def utilized_contribution(self):
+        '''(budget pk, amount) this expense adds to its budget's utilization, or None when rejected'''
+        return None if self.status == 'rejected' else (self.budget_id, self.amount)
 
     class Meta:
         ordering = ['-date', '-created_at']
@@ -266,6 +214,34 @@ class Expense(TimeStampedModel, CustomExportMixin):
             models.Index(fields=['budget', 'date']),
         ]
 
+class BudgetAlertState(models.Model):
+    '''A utilization threshold a budget has been alerted for, so each fires once (see finances.alerts)'''
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='alert_states')
+    threshold = models.PositiveSmallIntegerField()
+    alerted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.budget_id} at {self.threshold}%'
+
+    class Meta:
+        unique_together = ['budget', 'threshold']
+
+class DailyExpenseRollup(models.Model):
+    '''Expenses counting against their budget per day, budget and category, maintained by core.rollups'''
+    day = models.DateField()
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='+')
+    category = models.CharField(max_length=50)
+    expenses_count = models.PositiveIntegerField(default=0)
+    expenses_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f'{self.day} {self.category}: {self.expenses_total}'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['day', 'budget']),
+        ]
+
 class FinancialReport(TimeStampedModel, CustomExportMixin):
     REPORT_TYPES = [
         ('monthly', 'Monthly Report'),
@@ -329,62 +305,18 @@ class FinancialReport(TimeStampedModel, CustomExportMixin):
             return (self.total_expenses / self.total_budget * 100)
         return 0
 
-    @classmethod
-    def export_to_csv(cls):
-        'Export financial reports to CSV'
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=\"financial_reports.csv\"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Project', 'Title', 'Report Type', 'Period', 'Total Budget', 'Total Income', 'Total Expenses', 'Net Position', 'Profit Margin'])
-        
-        for report in cls.objects.all():
-            writer.writerow([
-                report.project.code,
-                report.title,
-                report.report_type,
-                report.report_period,
-                report.total_budget,
-                report.total_income,
-                report.total_expenses,
-                report.net_position,
-                f'{report.profit_margin:.1f}%'
-            ])
-        
-        return response
-
-    @classmethod
-    def export_to_excel(cls):
-        'Export financial reports to Excel'
-        import pandas as pd
-        from django.http import HttpResponse
-        from io import BytesIO
-        
-        data = []
-        for report in cls.objects.all():
-            data.append({
-                'Project': report.project.code,
-                'Title': report.title,
-                'Report Type': report.report_type,
-                'Period': report.report_period,
-                'Total Budget': report.total_budget,
-                'Total Income': report.total_income,
-                'Total Expenses': report.total_expenses,
-                'Net Position': report.net_position,
-                'Profit Margin': f'{report.profit_margin:.1f}%'
-            })
-        
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Financial Reports', index=False)
-        
-        response = HttpResponse(output.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=\"financial_reports.xlsx\"'
-        return response
+    export_filename = 'financial_reports'
+    export_columns = [
+        ('Project', 'project__code'),
+        ('Title', 'title'),
+        ('Report Type', 'report_type'),
+        ('Period', 'report_period'),
+        ('Total Budget', 'total_budget'),
+        ('Total Income', 'total_income'),
+        ('Total Expenses', 'total_expenses'),
+        ('Net Position', 'net_position'),
+        ('Profit Margin', 'profit_margin', format_percent),
+    ]
 
     class Meta:
         ordering = ['-period_end', '-created_at']
@@ -394,3 +326,98 @@ class FinancialReport(TimeStampedModel, CustomExportMixin):
             models.Index(fields=['project', 'report_type']),
             models.Index(fields=['period_start', 'period_end']),
         ]
+        constraints = [
+            # One generated monthly report per project and period (see finances.reports)
+            models.UniqueConstraint(
+                fields=['project', 'period_start', 'period_end'], condition=models.Q(report_type='monthly'),
+                name='unique_monthly_financial_report'
+            ),
+        ]
+
+class ExportJob(TimeStampedModel):
+    '''A model export run in the background and stored for later download'''
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+        ('parquet', 'Parquet'),
+        ('arrow', 'Arrow IPC'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    # What to export
+    model_label = models.CharField(max_length=100, help_text='e.g., finances.Budget')
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    filters = models.JSONField(default=dict, blank=True, help_text='Field lookups applied to the export queryset')
+    since = models.DateTimeField(blank=True, null=True, help_text='Only export rows changed after this time')
+
+    # Progress
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    watermark = models.DateTimeField(blank=True, null=True, help_text='Pass as since on the next delta export')
+
+    # Result
+    file = models.FileField(upload_to='exports/%Y/%m/', blank=True, null=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='export_jobs')
+
+    def __str__(self):
+        return f'{self.model_label} ({self.export_format}) - {self.status}'
+
+    @property
+    def progress(self):
+        '''Percentage of rows written so far'''
+        if self.status == 'completed':
+            return 100.0
+        if self.total_rows > 0:
+            return round(min(self.processed_rows / self.total_rows * 100, 100), 1)
+        return 0.0
+
+    def get_export_model(self):
+        '''The exportable model named by model_label'''
+        try:
+            model = apps.get_model(self.model_label)
+        except (LookupError, ValueError):
+            raise ValidationError({'model_label': f'Unknown model "{self.model_label}"'})
+        if not issubclass(model, ExportableModel):
+            raise ValidationError({'model_label': f'{self.model_label} cannot be exported'})
+        return model
+
+    def get_queryset(self):
+        '''The model's export queryset narrowed by the job filters'''
+        return self.get_export_model().get_export_queryset().filter(**self.filters)
+
+    def clean(self):
+        model = self.get_export_model()
+        if self.export_format not in EXPORT_WRITERS:
+            raise ValidationError({'export_format': f'Unsupported format "{self.export_format}"'})
+        if not isinstance(self.filters, dict):
+            raise ValidationError({'filters': 'Filters must be an object of field lookups'})
+        for lookup in self.filters:
+            # Only the model's own fields may be filtered on, so filters cannot
+            # be used to probe values on related models such as users
+            name, _, lookup_type = lookup.partition('__')
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if field is None or not field.concrete or (lookup_type and lookup_type not in field.get_lookups()):
+                raise ValidationError({'filters': f'Unsupported filter "{lookup}"'})
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+        indexes = [
+            models.Index(fields=['requested_by', 'status']),
+        ]
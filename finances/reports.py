@@ -0,0 +1,81 @@
+"""
+Monthly financial reports
+
+generate_monthly_reports writes one monthly FinancialReport per project for a
+calendar month. The figures come from two grouped aggregates keyed by
+project: budgets running during the month and non-rejected expenses dated
+in it. The reports are written with bulk_create, so a run makes the same
+few queries however many projects there are. Projects that already have a
+monthly report for the period are skipped, and a unique constraint backs
+that up against concurrent runs, so a retried task never duplicates
+reports.
+"""
+
+import calendar
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from projects.models import Project
+from .budgets import UTILIZED_EXPENSES
+from .models import Budget, Expense, FinancialReport
+
+BULK_BATCH_SIZE = 500
+
+
+def previous_month(today=None):
+    """First day of the calendar month before today's"""
+    today = today or timezone.localdate()
+    return date(today.year - 1, 12, 1) if today.month == 1 else date(today.year, today.month - 1, 1)
+
+
+def generate_monthly_reports(month=None):
+    """Write the missing monthly reports for the month starting `month` (last month by default); returns the number created"""
+    period_start = (month or previous_month()).replace(day=1)
+    period_end = period_start.replace(day=calendar.monthrange(period_start.year, period_start.month)[1])
+    period = f'{period_start:%B %Y}'
+
+    reported = FinancialReport.objects.filter(
+        report_type='monthly', period_start=period_start, period_end=period_end
+    ).values('project')
+    projects = (Project.objects.exclude(pk__in=reported)
+                .annotate(preparer=Coalesce('project_manager', 'manager'))
+                .values_list('pk', 'name', 'preparer'))
+    budgets = dict(
+        Budget.objects.filter(start_date__lte=period_end, end_date__gte=period_start)
+        .values('project').annotate(total=Sum('allocated_amount')).order_by().values_list('project', 'total')
+    )
+    expenses = dict(
+        Expense.objects.filter(UTILIZED_EXPENSES, date__range=[period_start, period_end])
+        .values('budget__project').annotate(total=Sum('amount')).order_by().values_list('budget__project', 'total')
+    )
+
+    reports = []
+    for project_id, name, preparer in projects:
+        total_budget = budgets.get(project_id) or Decimal('0')
+        total_expenses = expenses.get(project_id) or Decimal('0')
+        reports.append(FinancialReport(
+            project_id=project_id,
+            title=f'{name} - {period}',
+            report_type='monthly',
+            report_period=period,
+            period_start=period_start,
+            period_end=period_end,
+            total_budget=total_budget,
+            total_expenses=total_expenses,
+            # bulk_create skips FinancialReport.save, which derives these
+            balance=total_budget - total_expenses,
+            net_position=-total_expenses,
+            summary=f'Automated monthly report for {period_start} to {period_end}',
+            prepared_by_id=preparer,
+        ))
+    with transaction.atomic():
+        FinancialReport.objects.bulk_create(reports, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        # Reports a concurrent run wrote first were skipped; pks are set here, so count only ours
+        pks = [report.pk for report in reports]
+        return sum(
+            FinancialReport.objects.filter(pk__in=pks[start:start + BULK_BATCH_SIZE]).count()
+            for start in range(0, len(pks), BULK_BATCH_SIZE)
+        )
@@ -0,0 +1,11 @@
+# finances/signals.py
+# Keep Budget.utilized_amount in step with deleted expenses
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .budgets import utilization_changed
+from .models import Expense
+
+@receiver(post_delete, sender=Expense)
+def expense_deleted(sender, instance, **kwargs):
+    utilization_changed(instance.utilized_contribution(), None)
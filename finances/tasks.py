@@ -1,58 +1,83 @@
+import os
+import tempfile
 from celery import shared_task
+from django.core.files import File
 from django.core.mail import send_mail
-from django.db.models import Sum
 from django.utils import timezone
-from datetime import timedelta
-from .models import Budget, Expense
-from core.email_service import send_budget_alert_notification
+from core.export_import import DELTA_COMMIT_LAG
+from datetime import date, timedelta
+from django.db.models import Q
+from .alerts import send_budget_alerts
+from .reports import generate_monthly_reports
+from .models import ExportJob
+
+# A running job that reports no progress for this long is assumed lost with its worker and may be claimed again.
+# Progress reports stamp updated_at, so a long but healthy export is never reclaimed.
+EXPORT_JOB_STALE_AFTER = timedelta(minutes=30)
+
+def stale_export_jobs():
+    return Q(status='running', updated_at__lt=timezone.now() - EXPORT_JOB_STALE_AFTER)
 
 @shared_task
 def check_budget_utilization():
     """Check budget utilization and send alerts"""
-    budgets = Budget.objects.annotate(
-        expenses_total=Sum('expenses__amount')
-    ).filter(expenses_total__gt=0)
-    
-    for budget in budgets:
-        utilization = budget.utilization_percentage
-        
-        # Send alerts at different thresholds
-        if utilization >= 80:
-            send_budget_alert_notification(budget, threshold=80)
-        elif utilization >= 90:
-            send_budget_alert_notification(budget, threshold=90)
-        elif utilization >= 95:
-            send_budget_alert_notification(budget, threshold=95)
+    return send_budget_alerts()
+
+@shared_task
+def generate_monthly_financial_reports(month=None):
+    """Generate last month's financial reports for all projects; month is an optional ISO date in the month"""
+    return generate_monthly_reports(date.fromisoformat(month) if month else None)
 
 @shared_task
-def generate_monthly_financial_reports():
-    """Generate monthly financial reports for all projects"""
-    from .models import FinancialReport, Project
-    
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=30)
-    
-    for project in Project.objects.all():
-        total_budget = project.budgets.aggregate(Sum('allocated_amount'))['allocated_amount__sum'] or 0
-        total_expenses = Expense.objects.filter(
-            budget__project=project,
-            expense_date__range=[start_date, end_date]
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        FinancialReport.objects.create(
-            project=project,
-            report_period='monthly',
-            period_start=start_date,
-            period_end=end_date,
-            total_budget=total_budget,
-            total_expenses=total_expenses,
-            prepared_by=project.project_manager or project.created_by,
-            notes=f"Automated monthly report for {start_date} to {end_date}"
+def export_financial_data_async(job_id):
+    """Run an ExportJob: write the export to a temporary file chunk by chunk, then store it"""
+    # Claim the job atomically so a redelivered task cannot run it twice
+    now = timezone.now()
+    claimed = ExportJob.objects.filter(Q(status='pending') | stale_export_jobs(), pk=job_id).update(
+        status='running', started_at=now, processed_rows=0, updated_at=now
+    )
+    if not claimed:
+        return
+
+    job = ExportJob.objects.get(pk=job_id)
+    watermark = timezone.now()
+    try:
+        model = job.get_export_model()
+        queryset = job.get_queryset()
+        if job.since is not None:
+            queryset = queryset.filter(updated_at__gt=job.since - DELTA_COMMIT_LAG, updated_at__lte=watermark)
+        ExportJob.objects.filter(pk=job_id).update(total_rows=queryset.count(), updated_at=timezone.now())
+
+        def report_progress(rows):
+            # updated_at doubles as the heartbeat stale_export_jobs() checks; update() skips auto_now
+            ExportJob.objects.filter(pk=job_id).update(processed_rows=rows, updated_at=timezone.now())
+
+        with tempfile.TemporaryFile() as output:
+            model.write_export(
+                job.export_format, output, job.get_queryset(), progress=report_progress,
+                since=job.since, until=watermark
+            )
+            output.seek(0)
+            filename = f'{model.get_export_filename()}_{timezone.now():%Y%m%d_%H%M%S}.{job.export_format}'
+            job.file.save(filename, File(output), save=False)
+    except Exception as exc:
+        ExportJob.objects.filter(pk=job_id).update(
+            status='failed', error=str(exc), completed_at=timezone.now()
         )
+        raise
+
+    job.refresh_from_db(fields=['total_rows', 'processed_rows'])
+    job.status = 'completed'
+    job.processed_rows = job.total_rows
+    job.watermark = watermark
+    job.completed_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'processed_rows', 'watermark', 'completed_at', 'updated_at'])
+    return os.path.basename(job.file.name)
 
 @shared_task
-def export_financial_data_async(user_email, export_type, filters):
-    """Async task for large data exports"""
-    # This would generate the export and email it to the user
-    # Implementation depends on your specific export needs
-    pass
\ No newline at end of file
+def requeue_stale_export_jobs():
+    """Queue again the jobs whose worker died mid-export; returns the number queued"""
+    job_ids = list(ExportJob.objects.filter(stale_export_jobs()).values_list('pk', flat=True))
+    for job_id in job_ids:
+        export_financial_data_async.delay(str(job_id))
+    return len(job_ids)
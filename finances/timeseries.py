@@ -0,0 +1,94 @@
+"""
+Budget-vs-actual time series
+
+spend_timeseries buckets non-rejected expenses by day, week, month or
+quarter for each budget, expense category or project. Window sums in the
+database give each bucket's spend and the running total up to it. The
+running total covers all earlier spend, so buckets before `start` are
+fetched but not returned. The result is columnar: one array per field
+instead of one object per point.
+"""
+
+from datetime import timedelta
+from django.db.models import F, Sum, Window
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek
+from .budgets import UTILIZED_EXPENSES
+from .models import Budget, Expense
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+
+# Group -> (Expense key, Expense label, Budget key for allocations or None)
+GROUPS = {
+    'budget': ('budget', 'budget__name', 'pk'),
+    'project': ('budget__project', 'budget__project__name', 'project'),
+    'category': ('category', 'category', None),
+}
+
+
+def bucket_start(bucket, day):
+    """First day of the bucket containing `day`, as the database truncates it"""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    if bucket == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day
+
+
+def spend_timeseries(bucket='month', group_by='budget', projects=None, start=None, end=None):
+    """Spend and cumulative spend per bucket for each group, with the groups' allocations"""
+    key, label, budget_key = GROUPS[group_by]
+    period = BUCKETS[bucket]('date')
+    first = bucket_start(bucket, start) if start is not None else None
+
+    expenses = Expense.objects.filter(UTILIZED_EXPENSES)
+    budgets = Budget.objects.all()
+    if projects is not None:
+        expenses = expenses.filter(budget__project__in=projects)
+        budgets = budgets.filter(project__in=projects)
+    if end is not None:
+        # Later spend does not change earlier running totals
+        expenses = expenses.filter(date__lte=end)
+
+    rows = expenses.annotate(period=period).annotate(
+        spent=Window(Sum('amount'), partition_by=[F(key), F('period')]),
+        cumulative=Window(Sum('amount'), partition_by=[F(key)], order_by=F('period').asc()),
+    ).values_list(key, label, 'period', 'spent', 'cumulative').distinct().order_by(key, 'period')
+
+    groups = {}
+    if budget_key is not None:
+        labels = {'pk': 'name', 'project': 'project__name'}
+        for group, name, allocated in budgets.values(budget_key).annotate(
+            allocated=Sum('allocated_amount')
+        ).values_list(budget_key, labels[budget_key], 'allocated').order_by(labels[budget_key]):
+            groups[group] = (name, float(allocated))
+
+    points = {'group': [], 'period': [], 'spent': [], 'cumulative': []}
+    index = {group: position for position, group in enumerate(groups)}
+    for group, name, when, spent, cumulative in rows:
+        if group not in index:
+            index[group] = len(groups)
+            groups[group] = (name, None)
+        if first is not None and when < first:
+            continue
+        points['group'].append(index[group])
+        points['period'].append(when.isoformat())
+        points['spent'].append(float(spent))
+        points['cumulative'].append(float(cumulative))
+
+    return {
+        'bucket': bucket,
+        'group_by': group_by,
+        'groups': {
+            'id': [str(group) for group in groups],
+            'label': [name for name, allocated in groups.values()],
+            'allocated': [allocated for name, allocated in groups.values()],
+        },
+        'points': points,
+    }
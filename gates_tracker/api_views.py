@@ -8,6 +8,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import *
 from .serializers import *
+from .snapshots import SNAPSHOT_AGE_HEADER, latest_dashboard_snapshot, snapshot_age
 
 # Base Enterprise ViewSet with Common Functionality
 class EnterpriseViewSet(viewsets.ModelViewSet):
@@ -105,80 +106,9 @@ class DashboardViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        # Real data calculations
-        total_staff = EnterpriseUserProfile.objects.count()
-        active_staff = EnterpriseUserProfile.objects.filter(is_active=True).count()
-        total_farmers = Farmer.objects.count()
-        active_farmers = Farmer.objects.filter(is_active=True).count()
-        total_cbo_groups = CBOGroup.objects.count()
-        
-        today = timezone.now().date()
-        video_calls_today = VideoCallSession.objects.filter(
-            scheduled_start__date=today, 
-            status='completed'
-        ).count()
-        
-        training_sessions_this_month = TrainingSession.objects.filter(
-            session_date__month=today.month,
-            session_date__year=today.year
-        ).count()
-        
-        average_performance = StaffPerformance.objects.filter(
-            status='approved'
-        ).aggregate(avg_score=Avg('overall_score'))['avg_score'] or 0
-        
-        # Engagement rate calculation
-        engaged_farmers = Farmer.objects.filter(
-            last_engagement_date__gte=timezone.now() - timedelta(days=30)
-        ).count()
-        engagement_rate = (engaged_farmers / active_farmers * 100) if active_farmers > 0 else 0
-        
-        # Performance trend (last 7 days)
-        performance_trend = [85, 82, 88, 90, 87, 85, 89]  # Placeholder - would be real calculations
-        
-        # Engagement distribution
-        engagement_distribution = {
-            'Farmers': active_farmers,
-            'CBO Groups': total_cbo_groups,
-            'Active Projects': CBOGroup.objects.filter(is_active=True).count(),
-            'Training Sessions': training_sessions_this_month,
-        }
-        
-        # Recent activities
-        recent_activities = [
-            {
-                'module': 'Staff Performance',
-                'action': f'{active_staff} active staff members',
-                'time': 'Live'
-            },
-            {
-                'module': 'Farmer Engagement', 
-                'action': f'{active_farmers} farmers engaged',
-                'time': 'Live'
-            },
-            {
-                'module': 'Video Calls',
-                'action': f'{video_calls_today} calls completed today',
-                'time': 'Live'
-            },
-        ]
-        
-        stats = {
-            'total_staff': total_staff,
-            'active_staff': active_staff,
-            'total_farmers': total_farmers,
-            'active_farmers': active_farmers,
-            'total_cbo_groups': total_cbo_groups,
-            'video_calls_today': video_calls_today,
-            'training_sessions_this_month': training_sessions_this_month,
-            'average_performance_score': round(float(average_performance), 2),
-            'engagement_rate': round(engagement_rate, 2),
-            'performance_trend': performance_trend,
-            'engagement_distribution': engagement_distribution,
-            'recent_activities': recent_activities,
-        }
-        
-        return Response(stats)
+        # Served from the latest precomputed snapshot (see gates_tracker.snapshots)
+        snapshot = latest_dashboard_snapshot()
+        return Response(snapshot.metrics, headers={SNAPSHOT_AGE_HEADER: str(snapshot_age(snapshot))})
 
 # System Configuration API
 class SystemConfigurationViewSet(EnterpriseViewSet):
@@ -32,7 +32,8 @@ def debug_task(self):
 # --------------------------------------
 app.conf.update(
     broker_url=os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0'),
-    result_backend=os.getenv('CELERY_RESULT_BACKEND', 'django-db'),
+    # django-celery-results is not installed, so results are only stored when a backend is configured
+    result_backend=os.getenv('CELERY_RESULT_BACKEND'),
     accept_content=['json'],
     task_serializer='json',
     result_serializer='json',
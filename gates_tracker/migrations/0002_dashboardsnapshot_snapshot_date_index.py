@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gates_tracker', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='dashboardsnapshot',
+            options={'get_latest_by': 'snapshot_date'},
+        ),
+        migrations.AddIndex(
+            model_name='dashboardsnapshot',
+            index=models.Index(fields=['snapshot_date'], name='gates_track_snapsho_6a96c1_idx'),
+        ),
+    ]
@@ -148,6 +148,12 @@ class DashboardSnapshot(TimeStampedModel):
     def __str__(self):
         return f'Snapshot {self.snapshot_id} - {self.snapshot_date}'
 
+    class Meta:
+        get_latest_by = 'snapshot_date'
+        indexes = [
+            models.Index(fields=['snapshot_date']),
+        ]
+
 class AuditLog(TimeStampedModel):
     ACTION_TYPES = [
         ('create', 'Create'),
@@ -3,6 +3,7 @@ import dj_database_url
 from pathlib import Path
 from datetime import timedelta
 import sys
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -66,6 +67,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'staff_performance.middleware.ActiveDayMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,7 +94,7 @@ if 'DATABASE_URL' in os.environ:
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'gates_tracker' / 'templates'],
+        'DIRS': [BASE_DIR / 'gates_tracker' / 'templates', BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -118,6 +120,54 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Uploaded and generated files (export job downloads)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Celery - run tasks inline when no broker is available (local development, tests)
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+
+# Celery beat - rollups refreshed through the day and rebuilt nightly, dashboard snapshots and
+# stale export jobs every 15 minutes, staff KPIs recomputed nightly
+CELERY_BEAT_SCHEDULE = {
+    'refresh-rollups': {
+        'task': 'core.tasks.refresh_rollups_task',
+        'schedule': timedelta(minutes=15),
+    },
+    'rebuild-rollups': {
+        'task': 'core.tasks.refresh_rollups_task',
+        'schedule': crontab(hour=1, minute=30),
+        'kwargs': {'full': True},
+    },
+    'build-dashboard-snapshot': {
+        'task': 'gates_tracker.tasks.build_dashboard_snapshot_task',
+        'schedule': timedelta(minutes=15),
+    },
+    'requeue-stale-export-jobs': {
+        'task': 'finances.tasks.requeue_stale_export_jobs',
+        'schedule': timedelta(minutes=15),
+    },
+    'recompute-staff-kpis': {
+        'task': 'staff_performance.tasks.recompute_staff_kpis_task',
+        'schedule': crontab(hour=2, minute=0),
+    },
+}
+
+# Cache - Redis when REDIS_URL is set (production), process-local memory otherwise
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -0,0 +1,7 @@
+from celery import shared_task
+from .snapshots import build_dashboard_snapshot
+
+@shared_task
+def build_dashboard_snapshot_task():
+    """Refresh the enterprise dashboard snapshot (scheduled by celery beat)"""
+    return str(build_dashboard_snapshot().snapshot_id)
@@ -5,7 +5,8 @@ from django.conf.urls.static import static
 from .views import (
     professional_dashboard, system_health_check, root_view,
     staff_performance_dashboard, farmer_engagement_dashboard, video_calls_dashboard,
-    deployment_health_check  # Add this import
+    deployment_health_check,  # Add this import
+    dashboard_statistics
 )
 
 urlpatterns = [
@@ -13,6 +14,7 @@ urlpatterns = [
     path('sales/', include('sales.urls')),
     path('reports/', include('reports.urls')),
     path('accounts/', include('django.contrib.auth.urls')),
+    path('api/v1/', include('api.v1.urls')),
 
     # Enterprise Modules - Direct Dashboard Links
     path('staff-performance/', staff_performance_dashboard, name='staff_performance'),
@@ -22,6 +24,7 @@ urlpatterns = [
     # Core Application URLs
     path('', root_view, name='home'),
     path('dashboard/', professional_dashboard, name='dashboard'),
+    path('dashboard/statistics/', dashboard_statistics, name='dashboard_statistics'),
     path('health-check/', system_health_check, name='system_health_check'),
     path('deployment-health/', deployment_health_check, name='deployment_health'),  # Add this
 ]
@@ -1,8 +1,9 @@
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.db.models import Count, Avg, Q
+from django.contrib.auth.decorators import login_required
 from datetime import datetime, timedelta
 import random
+from .snapshots import SNAPSHOT_AGE_HEADER, latest_dashboard_snapshot, snapshot_age
 
 # Import your actual enterprise models
 HAS_ENTERPRISE_MODELS = False
@@ -16,62 +17,25 @@ except (ImportError, RuntimeError):
     HAS_ENTERPRISE_MODELS = False
 
 def get_real_enterprise_data():
-    'Get REAL data from your enterprise modules'
-
-    data = {
-        'active_staff': 0,
-        'farmers_engaged': 0,
-        'video_calls_today': 0,
-        'success_rate': 0,
-        'performance_trend': [],
-        'engagement_distribution': {},
-        'recent_activities': []
-    }
+    '''Get REAL data from your enterprise modules, as of the latest dashboard snapshot
 
+    Returns the data and the snapshot age in seconds (None for simulated data).
+    '''
     if HAS_ENTERPRISE_MODELS:
         try:
-            # REAL Staff Performance Data
-            data['active_staff'] = StaffMember.objects.filter(is_active=True).count()
-            avg_performance = PerformanceMetric.objects.aggregate(avg=Avg('productivity_score'))
-            data['success_rate'] = int(avg_performance['avg'] or 85)
-
-            # REAL Farmer Engagement Data
-            data['farmers_engaged'] = FarmerAttendance.objects.values('farmer').distinct().count()
-            cbo_groups = CBOGroup.objects.annotate(member_count=Count('members'))
-            data['engagement_distribution'] = {
-                'Farmers': data['farmers_engaged'],
-                'CBO Groups': cbo_groups.count(),
-                'Active Projects': cbo_groups.filter(is_active=True).count(),
-                'Training Sessions': FarmerAttendance.objects.count()
-            }
-
-            # REAL Video Calls Data
-            today = datetime.now().date()
-            data['video_calls_today'] = VideoCallSession.objects.filter(
-                start_time__date=today, status='completed'
-            ).count()
-
-            # Performance trend (last 7 days)
-            data['performance_trend'] = [random.randint(75, 95) for _ in range(7)]
-
-            # Recent activities from all modules
-            active_staff_str = str(data['active_staff'])
-            farmers_engaged_str = str(data['farmers_engaged']) 
-            video_calls_str = str(data['video_calls_today'])
-            
-            data['recent_activities'] = [
-                {'module': 'Staff Performance', 'action': f'{active_staff_str} active staff members', 'time': 'Live'},
-                {'module': 'Farmer Engagement', 'action': f'{farmers_engaged_str} farmers engaged', 'time': 'Live'},
-                {'module': 'Video Calls', 'action': f'{video_calls_str} calls today', 'time': 'Live'},
-            ]
-
+            snapshot = latest_dashboard_snapshot()
+            return snapshot.metrics, snapshot_age(snapshot)
         except Exception as e:
             # Fallback to simulated data if models aren't migrated yet
-            data = get_simulated_enterprise_data()
-    else:
-        data = get_simulated_enterprise_data()
+            pass
+    return get_simulated_enterprise_data(), None
 
-    return data
+def render_dashboard(request, template_name, context, age):
+    '''Render a dashboard, reporting how old its snapshot is'''
+    response = render(request, template_name, context)
+    if age is not None:
+        response[SNAPSHOT_AGE_HEADER] = str(age)
+    return response
 
 def get_simulated_enterprise_data():
     'Simulated data that mimics real enterprise patterns'
@@ -98,8 +62,17 @@ def get_simulated_enterprise_data():
 
 def professional_dashboard(request):
     'Main professional dashboard view'
-    data = get_real_enterprise_data()
-    return render(request, 'dashboard/professional_dashboard.html', {'dashboard_data': data})
+    data, age = get_real_enterprise_data()
+    return render_dashboard(request, 'dashboard/professional_dashboard.html', {'dashboard_data': data}, age)
+
+@login_required
+def dashboard_statistics(request):
+    'Enterprise statistics from the latest dashboard snapshot, as JSON'
+    data, age = get_real_enterprise_data()
+    response = JsonResponse(data)
+    if age is not None:
+        response[SNAPSHOT_AGE_HEADER] = str(age)
+    return response
 
 def fss_tracker_dashboard(request):
     'FSS Tracker Dashboard - alias for professional_dashboard'
@@ -120,31 +93,31 @@ def root_view(request):
 
 def staff_performance_dashboard(request):
     'Staff performance specific dashboard'
-    data = get_real_enterprise_data()
+    data, age = get_real_enterprise_data()
     staff_data = {
         'active_staff': data['active_staff'],
         'success_rate': data['success_rate'],
         'performance_trend': data['performance_trend']
     }
-    return render(request, 'dashboard/staff_performance.html', {'staff_data': staff_data})
+    return render_dashboard(request, 'dashboard/staff_performance.html', {'staff_data': staff_data}, age)
 
 def farmer_engagement_dashboard(request):
     'Farmer engagement specific dashboard'
-    data = get_real_enterprise_data()
+    data, age = get_real_enterprise_data()
     engagement_data = {
         'farmers_engaged': data['farmers_engaged'],
         'engagement_distribution': data['engagement_distribution']
     }
-    return render(request, 'dashboard/farmer_engagement.html', {'engagement_data': engagement_data})
+    return render_dashboard(request, 'dashboard/farmer_engagement.html', {'engagement_data': engagement_data}, age)
 
 def video_calls_dashboard(request):
     'Video calls specific dashboard'
-    data = get_real_enterprise_data()
+    data, age = get_real_enterprise_data()
     video_data = {
         'video_calls_today': data['video_calls_today'],
         'recent_activities': [activity for activity in data['recent_activities'] if activity['module'] == 'Video Calls']
     }
-    return render(request, 'dashboard/video_calls.html', {'video_data': video_data})
+    return render_dashboard(request, 'dashboard/video_calls.html', {'video_data': video_data}, age)
 
 def deployment_health_check(request):
     '''Comprehensive health check for deployment troubleshooting'''
@@ -1,6 +1,7 @@
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets
+from core.export_import import export_since
 from ..models import PerformanceIndicator
 from .serializers import PerformanceIndicatorSerializer
 
@@ -10,8 +11,8 @@ class PerformanceIndicatorViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return PerformanceIndicator.export_to_csv()
+        return PerformanceIndicator.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return PerformanceIndicator.export_to_excel()
+        return PerformanceIndicator.export_to_excel(since=export_since(request))
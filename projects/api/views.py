@@ -2,7 +2,7 @@ from rest_framework.decorators import action, permission_classes, api_view
 from rest_framework.response import Response
 from rest_framework import viewsets, status, permissions
 from django.http import HttpResponse
-import pandas as pd
+from core.export_import import export_since
 from ..models import Project
 from .serializers import ProjectSerializer
 
@@ -10,12 +10,12 @@ from .serializers import ProjectSerializer
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def public_export_csv(request):
-    return Project.export_to_csv()
+    return Project.export_to_csv(since=export_since(request))
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def public_export_excel(request):
-    return Project.export_to_excel()
+    return Project.export_to_excel(since=export_since(request))
 
 class ProjectViewSet(viewsets.ModelViewSet):
     queryset = Project.objects.all()
@@ -25,12 +25,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
         # Export projects to CSV (requires authentication)
-        return Project.export_to_csv()
+        return Project.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
         # Export projects to Excel (requires authentication)
-        return Project.export_to_excel()
+        return Project.export_to_excel(since=export_since(request))
 
     @action(detail=False, methods=['post'])
     def import_csv(self, request):
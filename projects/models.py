@@ -73,6 +73,24 @@ class Project(TimeStampedModel, CustomExportMixin):
             models.Index(fields=['country']),
         ]
 
+    export_columns = [
+        ('Code', 'code'),
+        ('Name', 'name'),
+        ('Status', 'status'),
+        ('Priority', 'priority'),
+        ('Budget', 'budget'),
+        ('Currency', 'currency'),
+        ('Start Date', 'start_date'),
+        ('End Date', 'end_date'),
+        ('Progress', 'progress'),
+        ('Country', 'country'),
+        ('Region', 'region'),
+        ('District', 'district'),
+        ('Donor', 'donor'),
+        ('Implementing Partner', 'implementing_partner'),
+        ('Project Manager', 'project_manager__username'),
+    ]
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
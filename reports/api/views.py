@@ -1,6 +1,7 @@
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets
+from core.export_import import export_since
 from ..models import MonitoringVisit, Report
 from .serializers import MonitoringVisitSerializer, ReportSerializer
 
@@ -10,11 +11,11 @@ class MonitoringVisitViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return MonitoringVisit.export_to_csv()
+        return MonitoringVisit.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return MonitoringVisit.export_to_excel()
+        return MonitoringVisit.export_to_excel(since=export_since(request))
 
 class ReportViewSet(viewsets.ModelViewSet):
     queryset = Report.objects.all()
@@ -22,8 +23,8 @@ class ReportViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        return Report.export_to_csv()
+        return Report.export_to_csv(since=export_since(request))
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        return Report.export_to_excel()
+        return Report.export_to_excel(since=export_since(request))
@@ -0,0 +1,55 @@
+from django.conf import settings
+from rest_framework import serializers
+from farmers.models import Location
+from sales.models import Customer, Product, Sale, SaleBatch, SaleItem
+
+MAX_BATCH_SALES = getattr(settings, 'SALES_BATCH_MAX_SALES', 500)
+
+class BulkSaleItemSerializer(serializers.ModelSerializer):
+    product = serializers.UUIDField()
+
+    class Meta:
+        model = SaleItem
+        fields = ['product', 'quantity', 'unit_price']
+
+class BulkSaleSerializer(serializers.ModelSerializer):
+    customer = serializers.UUIDField(required=False, allow_null=True)
+    sale_location = serializers.UUIDField(required=False, allow_null=True)
+    sales_channel = serializers.ChoiceField(choices=Sale._meta.get_field('sales_channel').choices, default='field')
+    items = BulkSaleItemSerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = Sale
+        fields = ['customer', 'sale_date', 'payment_method', 'status', 'sales_channel', 'sale_location',
+                  'discount_amount', 'tax_amount', 'notes', 'items']
+
+class SaleBatchKeySerializer(serializers.Serializer):
+    batch_key = serializers.CharField(max_length=SaleBatch._meta.get_field('batch_key').max_length)
+
+class SaleBatchSerializer(SaleBatchKeySerializer):
+    sales = BulkSaleSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_SALES)
+
+    def validate(self, attrs):
+        # Resolve every referenced row with one query per model
+        sales = attrs['sales']
+        references = {
+            'customer': (Customer, {sale['customer'] for sale in sales if sale.get('customer')}),
+            'sale_location': (Location, {sale['sale_location'] for sale in sales if sale.get('sale_location')}),
+            'product': (Product, {item['product'] for sale in sales for item in sale['items']}),
+        }
+        found = {}
+        for field, (model, ids) in references.items():
+            found[field] = model.objects.in_bulk(ids)
+            missing = ids - found[field].keys()
+            if missing:
+                raise serializers.ValidationError(
+                    {field: [f'Unknown {field.replace("_", " ")}: {pk}' for pk in sorted(map(str, missing))]}
+                )
+
+        for sale in sales:
+            for field in ('customer', 'sale_location'):
+                if sale.get(field):
+                    sale[field] = found[field][sale[field]]
+            for item in sale['items']:
+                item['product'] = found['product'][item['product']]
+        return attrs
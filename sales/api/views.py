@@ -0,0 +1,30 @@
+from rest_framework import viewsets, permissions, status
+from rest_framework.response import Response
+from sales.ingestion import ingest_sales_batch
+from sales.models import SaleBatch
+from .serializers import SaleBatchKeySerializer, SaleBatchSerializer
+
+class SaleBatchViewSet(viewsets.GenericViewSet):
+    """Offline sales synced by field agents; resubmitting a batch key returns the stored batch"""
+    queryset = SaleBatch.objects.all()
+    serializer_class = SaleBatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def create(self, request):
+        # A replayed batch is answered before its sales are validated again
+        key = SaleBatchKeySerializer(data=request.data)
+        key.is_valid(raise_exception=True)
+        batch = SaleBatch.objects.filter(batch_key=key.validated_data['batch_key']).first()
+        created = False
+        if batch is None:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            batch, created = ingest_sales_batch(
+                serializer.validated_data['batch_key'], serializer.validated_data['sales'], user=request.user
+            )
+        return Response({
+            'batch_key': batch.batch_key,
+            'sales_count': batch.sales_count,
+            'sale_numbers': list(batch.sales.order_by('sale_number').values_list('sale_number', flat=True)),
+            'created': created,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
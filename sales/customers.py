@@ -0,0 +1,76 @@
+"""
+Customer running totals
+
+total_purchases, paid_sales_count and average_order_value cover a customer's
+paid sales. Sale.save moves them with one UPDATE when a sale enters or
+leaves the paid status (or a paid sale changes amount or customer), so a
+checkout costs the same however long the customer's history is. Item changes
+on a paid sale move them through sales.totals.add_to_sale_totals.
+recompute_customer_metrics rebuilds them from one grouped aggregate, for
+backfills.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.utils import timezone
+from .models import Customer, Sale
+
+BULK_BATCH_SIZE = 500
+
+
+def apply_paid_sales(customer_id, amount, count):
+    """Move a customer's totals by `amount` over `count` paid sales"""
+    total = F('total_purchases') + amount
+    sales = F('paid_sales_count') + count
+    Customer.objects.filter(pk=customer_id).update(
+        total_purchases=total,
+        paid_sales_count=sales,
+        # Expressions read the pre-update columns, so the new values are spelt out
+        average_order_value=Case(
+            When(paid_sales_count__gt=-count, then=total / sales),
+            default=Value(Decimal('0')),
+            output_field=DecimalField(),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def paid_sale_changed(before, after):
+    """Apply the change in a sale's paid contribution, each a (customer pk, amount) or None"""
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for contribution, sign in ((before, -1), (after, 1)):
+        if contribution and contribution[0] is not None:
+            customer_id, amount = contribution
+            deltas[customer_id][0] += sign * Decimal(amount)
+            deltas[customer_id][1] += sign
+    for customer_id, (amount, count) in deltas.items():
+        if amount or count:
+            apply_paid_sales(customer_id, amount, count)
+
+
+def recompute_customer_metrics(customer_ids=None):
+    """Rebuild the totals of these customers (all by default); returns the number corrected"""
+    customers = Customer.objects.all() if customer_ids is None else Customer.objects.filter(pk__in=customer_ids)
+    paid = {
+        row['customer']: row
+        for row in Sale.objects.filter(status='paid', customer__in=customers)
+        .values('customer').annotate(total=Sum('final_amount'), count=Count('id')).order_by()
+    }
+
+    now = timezone.now()
+    changed = []
+    for customer in customers.only('total_purchases', 'paid_sales_count', 'average_order_value'):
+        row = paid.get(customer.pk, {'total': Decimal('0'), 'count': 0})
+        total = Decimal(row['total'] or 0).quantize(Decimal('0.01'))
+        average = (total / row['count']).quantize(Decimal('0.01')) if row['count'] else Decimal('0')
+        if (customer.total_purchases, customer.paid_sales_count, customer.average_order_value) != (total, row['count'], average):
+            customer.total_purchases, customer.paid_sales_count, customer.average_order_value = total, row['count'], average
+            customer.updated_at = now  # bulk_update skips auto_now
+            changed.append(customer)
+
+    Customer.objects.bulk_update(
+        changed, ['total_purchases', 'paid_sales_count', 'average_order_value', 'updated_at'],
+        batch_size=BULK_BATCH_SIZE
+    )
+    return len(changed)
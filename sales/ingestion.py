@@ -0,0 +1,66 @@
+"""
+Bulk sales ingestion
+
+Field agents sync offline sales in batches. A batch is written with a fixed
+number of statements however many sales it holds: one block of sale numbers,
+one INSERT for the sales and one for their items, one stock UPDATE per
+product and one metrics UPDATE per customer. The client's batch key is
+stored on a SaleBatch row in the same transaction, so a resubmitted batch
+returns the original result instead of creating the sales twice.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from core.sequences import document_numbers
+from .customers import apply_paid_sales
+from .inventory import record_movements
+from .models import Sale, SaleBatch, SaleItem
+
+
+def ingest_sales_batch(batch_key, sales, user=None):
+    """Create a batch of validated sales in bulk; returns (SaleBatch, created)
+
+    Each sale is a dict of Sale field values plus `items`, a list of dicts
+    with product, quantity and unit_price. Related objects are instances.
+    A sale without a sale_date is dated now; offline sales carry their own.
+    """
+    existing = SaleBatch.objects.filter(batch_key=batch_key).first()
+    if existing:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            batch = SaleBatch.objects.create(batch_key=batch_key, created_by=user, sales_count=len(sales))
+            new_sales, new_items = [], []
+            for number, data in zip(document_numbers(Sale, 'sale_number', 'SALE', count=len(sales)), sales):
+                data = dict(data)
+                items = [SaleItem(**item) for item in data.pop('items')]
+                sale = Sale(sale_number=number, batch=batch, created_by=user, updated_by=user, **data)
+                sale.total_amount = sum((item.line_total for item in items), Decimal('0'))
+                sale.final_amount = sale.total_amount - sale.discount_amount + sale.tax_amount
+                for item in items:
+                    item.sale = sale
+                    item.capture_product_attributes()
+                new_sales.append(sale)
+                new_items.extend(items)
+
+            Sale.objects.bulk_create(new_sales)
+            SaleItem.objects.bulk_create(new_items)
+            record_movements([item.stock_movement() for item in new_items])
+
+            paid = defaultdict(lambda: [Decimal('0'), 0])
+            for sale in new_sales:
+                contribution = sale.paid_contribution()
+                if contribution and contribution[0] is not None:
+                    paid[contribution[0]][0] += contribution[1]
+                    paid[contribution[0]][1] += 1
+            for customer_id, (amount, count) in paid.items():
+                apply_paid_sales(customer_id, amount, count)
+    except IntegrityError:
+        # A concurrent submission of the same batch got there first
+        existing = SaleBatch.objects.filter(batch_key=batch_key).first()
+        if existing is None:
+            raise
+        return existing, False
+    return batch, True
@@ -0,0 +1,115 @@
+"""
+Inventory ledger
+
+Every change to a product's stock is appended to StockMovement and applied
+to Product.current_stock with an F() increment in the same transaction, so
+concurrent sales cannot overwrite each other's stock levels. The ledger is
+the source of truth: reconcile_stock rebuilds current_stock from it.
+Product.save records stock set on a product as an opening balance or
+adjustment, and sale item edits and deletes write compensating movements.
+Purchase items are squared against their own ledger entries instead
+(sync_purchase_stock), as their stock depends on the purchase's status too.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Product, SaleItem, StockMovement
+from .totals import recompute_sale_totals
+
+
+def record_movements(movements):
+    """Append movements to the ledger and apply them with one UPDATE per product"""
+    deltas = defaultdict(Decimal)
+    for movement in movements:
+        deltas[movement.product_id] += movement.quantity
+
+    now = timezone.now()  # update() skips auto_now; delta exports read updated_at
+    with transaction.atomic():
+        StockMovement.objects.bulk_create(movements)
+        # Lock products in key order, so two multi-product updates cannot deadlock each other
+        for product_id, delta in sorted(deltas.items()):
+            Product.objects.filter(pk=product_id).update(current_stock=F('current_stock') + delta, updated_at=now)
+
+
+def catalogue_products(items):
+    """{(name, category pk): product pk} for the catalogue products purchase items are named after"""
+    products = (Product.objects.filter(name__in={item.product_name for item in items},
+                                       product_category__in={item.product_category_id for item in items})
+                .order_by('pk').values_list('name', 'product_category_id', 'pk'))
+    found = {}
+    for name, category_id, product_id in products:
+        found.setdefault((name, category_id), product_id)
+    return found
+
+
+def sync_purchase_stock(items, received, note='', deleted=False):
+    """Move stock so each purchase item holds its quantity of its catalogue product if received, and none otherwise
+
+    Compares against the movements already posted for the items, so product,
+    quantity and status changes all move just the difference. Purchases of
+    products not in the catalogue are kept as records only. Deleted items'
+    movements are not linked to them, as the link is cleared on delete.
+    """
+    posted = defaultdict(Decimal)
+    rows = (StockMovement.objects.filter(purchase_item__in=[item.pk for item in items])
+            .values('purchase_item', 'product').annotate(total=Sum('quantity'))
+            .values_list('purchase_item', 'product', 'total'))
+    for item_id, product_id, total in rows:
+        posted[item_id, product_id] += total
+
+    wanted = defaultdict(Decimal)
+    if received:
+        products = catalogue_products(items)
+        for item in items:
+            product_id = products.get((item.product_name, item.product_category_id))
+            if product_id is not None:
+                wanted[item.pk, product_id] += item.quantity
+
+    movements = [
+        StockMovement(product_id=product_id, quantity=wanted[item_id, product_id] - posted[item_id, product_id],
+                      reason='purchase', purchase_item_id=None if deleted else item_id, note=note)
+        for item_id, product_id in posted.keys() | wanted.keys()
+        if wanted[item_id, product_id] != posted[item_id, product_id]
+    ]
+    if movements:
+        record_movements(movements)
+
+
+def create_sale_items(sale, items):
+    """Create a sale's items in one INSERT, take them out of stock and total the sale; items are unsaved SaleItems"""
+    products = Product.objects.in_bulk({item.product_id for item in items})
+    for item in items:
+        item.sale = sale
+        item.product = products[item.product_id]
+        item.capture_product_attributes()
+
+    with transaction.atomic():
+        SaleItem.objects.bulk_create(items)
+        record_movements([item.stock_movement() for item in items])
+        # bulk_create skips the signals that keep the totals current
+        recompute_sale_totals([sale.pk])
+    return items
+
+
+def ledger_stock():
+    """Product.current_stock as rebuilt from the ledger"""
+    movements = (StockMovement.objects.filter(product=OuterRef('pk'))
+                 .values('product').annotate(total=Sum('quantity')).values('total'))
+    return Coalesce(Subquery(movements), Decimal('0'))
+
+
+def stock_drift():
+    """Products whose current_stock differs from their ledger, annotated with ledger_stock"""
+    return Product.objects.annotate(ledger_stock=ledger_stock()).filter(~Q(current_stock=F('ledger_stock')))
+
+
+def reconcile_stock():
+    """Reset drifted products' current_stock to their ledger total; returns the number changed"""
+    with transaction.atomic():
+        drifted = list(stock_drift().select_for_update().values_list('pk', flat=True))
+        Product.objects.filter(pk__in=drifted).update(current_stock=ledger_stock(), updated_at=timezone.now())
+    return len(drifted)
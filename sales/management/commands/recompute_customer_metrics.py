@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from sales.customers import recompute_customer_metrics
+
+class Command(BaseCommand):
+    help = "Rebuild every customer's paid-sale totals from one grouped aggregate"
+
+    def handle(self, *args, **options):
+        corrected = recompute_customer_metrics()
+        self.stdout.write(self.style.SUCCESS(f'Corrected metrics for {corrected} customers'))
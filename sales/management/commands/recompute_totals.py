@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from sales.totals import recompute_purchase_totals, recompute_sale_totals
+
+class Command(BaseCommand):
+    help = 'Recompute every sale and purchase total from its items with one UPDATE each'
+
+    def handle(self, *args, **options):
+        sales = recompute_sale_totals()
+        purchases = recompute_purchase_totals()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed totals for {sales} sales and {purchases} purchases'))
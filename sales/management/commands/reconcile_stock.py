@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from sales.inventory import reconcile_stock, stock_drift
+
+class Command(BaseCommand):
+    help = 'Rebuild Product.current_stock from the stock movement ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report products whose stock has drifted')
+
+    def handle(self, *args, **options):
+        drifted = stock_drift().values_list('name', 'current_stock', 'ledger_stock')
+        for name, current, ledger in drifted:
+            self.stdout.write(f'{name}: stock {current}, ledger {ledger}')
+        if options['check']:
+            self.stdout.write(f'{len(drifted)} products drifted from the ledger')
+            return
+
+        fixed = reconcile_stock()
+        self.stdout.write(self.style.SUCCESS(f'Reset stock for {fixed} products from the ledger'))
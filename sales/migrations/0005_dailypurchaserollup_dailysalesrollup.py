@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmers', '0003_add_location_to_farmplot'),
+        ('sales', '0004_alter_purchaseitem_purchase_alter_saleitem_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPurchaseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('purchases_count', models.PositiveIntegerField(default=0)),
+                ('purchase_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('channel', models.CharField(max_length=20)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='farmers.location')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'channel'], name='sales_daily_day_250e95_idx')],
+            },
+        ),
+    ]
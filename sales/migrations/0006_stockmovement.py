@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:52
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    # Existing stock becomes the first ledger entry, so the ledger sums to current_stock
+    Product = apps.get_model('sales', 'Product')
+    StockMovement = apps.get_model('sales', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        StockMovement(product_id=pk, quantity=stock, reason='opening')
+        for pk, stock in Product.objects.exclude(current_stock=0).values_list('pk', 'current_stock')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_dailypurchaserollup_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Positive into stock, negative out', max_digits=10)),
+                ('reason', models.CharField(choices=[('opening', 'Opening Balance'), ('sale', 'Sale'), ('purchase', 'Purchase'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='sales.product')),
+                ('purchase_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='sales.purchaseitem')),
+                ('sale_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='sales.saleitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'created_at'], name='sales_stock_product_3fbe1d_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_paid_sales(apps, schema_editor):
+    Customer = apps.get_model('sales', 'Customer')
+    Sale = apps.get_model('sales', 'Sale')
+    paid = (Sale.objects.filter(customer=OuterRef('pk'), status='paid')
+            .values('customer').annotate(count=Count('id')).values('count'))
+    Customer.objects.update(paid_sales_count=Coalesce(Subquery(paid), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_stockmovement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='paid_sales_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_paid_sales, migrations.RunPython.noop),
+    ]
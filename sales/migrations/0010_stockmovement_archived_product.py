@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0009_sale_date_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='archived_product',
+            field=models.CharField(blank=True, help_text='SKU and name of the deleted product', max_length=300),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='sales.product'),
+        ),
+    ]
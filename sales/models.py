@@ -1,10 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.conf import settings
 from django.core.validators import MinValueValidator
-from django.db.models import Sum, Count, Avg
+from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 from core.models import TimeStampedModel, AuditModel
-from core.export_import import CustomExportMixin
+from core.export_import import CustomExportMixin, format_datetime, parquet_response, stream_csv
+from core.sequences import document_numbers
 
 class Customer(AuditModel, CustomExportMixin):
     """Centralized customer management with demographic tracking"""
@@ -45,6 +48,7 @@ class Customer(AuditModel, CustomExportMixin):
     preferred_categories = models.CharField(max_length=500, blank=True, null=True, help_text='Comma-separated preferred product categories')
     average_order_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_purchases = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    paid_sales_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.name} ({self.phone_number})"
@@ -54,46 +58,24 @@ class Customer(AuditModel, CustomExportMixin):
         return self.sales.count()
 
     def update_customer_metrics(self):
-        """Update customer metrics based on sales data"""
-        sales = self.sales.filter(status='paid')
-        if sales.exists():
-            self.total_purchases = sum(sale.final_amount for sale in sales)
-            self.average_order_value = self.total_purchases / sales.count()
-            self.save()
-
-    @classmethod
-    def export_to_csv(cls):
-        """Export customers with comprehensive data"""
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="customers.csv"'
-        writer = csv.writer(response)
-
-        headers = [
-            'Customer Name', 'Phone Number', 'Gender', 'Age Range', 'Email',
-            'Location', 'Customer Since', 'Loyalty Tier', 'Total Purchases',
-            'Average Order Value', 'Purchase Count'
-        ]
-        writer.writerow(headers)
-
-        for customer in cls.objects.all():
-            writer.writerow([
-                customer.name,
-                customer.phone_number,
-                customer.gender,
-                customer.age_range,
-                customer.email or '',
-                customer.location.name if customer.location else '',
-                customer.customer_since.strftime('%Y-%m-%d'),
-                customer.loyalty_tier,
-                customer.total_purchases,
-                customer.average_order_value,
-                customer.purchase_count
-            ])
-
-        return response
+        """Recompute customer metrics from the paid sales; they are normally kept current by Sale.save"""
+        from .customers import recompute_customer_metrics
+        recompute_customer_metrics([self.pk])
+        self.refresh_from_db(fields=['total_purchases', 'paid_sales_count', 'average_order_value', 'updated_at'])
+
+    export_columns = [
+        ('Customer Name', 'name'),
+        ('Phone Number', 'phone_number'),
+        ('Gender', 'gender'),
+        ('Age Range', 'age_range'),
+        ('Email', 'email'),
+        ('Location', 'location__name'),
+        ('Customer Since', 'customer_since'),
+        ('Loyalty Tier', 'loyalty_tier'),
+        ('Total Purchases', 'total_purchases'),
+        ('Average Order Value', 'average_order_value'),
+        ('Purchase Count', Count('sales')),
+    ]
 
 class ProductCategory(TimeStampedModel, CustomExportMixin):
     """Hierarchical product categorization"""
@@ -101,6 +83,15 @@ class ProductCategory(TimeStampedModel, CustomExportMixin):
     description = models.TextField(blank=True, null=True)
     parent_category = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True)
 
+    export_filename = 'product_categories'
+    export_columns = [
+        ('Name', 'name'),
+        ('Description', 'description'),
+        ('Parent Category', 'parent_category__name'),
+        ('Created', 'created_at', format_datetime),
+        ('Updated', 'updated_at', format_datetime),
+    ]
+
     def __str__(self):
         return self.name
 
@@ -143,6 +134,34 @@ class Product(TimeStampedModel, CustomExportMixin):
     is_active = models.BooleanField(default=True)
     sku = models.CharField(max_length=50, unique=True, help_text='Stock Keeping Unit')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        product = super().from_db(db, field_names, values)
+        product._loaded_stock = product.__dict__.get('current_stock')
+        return product
+
+    def save(self, *args, **kwargs):
+        # Stock set here rather than through sales.inventory goes into the ledger
+        # as an opening balance or adjustment, so reconcile_stock keeps it
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'current_stock' not in update_fields:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            stored = None if self._state.adding else (
+                Product.objects.select_for_update().filter(pk=self.pk).values_list('current_stock', flat=True).first()
+            )
+            if stored is not None and getattr(self, '_loaded_stock', None) == self.current_stock:
+                # Not edited; a stale copy must not undo movements since it was loaded
+                self.current_stock = stored
+            super().save(*args, **kwargs)
+            self._loaded_stock = self.current_stock
+            change = self.current_stock - (stored or 0)
+            if change:
+                StockMovement.objects.create(
+                    product=self, quantity=change, reason='opening' if stored is None else 'adjustment',
+                    note='Set on the product'
+                )
+
     def __str__(self):
         attributes = []
         if self.brand: attributes.append(self.brand)
@@ -170,6 +189,31 @@ class Product(TimeStampedModel, CustomExportMixin):
         if self.size: attributes.append(self.size)
         return ', '.join(attributes) if attributes else 'N/A'
 
+    export_columns = [
+        ('SKU', 'sku'),
+        ('Name', 'name'),
+        ('Category', 'product_category__name'),
+        ('Attributes', 'attribute_name'),
+        ('Unit Measure', 'unit_measure'),
+        ('Cost Price', 'cost_price'),
+        ('Selling Price', 'selling_price'),
+        ('Current Stock', 'current_stock'),
+        ('Minimum Stock', 'minimum_stock'),
+        ('Active', 'is_active'),
+    ]
+
+class SaleBatch(TimeStampedModel):
+    """A batch of offline sales ingested in bulk; its client key makes a resubmission a no-op (see sales.ingestion)"""
+    batch_key = models.CharField(max_length=100, unique=True, help_text='Client-supplied idempotency key')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    sales_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.batch_key} ({self.sales_count} sales)'
+
+    class Meta:
+        verbose_name_plural = 'Sale Batches'
+
 class Sale(AuditModel, CustomExportMixin):
     """Comprehensive sales tracking with business intelligence"""
     PAYMENT_METHODS = [
@@ -190,7 +234,8 @@ class Sale(AuditModel, CustomExportMixin):
 
     # Core Sale Information
     customer = models.ForeignKey(Customer, on_delete=models.PROTECT, related_name='sales', null=True, blank=True)
-    sale_date = models.DateTimeField(auto_now_add=True)
+    # Set by the client for sales recorded offline (see sales.ingestion)
+    sale_date = models.DateTimeField(default=timezone.now)
     sale_number = models.CharField(max_length=50, unique=True)
 
     # Transaction Details
@@ -212,29 +257,33 @@ class Sale(AuditModel, CustomExportMixin):
         ('field', 'Field Sales'),
         ('agent', 'Sales Agent'),
     ], default='store')
+    batch = models.ForeignKey(SaleBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
 
     def save(self, *args, **kwargs):
         # Auto-generate sale number if not set
         if not self.sale_number:
-            from django.utils import timezone
-            date_str = timezone.now().strftime('%Y%m%d')
-            last_sale = Sale.objects.filter(sale_number__startswith=f'SALE-{date_str}').order_by('-sale_number').first()
-            if last_sale:
-                last_num = int(last_sale.sale_number.split('-')[-1])
-                self.sale_number = f'SALE-{date_str}-{last_num + 1:04d}'
-            else:
-                self.sale_number = f'SALE-{date_str}-0001'
-
-        # Auto-calculate totals
-        if hasattr(self, 'items'):
-            self.total_amount = sum(item.line_total for item in self.items.all())
+            self.sale_number = document_numbers(Sale, 'sale_number', 'SALE')[0]
+
+        from .customers import paid_sale_changed
+        from .totals import items_total
+        with transaction.atomic():
+            # Lock the stored row so a concurrent save cannot apply the same paid state change
+            stored = None if self._state.adding else (
+                Sale.objects.select_for_update().filter(pk=self.pk).values_list('status', 'customer_id', 'final_amount').first()
+            )
+            previous = stored[1:] if stored and stored[0] == 'paid' else None
+
+            # Auto-calculate totals with one aggregate over the stored items; a new sale has none
+            self.total_amount = Decimal('0') if self._state.adding else items_total(self.items.all())
             self.final_amount = self.total_amount - self.discount_amount + self.tax_amount
 
-        super().save(*args, **kwargs)
+            # Move the customer's running totals when the sale enters or leaves the paid status
+            super().save(*args, **kwargs)
+            paid_sale_changed(previous, self.paid_contribution())
 
-        # Update customer metrics when sale is completed
-        if self.status == 'paid':
-            self.customer.update_customer_metrics()
+    def paid_contribution(self):
+        """(customer pk, amount) this sale adds to its customer's totals, or None unless it is paid"""
+        return (self.customer_id, self.final_amount) if self.status == 'paid' else None
 
     def __str__(self):
         return f'{self.sale_number} - {self.customer.name}'
@@ -245,93 +294,67 @@ class Sale(AuditModel, CustomExportMixin):
 
     @classmethod
     def get_sales_metrics(cls):
-        """Get comprehensive sales metrics"""
-        today = timezone.now()
-        last_30_days = today - timedelta(days=30)
-
+        """Get comprehensive sales metrics, from the daily rollup when it is fresh"""
+        from core.rollups import rollup_is_fresh
+
+        last_30_days = timezone.localdate() - timedelta(days=30)
+        if rollup_is_fresh('sales'):
+            totals = DailySalesRollup.objects.aggregate(
+                total_sales=Sum('sales_count'),
+                total_revenue=Sum('revenue'),
+                recent_sales_count=Sum('sales_count', filter=Q(day__gte=last_30_days)),
+                recent_revenue=Sum('revenue', filter=Q(day__gte=last_30_days)),
+            )
+        else:
+            totals = cls.objects.filter(status='paid').aggregate(
+                total_sales=Count('id'),
+                total_revenue=Sum('final_amount'),
+                recent_sales_count=Count('id', filter=Q(sale_date__date__gte=last_30_days)),
+                recent_revenue=Sum('final_amount', filter=Q(sale_date__date__gte=last_30_days)),
+            )
+
+        total_sales = totals['total_sales'] or 0
+        total_revenue = totals['total_revenue'] or 0
         metrics = {
-            'total_sales': cls.objects.filter(status='paid').count(),
-            'total_revenue': cls.objects.filter(status='paid').aggregate(Sum('final_amount'))['final_amount__sum'] or 0,
-            'average_sale_value': cls.objects.filter(status='paid').aggregate(Avg('final_amount'))['final_amount__avg'] or 0,
-            'recent_sales_count': cls.objects.filter(sale_date__gte=last_30_days, status='paid').count(),
-            'recent_revenue': cls.objects.filter(sale_date__gte=last_30_days, status='paid').aggregate(Sum('final_amount'))['final_amount__sum'] or 0,
+            'total_sales': total_sales,
+            'total_revenue': total_revenue,
+            'average_sale_value': total_revenue / total_sales if total_sales else 0,
+            'recent_sales_count': totals['recent_sales_count'] or 0,
+            'recent_revenue': totals['recent_revenue'] or 0,
         }
         return metrics
 
+    export_columns = [
+        ('Sale Number', 'sale_number'),
+        ('Sale Date', 'sale_date', format_datetime),
+        ('Customer Name', 'customer__name'),
+        ('Customer Phone', 'customer__phone_number'),
+        ('Customer Gender', 'customer__gender'),
+        ('Customer Age Range', 'customer__age_range'),
+        ('Payment Method', 'payment_method'),
+        ('Status', 'status'),
+        ('Total Amount', 'total_amount'),
+        ('Tax Amount', 'tax_amount'),
+        ('Discount Amount', 'discount_amount'),
+        ('Final Amount', 'final_amount'),
+        ('Item Count', Count('items')),
+        ('Sale Location', 'sale_location__name'),
+        ('Sales Channel', 'sales_channel'),
+    ]
+
     @classmethod
-    def export_to_csv(cls):
-        """Export comprehensive sales data"""
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="sales.csv"'
-        writer = csv.writer(response)
-
-        headers = [
-            'Sale Number', 'Sale Date', 'Customer Name', 'Customer Phone', 'Customer Gender',
-            'Customer Age Range', 'Payment Method', 'Status', 'Total Amount', 'Tax Amount',
-            'Discount Amount', 'Final Amount', 'Item Count', 'Sale Location', 'Sales Channel'
-        ]
-        writer.writerow(headers)
-
-        for sale in cls.objects.all().select_related('customer', 'sale_location'):
-            writer.writerow([
-                sale.sale_number,
-                sale.sale_date.strftime('%Y-%m-%d %H:%M'),
-                sale.customer.name,
-                sale.customer.phone_number,
-                sale.customer.gender,
-                sale.customer.age_range,
-                sale.payment_method,
-                sale.status,
-                sale.total_amount,
-                sale.tax_amount,
-                sale.discount_amount,
-                sale.final_amount,
-                sale.item_count,
-                sale.sale_location.name if sale.sale_location else '',
-                sale.sales_channel
-            ])
-
-        return response
+    def export_sales_records_csv(cls, since=None):
+        """Export sales records with exact requested headlines, one row per item"""
+        items = SaleItem.objects.order_by('sale_id')
+        return stream_csv(items, SaleItem.sales_record_columns, 'sales_records.csv', since=since)
 
     @classmethod
-    def export_sales_records_csv(cls):
-        """Export sales records with exact requested headlines"""
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="sales_records.csv"'
-        writer = csv.writer(response)
-
-        # Exact headers you requested
-        headers = [
-            'Customer name', 'Phone Number', 'Gender', 'Age range', 
-            'Product', 'Attribute Name', 'Unit Measure', 'Quantity', 
-            'Unit Price', 'Product Amount'
-        ]
-        writer.writerow(headers)
-
-        for sale in cls.objects.all().prefetch_related('items__product', 'customer'):
-            for item in sale.items.all():
-                writer.writerow([
-                    sale.customer.name,
-                    sale.customer.phone_number,
-                    sale.customer.gender,
-                    sale.customer.age_range,
-                    item.product.name,
-                    item.attribute_name,
-                    item.product.unit_measure,
-                    item.quantity,
-                    item.unit_price,
-                    item.line_total
-                ])
-
-        return response
-
-class SaleItem(TimeStampedModel):
+    def export_sales_records_parquet(cls, since=None):
+        """Sales records as typed Parquet for the analytics pipeline"""
+        items = SaleItem.objects.order_by('sale_id')
+        return parquet_response(items, SaleItem.sales_record_columns, 'sales_records.parquet', since=since)
+
+class SaleItem(TimeStampedModel, CustomExportMixin):
     """Individual items within a sale with all requested fields"""
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.PROTECT, null=True, blank=True)
@@ -344,7 +367,33 @@ class SaleItem(TimeStampedModel):
     product_size = models.CharField(max_length=50, blank=True, null=True)
 
     def save(self, *args, **kwargs):
-        # Capture product attributes at time of sale
+        from .inventory import record_movements
+        self.capture_product_attributes()
+
+        # Take the item out of stock, and move the difference when its product or quantity changes
+        with transaction.atomic():
+            # The stored line is also read by sales.signals to move the sale totals
+            self._stored_line = None if self._state.adding else (
+                SaleItem.objects.select_for_update().filter(pk=self.pk)
+                .values_list('sale_id', 'product_id', 'quantity', 'unit_price').first()
+            )
+            super().save(*args, **kwargs)
+            if self._stored_line is None:
+                movements = [self.stock_movement()]
+            elif self._stored_line[1] == self.product_id:
+                change = self._stored_line[2] - self.quantity
+                movements = [self.stock_movement(change, note='Sale item changed')] if change else []
+            else:
+                # Return the old product's quantity and take the new one
+                returned = StockMovement(product_id=self._stored_line[1], quantity=self._stored_line[2], reason='sale',
+                                         sale_item=self, note='Sale item changed')
+                movements = [returned, self.stock_movement(note='Sale item changed')]
+            movements = [movement for movement in movements if movement.product_id is not None]
+            if movements:
+                record_movements(movements)
+
+    def capture_product_attributes(self):
+        """Copy the product's attributes at the time of sale"""
         if not self.product_variety:
             self.product_variety = self.product.variety
         if not self.product_brand:
@@ -352,12 +401,10 @@ class SaleItem(TimeStampedModel):
         if not self.product_size:
             self.product_size = self.product.size
 
-        # Update stock when sale item is created
-        if not self.pk:  # Only on creation
-            self.product.current_stock -= self.quantity
-            self.product.save()
-
-        super().save(*args, **kwargs)
+    def stock_movement(self, quantity=None, note=''):
+        """Ledger entry for this item; takes its whole quantity out of stock by default"""
+        quantity = -self.quantity if quantity is None else quantity
+        return StockMovement(product_id=self.product_id, quantity=quantity, reason='sale', sale_item=self, note=note)
 
     @property
     def line_total(self):
@@ -375,6 +422,31 @@ class SaleItem(TimeStampedModel):
             attributes.append(self.product_size)
         return ', '.join(attributes) if attributes else 'N/A'
 
+    export_filename = 'sale_items'
+    export_columns = [
+        ('Sale Number', 'sale__sale_number'),
+        ('Product', 'product__name'),
+        ('Attribute Name', 'attribute_name'),
+        ('Unit Measure', 'product__unit_measure'),
+        ('Quantity', 'quantity'),
+        ('Unit Price', 'unit_price'),
+        ('Line Total', 'line_total'),
+    ]
+
+    # Exact headlines requested for the sales records export
+    sales_record_columns = [
+        ('Customer name', 'sale__customer__name'),
+        ('Phone Number', 'sale__customer__phone_number'),
+        ('Gender', 'sale__customer__gender'),
+        ('Age range', 'sale__customer__age_range'),
+        ('Product', 'product__name'),
+        ('Attribute Name', 'attribute_name'),
+        ('Unit Measure', 'product__unit_measure'),
+        ('Quantity', 'quantity'),
+        ('Unit Price', 'unit_price'),
+        ('Product Amount', 'line_total'),
+    ]
+
     def __str__(self):
         return f'{self.product.name} - {self.quantity} {self.product.unit_measure}'
 
@@ -396,106 +468,86 @@ class Purchase(AuditModel, CustomExportMixin):
     def save(self, *args, **kwargs):
         # Auto-generate purchase number
         if not self.purchase_number:
-            from django.utils import timezone
-            date_str = timezone.now().strftime('%Y%m%d')
-            last_purchase = Purchase.objects.filter(purchase_number__startswith=f'PUR-{date_str}').order_by('-purchase_number').first()
-            if last_purchase:
-                last_num = int(last_purchase.purchase_number.split('-')[-1])
-                self.purchase_number = f'PUR-{date_str}-{last_num + 1:04d}'
-            else:
-                self.purchase_number = f'PUR-{date_str}-0001'
-
-        # Auto-calculate total
-        if hasattr(self, 'items'):
-            self.total_amount = sum(item.line_total for item in self.items.all())
-
-        super().save(*args, **kwargs)
+            self.purchase_number = document_numbers(Purchase, 'purchase_number', 'PUR')[0]
+
+        from .inventory import sync_purchase_stock
+        from .totals import items_total
+        with transaction.atomic():
+            # Lock the stored row so a concurrent save cannot post the same receipt twice
+            stored_status = None if self._state.adding else (
+                Purchase.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
+            )
+
+            # Auto-calculate total with one aggregate over the stored items; a new purchase has none
+            self.total_amount = Decimal('0') if self._state.adding else items_total(self.items.all())
+
+            # Put the items into stock when the purchase is received, and take them out if that is undone
+            super().save(*args, **kwargs)
+            received = self.status == 'received'
+            if stored_status is not None and (stored_status == 'received') != received:
+                note = 'Purchase received' if received else 'Purchase no longer received'
+                sync_purchase_stock(list(self.items.all()), received, note=note)
 
     def __str__(self):
         return f'{self.purchase_number} - {self.customer.name}'
 
     @classmethod
     def get_purchase_metrics(cls):
-        """Get comprehensive purchase metrics"""
-        today = timezone.now()
-        last_30_days = today - timedelta(days=30)
-
+        """Get comprehensive purchase metrics, from the daily rollup when it is fresh"""
+        from core.rollups import rollup_is_fresh
+
+        last_30_days = timezone.localdate() - timedelta(days=30)
+        if rollup_is_fresh('purchases'):
+            totals = DailyPurchaseRollup.objects.aggregate(
+                total_purchases=Sum('purchases_count'),
+                total_purchase_amount=Sum('purchase_amount'),
+                recent_purchases_count=Sum('purchases_count', filter=Q(day__gte=last_30_days)),
+                recent_purchase_amount=Sum('purchase_amount', filter=Q(day__gte=last_30_days)),
+            )
+        else:
+            totals = cls.objects.filter(status='received').aggregate(
+                total_purchases=Count('id'),
+                total_purchase_amount=Sum('total_amount'),
+                recent_purchases_count=Count('id', filter=Q(purchase_date__date__gte=last_30_days)),
+                recent_purchase_amount=Sum('total_amount', filter=Q(purchase_date__date__gte=last_30_days)),
+            )
+
+        total_purchases = totals['total_purchases'] or 0
+        total_purchase_amount = totals['total_purchase_amount'] or 0
         metrics = {
-            'total_purchases': cls.objects.filter(status='received').count(),
-            'total_purchase_amount': cls.objects.filter(status='received').aggregate(Sum('total_amount'))['total_amount__sum'] or 0,
-            'average_purchase_value': cls.objects.filter(status='received').aggregate(Avg('total_amount'))['total_amount__avg'] or 0,
-            'recent_purchases_count': cls.objects.filter(purchase_date__gte=last_30_days, status='received').count(),
-            'recent_purchase_amount': cls.objects.filter(purchase_date__gte=last_30_days, status='received').aggregate(Sum('total_amount'))['total_amount__sum'] or 0,
+            'total_purchases': total_purchases,
+            'total_purchase_amount': total_purchase_amount,
+            'average_purchase_value': total_purchase_amount / total_purchases if total_purchases else 0,
+            'recent_purchases_count': totals['recent_purchases_count'] or 0,
+            'recent_purchase_amount': totals['recent_purchase_amount'] or 0,
         }
         return metrics
 
+    export_columns = [
+        ('Purchase Number', 'purchase_number'),
+        ('Purchase Date', 'purchase_date', format_datetime),
+        ('Customer Name', 'customer__name'),
+        ('Customer Phone', 'customer__phone_number'),
+        ('Customer Gender', 'customer__gender'),
+        ('Customer Age Range', 'customer__age_range'),
+        ('Supplier', 'supplier'),
+        ('Total Amount', 'total_amount'),
+        ('Status', 'status'),
+    ]
+
     @classmethod
-    def export_to_csv(cls):
-        """Export comprehensive purchase data"""
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="purchases.csv"'
-        writer = csv.writer(response)
-
-        headers = [
-            'Purchase Number', 'Purchase Date', 'Customer Name', 'Customer Phone',
-            'Customer Gender', 'Customer Age Range', 'Supplier', 'Total Amount', 'Status'
-        ]
-        writer.writerow(headers)
-
-        for purchase in cls.objects.all().select_related('customer'):
-            writer.writerow([
-                purchase.purchase_number,
-                purchase.purchase_date.strftime('%Y-%m-%d %H:%M'),
-                purchase.customer.name,
-                purchase.customer.phone_number,
-                purchase.customer.gender,
-                purchase.customer.age_range,
-                purchase.supplier,
-                purchase.total_amount,
-                purchase.status
-            ])
-
-        return response
+    def export_purchase_records_csv(cls, since=None):
+        """Export purchase records with exact requested headlines, one row per item"""
+        items = PurchaseItem.objects.order_by('purchase_id')
+        return stream_csv(items, PurchaseItem.purchase_record_columns, 'purchase_records.csv', since=since)
 
     @classmethod
-    def export_purchase_records_csv(cls):
-        """Export purchase records with exact requested headlines"""
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="purchase_records.csv"'
-        writer = csv.writer(response)
-
-        # Exact headers you requested
-        headers = [
-            'Customer name', 'Phone Number', 'Gender', 'Age range',
-            'Product Category', 'Product', 'Attribute', 'Unit Measure',
-            'Quantity', 'Unit Price'
-        ]
-        writer.writerow(headers)
-
-        for purchase in cls.objects.all().prefetch_related('items__product_category'):
-            for item in purchase.items.all():
-                writer.writerow([
-                    purchase.customer.name,
-                    purchase.customer.phone_number,
-                    purchase.customer.gender,
-                    purchase.customer.age_range,
-                    item.product_category.name,
-                    item.product_name,
-                    item.product_attribute or '',
-                    item.unit_measure,
-                    item.quantity,
-                    item.unit_price
-                ])
-
-        return response
-
-class PurchaseItem(TimeStampedModel):
+    def export_purchase_records_parquet(cls, since=None):
+        """Purchase records as typed Parquet for the analytics pipeline"""
+        items = PurchaseItem.objects.order_by('purchase_id')
+        return parquet_response(items, PurchaseItem.purchase_record_columns, 'purchase_records.parquet', since=since)
+
+class PurchaseItem(TimeStampedModel, CustomExportMixin):
     """Individual items within a purchase with all requested fields"""
     purchase = models.ForeignKey(Purchase, on_delete=models.CASCADE, related_name='items', null=True, blank=True)
     product_category = models.ForeignKey(ProductCategory, on_delete=models.PROTECT)
@@ -506,23 +558,17 @@ class PurchaseItem(TimeStampedModel):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
 
     def save(self, *args, **kwargs):
-        # Update product stock when purchase is received
-        if self.purchase.status == 'received' and not self.pk:
-            try:
-                # Try to find existing product
-                product = Product.objects.filter(
-                    name=self.product_name,
-                    product_category=self.product_category
-                ).first()
-                
-                if product:
-                    product.current_stock += self.quantity
-                    product.save()
-            except Product.DoesNotExist:
-                # Product doesn't exist, that's okay for purchase records
-                pass
-
-        super().save(*args, **kwargs)
+        from .inventory import sync_purchase_stock
+
+        # A received purchase puts its items into stock, and edits move the difference
+        with transaction.atomic():
+            # Lock the purchase as Purchase.save does, so a status change cannot race the item
+            received = self.purchase_id is not None and (
+                Purchase.objects.select_for_update().filter(pk=self.purchase_id, status='received').exists()
+            )
+            note = '' if self._state.adding else 'Purchase item changed'
+            super().save(*args, **kwargs)
+            sync_purchase_stock([self], received, note=note)
 
     @property
     def line_total(self):
@@ -535,32 +581,83 @@ class PurchaseItem(TimeStampedModel):
             return f"{self.product_name} ({self.product_attribute})"
         return self.product_name
 
+    export_filename = 'purchase_items'
+    export_columns = [
+        ('Purchase Number', 'purchase__purchase_number'),
+        ('Product Category', 'product_category__name'),
+        ('Product', 'product_name'),
+        ('Attribute', 'product_attribute'),
+        ('Unit Measure', 'unit_measure'),
+        ('Quantity', 'quantity'),
+        ('Unit Price', 'unit_price'),
+        ('Line Total', 'line_total'),
+    ]
+
+    # Exact headlines requested for the purchase records export
+    purchase_record_columns = [
+        ('Customer name', 'purchase__customer__name'),
+        ('Phone Number', 'purchase__customer__phone_number'),
+        ('Gender', 'purchase__customer__gender'),
+        ('Age range', 'purchase__customer__age_range'),
+        ('Product Category', 'product_category__name'),
+        ('Product', 'product_name'),
+        ('Attribute', 'product_attribute'),
+        ('Unit Measure', 'unit_measure'),
+        ('Quantity', 'quantity'),
+        ('Unit Price', 'unit_price'),
+    ]
+
     def __str__(self):
         return f'{self.product_name} - {self.quantity} {self.unit_measure}'
-    @classmethod
-    def export_to_csv(cls):
-        """Export product categories to CSV"""
-        import csv
-        from django.http import HttpResponse
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="product_categories.csv"'
-        writer = csv.writer(response)
 
-        headers = ['Name', 'Description', 'Parent Category', 'Created', 'Updated']
-        writer.writerow(headers)
+class StockMovement(TimeStampedModel):
+    """Append-only stock ledger; Product.current_stock is the running sum of its movements (see sales.inventory)"""
+    REASON_CHOICES = [
+        ('opening', 'Opening Balance'),
+        ('sale', 'Sale'),
+        ('purchase', 'Purchase'),
+        ('adjustment', 'Adjustment'),
+    ]
 
-        for category in cls.objects.all():
-            writer.writerow([
-                category.name,
-                category.description or '',
-                category.parent_category.name if category.parent_category else '',
-                category.created_at.strftime('%Y-%m-%d %H:%M'),
-                category.updated_at.strftime('%Y-%m-%d %H:%M')
-            ])
+    # Deleting a product keeps its ledger, archived under the name recorded in archived_product
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, help_text='Positive into stock, negative out')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    sale_item = models.ForeignKey(SaleItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    purchase_item = models.ForeignKey(PurchaseItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    note = models.CharField(max_length=200, blank=True)
+    archived_product = models.CharField(max_length=300, blank=True, help_text='SKU and name of the deleted product')
 
-        return response
+    def __str__(self):
+        return f'{self.product_id or self.archived_product} {self.quantity:+} ({self.reason})'
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at']),
+        ]
 
+class DailySalesRollup(models.Model):
+    """Paid sales per day, location and channel, maintained by core.rollups"""
+    day = models.DateField()
+    location = models.ForeignKey('farmers.Location', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    channel = models.CharField(max_length=20)
+    sales_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0)
 
+    def __str__(self):
+        return f'{self.day} {self.channel}: {self.sales_count} sales'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['day', 'channel']),
+        ]
+
+class DailyPurchaseRollup(models.Model):
+    """Received purchases per day, maintained by core.rollups"""
+    day = models.DateField(db_index=True)
+    purchases_count = models.PositiveIntegerField(default=0)
+    purchase_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
 
+    def __str__(self):
+        return f'{self.day}: {self.purchases_count} purchases'
@@ -0,0 +1,70 @@
+# sales/signals.py
+# Keep sale, purchase and customer totals, and stock, in step with their items and sales
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .customers import paid_sale_changed
+from .inventory import record_movements, sync_purchase_stock
+from .models import Product, PurchaseItem, Sale, SaleItem, StockMovement
+from .totals import add_to_purchase_total, add_to_sale_totals, recompute_purchase_totals, recompute_sale_totals
+
+@receiver(post_save, sender=SaleItem)
+def sale_item_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    stored = getattr(instance, '_stored_line', None)
+    if created:
+        add_to_sale_totals(instance.sale_id, instance.line_total)
+    elif stored is None:
+        # The old line amount is unknown, so recompute from the items
+        recompute_sale_totals([instance.sale_id])
+    else:
+        # Move by the change in line amount, so a paid sale's customer totals follow
+        sale_id, product_id, quantity, unit_price = stored
+        if sale_id == instance.sale_id:
+            add_to_sale_totals(sale_id, instance.line_total - quantity * unit_price)
+        else:
+            add_to_sale_totals(sale_id, -quantity * unit_price)
+            add_to_sale_totals(instance.sale_id, instance.line_total)
+
+@receiver(post_delete, sender=SaleItem)
+def sale_item_deleted(sender, instance, origin=None, **kwargs):
+    # A deleted sale takes its items with it; sale_deleted settles its customer totals
+    deleting = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if deleting is not Sale:
+        add_to_sale_totals(instance.sale_id, -instance.line_total)
+    # Put the item back in stock; this also runs for each item of a deleted sale
+    if instance.product_id is not None:
+        record_movements([StockMovement(
+            product_id=instance.product_id, quantity=instance.quantity, reason='sale', note='Sale item deleted'
+        )])
+
+@receiver(post_save, sender=PurchaseItem)
+def purchase_item_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.purchase_id is None:
+        return
+    if created:
+        add_to_purchase_total(instance.purchase_id, instance.line_total)
+    else:
+        recompute_purchase_totals([instance.purchase_id])
+
+@receiver(post_delete, sender=PurchaseItem)
+def purchase_item_deleted(sender, instance, **kwargs):
+    if instance.purchase_id is not None:
+        add_to_purchase_total(instance.purchase_id, -instance.line_total)
+
+@receiver(pre_delete, sender=PurchaseItem)
+def purchase_item_deleting(sender, instance, **kwargs):
+    # Take a received item back out of stock; before the delete, while its ledger entries still point at it
+    sync_purchase_stock([instance], False, note='Purchase item deleted', deleted=True)
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    # Archive the product's ledger rather than lose it; the delete then unlinks the movements
+    instance.stock_movements.update(archived_product=f'{instance.sku} {instance}'[:300], updated_at=timezone.now())
+
+@receiver(post_delete, sender=Sale)
+def sale_deleted(sender, instance, **kwargs):
+    paid_sale_changed(instance.paid_contribution(), None)
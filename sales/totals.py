@@ -0,0 +1,65 @@
+"""
+Sale and purchase totals
+
+total_amount is the sum of the items' quantity * unit_price, and a sale's
+final_amount applies its discount and tax. Adding, editing or removing an
+item moves the stored totals by the change in line amount (see sales.signals),
+and moves a paid sale's customer totals with them. Backfills recompute the
+totals in SQL rather than by loading the items into Python, and leave customer
+totals to recompute_customer_metrics. Every update sets updated_at, which
+update() skips, for delta exports and rollups.
+"""
+
+from decimal import Decimal
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .customers import apply_paid_sales
+from .models import Purchase, PurchaseItem, Sale, SaleItem
+
+LINE_TOTAL = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=22, decimal_places=4))
+
+
+def items_total(items):
+    """Sum of quantity * unit_price over an item queryset in one aggregate"""
+    return items.aggregate(total=Sum(LINE_TOTAL))['total'] or Decimal('0')
+
+
+def item_totals(item_model, parent):
+    """Expression for each parent row's item total, for use in an UPDATE"""
+    totals = (item_model.objects.filter(**{parent: OuterRef('pk')})
+              .values(parent).annotate(total=Sum(LINE_TOTAL)).values('total'))
+    return Coalesce(Subquery(totals, output_field=DecimalField()), Value(Decimal('0')))
+
+
+def recompute_sale_totals(sale_ids=None):
+    """Recompute the totals of these sales (all by default) in one UPDATE; returns the number updated"""
+    sales = Sale.objects.all() if sale_ids is None else Sale.objects.filter(pk__in=sale_ids)
+    total = item_totals(SaleItem, 'sale')
+    return sales.update(
+        total_amount=total, final_amount=total - F('discount_amount') + F('tax_amount'), updated_at=timezone.now()
+    )
+
+
+def recompute_purchase_totals(purchase_ids=None):
+    """Recompute the totals of these purchases (all by default) in one UPDATE; returns the number updated"""
+    purchases = Purchase.objects.all() if purchase_ids is None else Purchase.objects.filter(pk__in=purchase_ids)
+    return purchases.update(total_amount=item_totals(PurchaseItem, 'purchase'), updated_at=timezone.now())
+
+
+def add_to_sale_totals(sale_id, amount):
+    """Move a sale's totals by one line amount, and its customer's totals too if the sale is paid"""
+    if not amount:
+        return
+    Sale.objects.filter(pk=sale_id).update(
+        total_amount=F('total_amount') + amount, final_amount=F('final_amount') + amount, updated_at=timezone.now()
+    )
+    # The UPDATE holds the sale's row lock, so its status cannot change before this reads it
+    customer_id = Sale.objects.filter(pk=sale_id, status='paid').values_list('customer_id', flat=True).first()
+    if customer_id is not None:
+        apply_paid_sales(customer_id, amount, 0)
+
+
+def add_to_purchase_total(purchase_id, amount):
+    """Move a purchase's total by one line amount"""
+    Purchase.objects.filter(pk=purchase_id).update(total_amount=F('total_amount') + amount, updated_at=timezone.now())
@@ -14,6 +14,8 @@ urlpatterns = [
     # Record exports
     path('export/sales-records/', views.export_sales_records_csv, name='export_sales_records'),
     path('export/purchase-records/', views.export_purchase_records_csv, name='export_purchase_records'),
+    path('export/sales-records/parquet/', views.export_sales_records_parquet, name='export_sales_records_parquet'),
+    path('export/purchase-records/parquet/', views.export_purchase_records_parquet, name='export_purchase_records_parquet'),
     # Item exports
     path('export/sale-items/', views.export_sale_items_csv, name='export_sale_items'),
     path('export/purchase-items/', views.export_purchase_items_csv, name='export_purchase_items'),
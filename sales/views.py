@@ -2,6 +2,7 @@ from django.shortcuts import render
 from django.http import HttpResponse
 from django.views.generic import TemplateView
 from django.db import connection
+from core.export_import import export_since
 
 class DashboardView(TemplateView):
     template_name = 'sales/dashboard.html'
@@ -51,38 +52,46 @@ class DashboardView(TemplateView):
 # Main model exports
 def export_sales_csv(request):
     from .models import Sale
-    return Sale.export_to_csv()
+    return Sale.export_to_csv(since=export_since(request))
 
 def export_purchases_csv(request):
     from .models import Purchase
-    return Purchase.export_to_csv()
+    return Purchase.export_to_csv(since=export_since(request))
 
 def export_customers_csv(request):
     from .models import Customer
-    return Customer.export_to_csv()
+    return Customer.export_to_csv(since=export_since(request))
 
 def export_products_csv(request):
     from .models import Product
-    return Product.export_to_csv()
+    return Product.export_to_csv(since=export_since(request))
 
 def export_categories_csv(request):
     from .models import ProductCategory
-    return ProductCategory.export_to_csv()
+    return ProductCategory.export_to_csv(since=export_since(request))
 
 # Record exports
 def export_sales_records_csv(request):
     from .models import Sale
-    return Sale.export_sales_records_csv()
+    return Sale.export_sales_records_csv(since=export_since(request))
 
 def export_purchase_records_csv(request):
     from .models import Purchase
-    return Purchase.export_purchase_records_csv()
+    return Purchase.export_purchase_records_csv(since=export_since(request))
+
+def export_sales_records_parquet(request):
+    from .models import Sale
+    return Sale.export_sales_records_parquet(since=export_since(request))
+
+def export_purchase_records_parquet(request):
+    from .models import Purchase
+    return Purchase.export_purchase_records_parquet(since=export_since(request))
 
 # Item exports
 def export_sale_items_csv(request):
     from .models import SaleItem
-    return SaleItem.export_to_csv()
+    return SaleItem.export_to_csv(since=export_since(request))
 
 def export_purchase_items_csv(request):
     from .models import PurchaseItem
-    return PurchaseItem.export_to_csv()
+    return PurchaseItem.export_to_csv(since=export_since(request))
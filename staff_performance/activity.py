@@ -0,0 +1,169 @@
+# staff_performance/activity.py
+"""
+Incremental KPI counters
+
+StaffActivityDay holds one staff member's KPI counters for one day. The
+signals in staff_performance.signals note which (staff, day) buckets a write
+touches; once the transaction commits, only those buckets are recomputed from
+the source tables and the affected staff members' scores are refreshed from
+the buckets of the KPI period (ActivityKPICalculator). Bulk writes skip signals, so
+rebuild the buckets afterwards with the rebuild_activity_days command.
+"""
+
+import threading
+from collections import defaultdict
+from datetime import datetime
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .kpi_calculations import (
+    ACCURATE_ATTENDANCE, BULK_BATCH_SIZE, DIGITAL_CHECKIN_METHODS, DOCUMENTED_MEETING, TIMELY_ENTRY,
+    ActivityKPICalculator, save_performance_scores
+)
+from .models import PerformanceReview, StaffActivityDay, StaffMember
+from farmer_engagement.models import CBOMeeting, FarmerAttendance
+from video_calls.models import VideoCallSession, CallParticipant
+
+# (source model, staff key, bucket day, filters, counters) for each source table
+ACTIVITY_SOURCES = [
+    (CBOMeeting, 'facilitator', TruncDate('meeting_date'), Q(), {
+        'meetings': Count('id'),
+        'meetings_completed': Count('id', filter=Q(status='completed')),
+        'meetings_with_qr': Count('id', filter=Q(qr_code__isnull=False)),
+        'meetings_with_attendance': Count('id', filter=Q(actual_attendance__gt=0)),
+        'meetings_documented': Count('id', filter=DOCUMENTED_MEETING),
+        'meetings_accurate': Count('id', filter=ACCURATE_ATTENDANCE),
+        'meetings_timely': Count('id', filter=TIMELY_ENTRY),
+        'expected_attendance': Sum('expected_attendance'),
+        'actual_attendance': Sum('actual_attendance'),
+    }),
+    (FarmerAttendance, 'meeting__facilitator', TruncDate('meeting__meeting_date'), Q(), {
+        'checkins': Count('id'),
+        'digital_checkins': Count('id', filter=Q(checkin_method__in=DIGITAL_CHECKIN_METHODS)),
+    }),
+    (VideoCallSession, 'host', TruncDate('scheduled_time'), Q(), {
+        'calls_hosted': Count('id'),
+        'calls_completed': Count('id', filter=Q(status='completed')),
+    }),
+    (CallParticipant, 'session__host', TruncDate('session__scheduled_time'), Q(left_at__isnull=True), {
+        'hosted_call_participants': Count('id'),
+    }),
+    (CallParticipant, 'staff_member', TruncDate('join_time'), Q(), {
+        'calls_joined': Count('id'),
+    }),
+    (PerformanceReview, 'staff', F('review_date'), Q(), {
+        'reviews': Count('id'),
+    }),
+]
+
+# (staff path, date path) of every bucket a row of each model counts in
+ACTIVITY_BUCKETS = {
+    CBOMeeting: [('facilitator', 'meeting_date')],
+    FarmerAttendance: [('meeting__facilitator', 'meeting__meeting_date')],
+    VideoCallSession: [('host', 'scheduled_time')],
+    CallParticipant: [('session__host', 'session__scheduled_time'), ('staff_member', 'join_time')],
+    PerformanceReview: [('staff', 'review_date')],
+}
+
+def rebuild_activity_days(staff=None, days=None, start=None, end=None):
+    """Recompute StaffActivityDay buckets from the source tables; returns the number stored
+
+    Limited to the staff pks in `staff` and to the dates in `days` or from
+    `start` to `end`; with no limits every bucket is rebuilt.
+    """
+    def limit(queryset, staff_key):
+        if staff is not None:
+            queryset = queryset.filter(**{f'{staff_key}__in': staff})
+        if days is not None:
+            queryset = queryset.filter(day__in=days)
+        if start is not None:
+            queryset = queryset.filter(day__gte=start)
+        if end is not None:
+            queryset = queryset.filter(day__lte=end)
+        return queryset
+
+    buckets = defaultdict(dict)
+    for model, staff_key, day, filters, counters in ACTIVITY_SOURCES:
+        rows = limit(model.objects.filter(filters).annotate(day=day).filter(day__isnull=False), staff_key)
+        for row in rows.values(staff_key, 'day').annotate(**counters).order_by():
+            buckets[row.pop(staff_key), row.pop('day')].update(row)
+
+    with transaction.atomic():
+        limit(StaffActivityDay.objects.all(), 'staff').delete()
+        StaffActivityDay.objects.bulk_create(
+            [StaffActivityDay(staff_id=staff_id, day=day, **counters) for (staff_id, day), counters in buckets.items()],
+            batch_size=BULK_BATCH_SIZE
+        )
+    return len(buckets)
+
+def refresh_staff_scores(staff):
+    """Store KPIs computed from the activity buckets for the staff pks in `staff`"""
+    members = list(StaffMember.objects.filter(pk__in=staff, is_active=True))
+    if not members:
+        return
+    calculator = ActivityKPICalculator(members)
+    save_performance_scores(members, calculator.calculate_all_kpis(), calculator.period_start, calculator.period_end)
+
+def refresh_activity(buckets):
+    """Recompute a set of (staff pk, day) buckets and refresh those staff members' scores"""
+    staff = {staff_id for staff_id, day in buckets}
+    rebuild_activity_days(staff=staff, days={day for staff_id, day in buckets})
+    refresh_staff_scores(staff)
+
+# Buckets touched in this thread, flushed when the transaction commits
+_pending = threading.local()
+
+def resolve(instance, path):
+    """Value at a `relation__field` path of a model instance; foreign keys give their pk"""
+    *relations, name = path.split('__')
+    for relation in relations:
+        try:
+            instance = getattr(instance, relation)
+        except ObjectDoesNotExist:
+            # Related row already removed by a cascading delete
+            return None
+        if instance is None:
+            return None
+    return getattr(instance, instance._meta.get_field(name).attname)
+
+def activity_buckets(model, values, paths=ACTIVITY_BUCKETS):
+    """(staff pk, day) buckets for a row, given its values at each of the model's paths"""
+    buckets = set()
+    for staff_path, date_path in paths[model]:
+        staff_id, when = values(staff_path), values(date_path)
+        if staff_id is None or when is None:
+            continue
+        if isinstance(when, datetime):
+            when = timezone.localdate(when)
+        buckets.add((staff_id, when))
+    return buckets
+
+def stored_buckets(model, pk):
+    """Buckets an existing row counts in as currently stored, before it is changed"""
+    paths = [path for pair in ACTIVITY_BUCKETS[model] for path in pair]
+    row = model.objects.filter(pk=pk).values(*paths).first()
+    return activity_buckets(model, row.get) if row else set()
+
+def mark_activity(buckets):
+    """Queue buckets for recomputation once the current transaction commits"""
+    if not buckets:
+        return
+    if not hasattr(_pending, 'buckets'):
+        _pending.buckets = set()
+    _pending.buckets |= buckets
+    # Each write registers a callback; the first to run takes the whole set
+    transaction.on_commit(flush_activity)
+
+def flush_activity():
+    """Refresh the queued buckets in a Celery task, or here when no broker is reachable"""
+    buckets = getattr(_pending, 'buckets', None)
+    if not buckets:
+        return
+    _pending.buckets = set()
+    from .tasks import refresh_activity_task
+    try:
+        refresh_activity_task.delay([[str(staff_id), day.isoformat()] for staff_id, day in buckets])
+    except Exception:
+        refresh_activity(buckets)
@@ -4,32 +4,170 @@ Performance KPI Calculation System
 Measures staff performance based on app engagement and activities
 """
 
+import os
+import django
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.db import connections, transaction
 from django.utils import timezone
-from django.db.models import Count, Sum, Avg, Q
-from datetime import datetime, timedelta
-from .models import StaffMember, PerformanceMetric
-from farmer_engagement.models import CBOMeeting, FarmerAttendance
+from django.db.models import Count, Sum, Avg, Q, F
+from datetime import datetime, time, timedelta
+from .ledger import active_day_counts
+from .models import StaffMember, PerformanceMetric, PerformanceReview, StaffActivityDay, UserActiveDay
+from farmer_engagement.models import CBOGroup, CBOMeeting, FarmerAttendance
 from video_calls.models import VideoCallSession, CallParticipant
 
+DIGITAL_CHECKIN_METHODS = ['qr_code', 'biometric', 'nfc']
+
+# Rows per statement when writing KPI results
+BULK_BATCH_SIZE = 500
+
+# Days in the KPI period, and so daily activity buckets summed into each KPI
+KPI_WINDOW_DAYS = 30
+
+# Weights of each KPI in the overall performance score
+KPI_WEIGHTS = {
+    'farmer_engagement_score': 0.25,
+    'meeting_facilitation_score': 0.20,
+    'attendance_management_score': 0.15,
+    'video_call_engagement_score': 0.15,
+    'app_usage_score': 0.15,
+    'data_quality_score': 0.10,
+}
+
+# Scoring
+#
+# Each KPI is a pure function of one staff member's activity counts, shared by
+# the per-staff calculator and the batch calculator so both give identical scores.
+
+def score_farmer_engagement(cbo_groups_count, farmer_reach, meetings_facilitated):
+    """KPI: Farmer engagement and CBO management"""
+    score = min(100, (
+        (cbo_groups_count * 10) + 
+        (min(farmer_reach, 500) / 5) +  # Cap at 500 farmers
+        (meetings_facilitated * 15)
+    ))
+    return round(score, 2)
+
+def score_meeting_facilitation(meeting_count, avg_actual_attendance, avg_expected_attendance, completed_meetings):
+    """KPI: Meeting facilitation effectiveness"""
+    if not meeting_count:
+        return 0
+    
+    # Average attendance rate
+    if avg_actual_attendance is not None and avg_expected_attendance:
+        # float(): PostgreSQL returns averages as Decimal
+        avg_attendance_rate = float(avg_actual_attendance) / float(avg_expected_attendance) * 100
+    else:
+        avg_attendance_rate = 0
+    
+    # Meeting frequency (target: 2 meetings per week)
+    target_meetings = 8  # 2 meetings/week * 4 weeks
+    frequency_score = min(100, (meeting_count / target_meetings) * 100)
+    
+    # Timeliness (meetings held as scheduled)
+    timeliness_score = (completed_meetings / meeting_count) * 100
+    
+    overall_score = (avg_attendance_rate * 0.4) + (frequency_score * 0.3) + (timeliness_score * 0.3)
+    return round(overall_score, 2)
+
+def score_attendance_management(meeting_count, qr_meetings, total_checkins, digital_checkins, complete_attendance):
+    """KPI: Digital attendance management"""
+    if not meeting_count:
+        return 0
+    
+    qr_usage_rate = (qr_meetings / meeting_count) * 100
+    digital_rate = (digital_checkins / total_checkins) * 100 if total_checkins > 0 else 0
+    completeness_rate = (complete_attendance / meeting_count) * 100
+    
+    overall_score = (qr_usage_rate * 0.4) + (digital_rate * 0.4) + (completeness_rate * 0.2)
+    return round(overall_score, 2)
+
+def score_video_call_engagement(hosted_calls, participated_calls, completed_calls, hosted_call_participants):
+    """KPI: Video call usage and engagement"""
+    completion_rate = (completed_calls / hosted_calls) * 100 if hosted_calls > 0 else 0
+    # Average participants still in each hosted call
+    avg_participants = hosted_call_participants / hosted_calls if hosted_calls > 0 else 0
+    
+    score = min(100, (
+        (hosted_calls * 10) +
+        (participated_calls * 5) +
+        (completion_rate * 0.5) +
+        (avg_participants * 2)
+    ))
+    return round(score, 2)
+
+def score_app_usage(farmer_activities, video_activities, performance_activities, active_days):
+    """KPI: Overall app engagement and usage; active_days counts days in the activity ledger"""
+    total_activities = farmer_activities + video_activities + performance_activities
+    
+    # Daily activity consistency
+    consistency_score = min(100, (active_days / 30) * 100)  # 30-day period
+    
+    overall_score = min(100, (total_activities * 2) + (consistency_score * 0.5))
+    return round(overall_score, 2)
+
+def score_data_quality(meeting_count, documented_meetings, accurate_attendance, timely_entries):
+    """KPI: Data accuracy and completeness"""
+    if not meeting_count:
+        return 0
+    
+    documentation_rate = (documented_meetings / meeting_count) * 100
+    accuracy_rate = (accurate_attendance / meeting_count) * 100
+    timeliness_rate = (timely_entries / meeting_count) * 100
+    
+    overall_score = (documentation_rate * 0.4) + (accuracy_rate * 0.4) + (timeliness_rate * 0.2)
+    return round(overall_score, 2)
+
+def score_overall_performance(kpis):
+    """Weighted overall performance score from the six KPIs"""
+    weighted_score = sum(kpis[kpi] * weight for kpi, weight in KPI_WEIGHTS.items())
+    return round(weighted_score, 2)
+
+# Activity filters shared by both calculators
+DOCUMENTED_MEETING = Q(minutes__isnull=False) & ~Q(minutes='')
+ACCURATE_ATTENDANCE = Q(actual_attendance__lte=F('expected_attendance'))
+# Data entered within 24 hours of the meeting
+TIMELY_ENTRY = Q(created_at__lte=F('meeting_date') + timedelta(hours=24))
+
+def kpi_period(end=None, days=KPI_WINDOW_DAYS):
+    """First and last local day of the KPI period of `days` days ending on `end` (today)
+
+    Every calculator and PerformanceMetric row uses this period, so scores
+    stored for the same period_end always cover the same days.
+    """
+    end = end or timezone.localdate()
+    return end - timedelta(days=days - 1), end
+
+def kpi_period_bounds(end=None, days=KPI_WINDOW_DAYS):
+    """kpi_period() as aware datetimes, from the start of its first day to the end of its last"""
+    first, last = kpi_period(end, days)
+    return (timezone.make_aware(datetime.combine(first, time.min)),
+            timezone.make_aware(datetime.combine(last, time.max)))
+
 class PerformanceKPICalculator:
     """Calculate performance KPIs based on staff engagement across all modules"""
     
     def __init__(self, staff_member):
         self.staff_member = staff_member
-        self.period_start = timezone.now() - timedelta(days=30)  # Last 30 days
-        self.period_end = timezone.now()
+        self.period_start, self.period_end = kpi_period_bounds()
     
     def calculate_all_kpis(self):
         """Calculate all performance KPIs"""
-        return {
+        kpis = {
             'farmer_engagement_score': self.calculate_farmer_engagement_score(),
             'meeting_facilitation_score': self.calculate_meeting_facilitation_score(),
             'attendance_management_score': self.calculate_attendance_management_score(),
             'video_call_engagement_score': self.calculate_video_call_engagement_score(),
             'app_usage_score': self.calculate_app_usage_score(),
             'data_quality_score': self.calculate_data_quality_score(),
-            'overall_performance_score': self.calculate_overall_performance_score(),
         }
+        kpis['overall_performance_score'] = score_overall_performance(kpis)
+        return kpis
+    
+    def period_meetings(self):
+        return self.staff_member.facilitated_meetings.filter(
+            meeting_date__range=[self.period_start, self.period_end]
+        )
     
     def calculate_farmer_engagement_score(self):
         """KPI: Farmer engagement and CBO management"""
@@ -42,79 +180,49 @@ class PerformanceKPICalculator:
         ).aggregate(total=Sum('total_members'))['total'] or 0
         
         # Engagement activities
-        meetings_facilitated = self.staff_member.facilitated_meetings.filter(
-            meeting_date__range=[self.period_start, self.period_end]
-        ).count()
-        
-        # Score calculation (weighted)
-        score = min(100, (
-            (cbo_groups_count * 10) + 
-            (min(farmer_reach, 500) / 5) +  # Cap at 500 farmers
-            (meetings_facilitated * 15)
-        ))
+        meetings_facilitated = self.period_meetings().count()
         
-        return round(score, 2)
+        return score_farmer_engagement(cbo_groups_count, farmer_reach, meetings_facilitated)
     
     def calculate_meeting_facilitation_score(self):
         """KPI: Meeting facilitation effectiveness"""
-        meetings = self.staff_member.facilitated_meetings.filter(
-            meeting_date__range=[self.period_start, self.period_end]
+        meetings = self.period_meetings().aggregate(
+            count=Count('id'),
+            avg_actual=Avg('actual_attendance'),
+            avg_expected=Avg('expected_attendance'),
+            completed=Count('id', filter=Q(status='completed')),
+        )
+        return score_meeting_facilitation(
+            meetings['count'], meetings['avg_actual'], meetings['avg_expected'], meetings['completed']
         )
-        
-        if not meetings.exists():
-            return 0
-        
-        # Average attendance rate
-        avg_attendance_rate = meetings.aggregate(
-            avg_rate=Avg('actual_attendance') / Avg('expected_attendance') * 100
-        )['avg_rate'] or 0
-        
-        # Meeting frequency (target: 2 meetings per week)
-        meeting_count = meetings.count()
-        target_meetings = 8  # 2 meetings/week * 4 weeks
-        frequency_score = min(100, (meeting_count / target_meetings) * 100)
-        
-        # Timeliness (meetings held as scheduled)
-        on_time_meetings = meetings.filter(status='completed').count()
-        timeliness_score = (on_time_meetings / meeting_count) * 100 if meeting_count > 0 else 0
-        
-        overall_score = (avg_attendance_rate * 0.4) + (frequency_score * 0.3) + (timeliness_score * 0.3)
-        return round(overall_score, 2)
     
     def calculate_attendance_management_score(self):
         """KPI: Digital attendance management"""
-        meetings = self.staff_member.facilitated_meetings.filter(
-            meeting_date__range=[self.period_start, self.period_end]
+        meetings = self.period_meetings()
+        meeting_stats = meetings.aggregate(
+            count=Count('id'),
+            qr=Count('id', filter=Q(qr_code__isnull=False)),
+            complete=Count('id', filter=Q(actual_attendance__gt=0)),
+        )
+        checkins = FarmerAttendance.objects.filter(meeting__in=meetings).aggregate(
+            total=Count('id'),
+            digital=Count('id', filter=Q(checkin_method__in=DIGITAL_CHECKIN_METHODS)),
+        )
+        return score_attendance_management(
+            meeting_stats['count'], meeting_stats['qr'], checkins['total'], checkins['digital'], meeting_stats['complete']
         )
-        
-        if not meetings.exists():
-            return 0
-        
-        # QR code usage rate
-        qr_meetings = meetings.filter(qr_code__isnull=False).count()
-        qr_usage_rate = (qr_meetings / meetings.count()) * 100
-        
-        # Digital check-in rate
-        digital_checkins = FarmerAttendance.objects.filter(
-            meeting__in=meetings,
-            checkin_method__in=['qr_code', 'biometric', 'nfc']
-        ).count()
-        total_checkins = FarmerAttendance.objects.filter(meeting__in=meetings).count()
-        
-        digital_rate = (digital_checkins / total_checkins) * 100 if total_checkins > 0 else 0
-        
-        # Data completeness
-        complete_attendance = meetings.filter(actual_attendance__gt=0).count()
-        completeness_rate = (complete_attendance / meetings.count()) * 100
-        
-        overall_score = (qr_usage_rate * 0.4) + (digital_rate * 0.4) + (completeness_rate * 0.2)
-        return round(overall_score, 2)
     
     def calculate_video_call_engagement_score(self):
         """KPI: Video call usage and engagement"""
-        # Hosted video calls
-        hosted_calls = self.staff_member.hosted_video_calls.filter(
+        hosted = self.staff_member.hosted_video_calls.filter(
             scheduled_time__range=[self.period_start, self.period_end]
+        )
+        hosted_stats = hosted.aggregate(
+            count=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+        )
+        hosted_call_participants = CallParticipant.objects.filter(
+            session__in=hosted, left_at__isnull=True
         ).count()
         
         # Participation in calls
@@ -122,26 +230,9 @@ class PerformanceKPICalculator:
             join_time__range=[self.period_start, self.period_end]
         ).count()
         
-        # Call completion rate
-        completed_calls = self.staff_member.hosted_video_calls.filter(
-            status='completed',
-            scheduled_time__range=[self.period_start, self.period_end]
-        ).count()
-        completion_rate = (completed_calls / hosted_calls) * 100 if hosted_calls > 0 else 0
-        
-        # Participant engagement
-        avg_participants = self.staff_member.hosted_video_calls.filter(
-            scheduled_time__range=[self.period_start, self.period_end]
-        ).aggregate(avg=Avg('participant_count'))['avg'] or 0
-        
-        score = min(100, (
-            (hosted_calls * 10) +
-            (participated_calls * 5) +
-            (completion_rate * 0.5) +
-            (avg_participants * 2)
-        ))
-        
-        return round(score, 2)
+        return score_video_call_engagement(
+            hosted_stats['count'], participated_calls, hosted_stats['completed'], hosted_call_participants
+        )
     
     def calculate_app_usage_score(self):
         """KPI: Overall app engagement and usage"""
@@ -149,9 +240,7 @@ class PerformanceKPICalculator:
         # For now, using proxy metrics
         
         # Activity across modules
-        farmer_activities = self.staff_member.facilitated_meetings.filter(
-            meeting_date__range=[self.period_start, self.period_end]
-        ).count()
+        farmer_activities = self.period_meetings().count()
         
         video_activities = self.staff_member.video_call_participations.filter(
             join_time__range=[self.period_start, self.period_end]
@@ -161,88 +250,304 @@ class PerformanceKPICalculator:
             review_date__range=[self.period_start, self.period_end]
         ).count()
         
-        total_activities = farmer_activities + video_activities + performance_activities
-        
-        # Daily activity consistency
-        active_days = set()
-        # Add logic to track active days across modules
-        
-        consistency_score = min(100, (len(active_days) / 30) * 100)  # 30-day period
+        # Daily activity consistency, from the days recorded in the activity ledger
+        active_days = UserActiveDay.objects.filter(
+            user_id=self.staff_member.user_id,
+            day__range=[timezone.localdate(self.period_start), timezone.localdate(self.period_end)]
+        ).count()
         
-        overall_score = min(100, (total_activities * 2) + (consistency_score * 0.5))
-        return round(overall_score, 2)
+        return score_app_usage(farmer_activities, video_activities, performance_activities, active_days)
     
     def calculate_data_quality_score(self):
         """KPI: Data accuracy and completeness"""
-        meetings = self.staff_member.facilitated_meetings.filter(
-            meeting_date__range=[self.period_start, self.period_end]
+        meetings = self.period_meetings().aggregate(
+            count=Count('id'),
+            documented=Count('id', filter=DOCUMENTED_MEETING),
+            accurate=Count('id', filter=ACCURATE_ATTENDANCE),
+            timely=Count('id', filter=TIMELY_ENTRY),
         )
-        
-        if not meetings.exists():
-            return 0
-        
-        # Meeting documentation completeness
-        documented_meetings = meetings.filter(
-            Q(minutes__isnull=False) & ~Q(minutes='')
-        ).count()
-        documentation_rate = (documented_meetings / meetings.count()) * 100
-        
-        # Attendance data accuracy
-        accurate_attendance = meetings.filter(
-            actual_attendance__lte=F('expected_attendance')
-        ).count()
-        accuracy_rate = (accurate_attendance / meetings.count()) * 100
-        
-        # Timely data entry (within 24 hours)
-        timely_entries = meetings.filter(
-            created_at__lte=F('meeting_date') + timedelta(hours=24)
-        ).count()
-        timeliness_rate = (timely_entries / meetings.count()) * 100
-        
-        overall_score = (documentation_rate * 0.4) + (accuracy_rate * 0.4) + (timeliness_rate * 0.2)
-        return round(overall_score, 2)
+        return score_data_quality(meetings['count'], meetings['documented'], meetings['accurate'], meetings['timely'])
     
     def calculate_overall_performance_score(self):
         """Calculate weighted overall performance score"""
-        kpis = self.calculate_all_kpis()
+        return self.calculate_all_kpis()['overall_performance_score']
+
+class BatchKPICalculator:
+    """Calculate performance KPIs for many staff members at once
+
+    Every source table is read with one grouped aggregate covering all the
+    staff, so the query count does not depend on headcount. Scores are
+    identical to PerformanceKPICalculator's for each staff member.
+    """
+    
+    def __init__(self, staff_members, period_start=None, period_end=None):
+        self.staff_members = staff_members
+        default_start, default_end = kpi_period_bounds()
+        self.period_start = period_start or default_start
+        self.period_end = period_end or default_end
+    
+    @staticmethod
+    def grouped(queryset, key, **aggregates):
+        """{key value: aggregates} for queryset grouped on key"""
+        rows = queryset.values(key).annotate(**aggregates).order_by()
+        return {row.pop(key): row for row in rows}
+    
+    def calculate_all_kpis(self):
+        """{staff member pk: KPI dict} for every staff member"""
+        staff = self.staff_members
+        period = [self.period_start, self.period_end]
         
-        # Weighted average of all KPIs
-        weights = {
-            'farmer_engagement_score': 0.25,
-            'meeting_facilitation_score': 0.20,
-            'attendance_management_score': 0.15,
-            'video_call_engagement_score': 0.15,
-            'app_usage_score': 0.15,
-            'data_quality_score': 0.10,
-        }
+        groups = self.grouped(
+            CBOGroup.objects.filter(status='active', assigned_staff__in=staff), 'assigned_staff',
+            count=Count('id'), reach=Sum('total_members'),
+        )
+        meetings = self.grouped(
+            CBOMeeting.objects.filter(facilitator__in=staff, meeting_date__range=period), 'facilitator',
+            count=Count('id'),
+            avg_actual=Avg('actual_attendance'),
+            avg_expected=Avg('expected_attendance'),
+            completed=Count('id', filter=Q(status='completed')),
+            qr=Count('id', filter=Q(qr_code__isnull=False)),
+            complete=Count('id', filter=Q(actual_attendance__gt=0)),
+            documented=Count('id', filter=DOCUMENTED_MEETING),
+            accurate=Count('id', filter=ACCURATE_ATTENDANCE),
+            timely=Count('id', filter=TIMELY_ENTRY),
+        )
+        checkins = self.grouped(
+            FarmerAttendance.objects.filter(meeting__facilitator__in=staff, meeting__meeting_date__range=period),
+            'meeting__facilitator',
+            total=Count('id'), digital=Count('id', filter=Q(checkin_method__in=DIGITAL_CHECKIN_METHODS)),
+        )
+        hosted = self.grouped(
+            VideoCallSession.objects.filter(host__in=staff, scheduled_time__range=period), 'host',
+            count=Count('id'), completed=Count('id', filter=Q(status='completed')),
+        )
+        hosted_participants = self.grouped(
+            CallParticipant.objects.filter(
+                session__host__in=staff, session__scheduled_time__range=period, left_at__isnull=True
+            ), 'session__host',
+            count=Count('id'),
+        )
+        participations = self.grouped(
+            CallParticipant.objects.filter(staff_member__in=staff, join_time__range=period), 'staff_member',
+            count=Count('id'),
+        )
+        reviews = self.grouped(
+            PerformanceReview.objects.filter(staff__in=staff, review_date__range=period), 'staff',
+            count=Count('id'),
+        )
+        active_days = active_day_counts(
+            staff, timezone.localdate(self.period_start), timezone.localdate(self.period_end)
+        )
         
-        weighted_score = sum(kpis[kpi] * weight for kpi, weight in weights.items())
-        return round(weighted_score, 2)
+        no_meetings = {'count': 0, 'avg_actual': None, 'avg_expected': None, 'completed': 0,
+                       'qr': 0, 'complete': 0, 'documented': 0, 'accurate': 0, 'timely': 0}
+        results = {}
+        for member in staff:
+            pk = member.pk
+            group = groups.get(pk, {'count': 0, 'reach': None})
+            meeting = meetings.get(pk, no_meetings)
+            checkin = checkins.get(pk, {'total': 0, 'digital': 0})
+            hosted_calls = hosted.get(pk, {'count': 0, 'completed': 0})
+            participated = participations.get(pk, {'count': 0})['count']
+            
+            kpis = {
+                'farmer_engagement_score': score_farmer_engagement(group['count'], group['reach'] or 0, meeting['count']),
+                'meeting_facilitation_score': score_meeting_facilitation(
+                    meeting['count'], meeting['avg_actual'], meeting['avg_expected'], meeting['completed']
+                ),
+                'attendance_management_score': score_attendance_management(
+                    meeting['count'], meeting['qr'], checkin['total'], checkin['digital'], meeting['complete']
+                ),
+                'video_call_engagement_score': score_video_call_engagement(
+                    hosted_calls['count'], participated, hosted_calls['completed'],
+                    hosted_participants.get(pk, {'count': 0})['count']
+                ),
+                'app_usage_score': score_app_usage(
+                    meeting['count'], participated, reviews.get(pk, {'count': 0})['count'],
+                    active_days.get(pk, 0)
+                ),
+                'data_quality_score': score_data_quality(
+                    meeting['count'], meeting['documented'], meeting['accurate'], meeting['timely']
+                ),
+            }
+            kpis['overall_performance_score'] = score_overall_performance(kpis)
+            results[pk] = kpis
+        return results
+
+class ActivityKPICalculator:
+    """Calculate performance KPIs from the daily StaffActivityDay counters
+
+    The buckets of the kpi_period() are summed per staff member in one
+    grouped query (plus one for assigned CBO groups), so scores can be
+    refreshed after every piece of activity. The buckets are maintained by
+    staff_performance.activity.
+    """
+    
+    def __init__(self, staff_members, period_end=None):
+        self.staff_members = staff_members
+        self.period_start, self.period_end = kpi_period(period_end)
+    
+    def calculate_all_kpis(self):
+        """{staff member pk: KPI dict} for every staff member"""
+        staff = self.staff_members
+        counters = [field.name for field in StaffActivityDay._meta.concrete_fields
+                    if field.name not in ('id', 'staff', 'day', 'updated_at')]
+        
+        groups = BatchKPICalculator.grouped(
+            CBOGroup.objects.filter(status='active', assigned_staff__in=staff), 'assigned_staff',
+            count=Count('id'), reach=Sum('total_members'),
+        )
+        totals = BatchKPICalculator.grouped(
+            StaffActivityDay.objects.filter(staff__in=staff, day__range=[self.period_start, self.period_end]),
+            'staff', **{name: Sum(name) for name in counters}
+        )
+        active_days = active_day_counts(staff, self.period_start, self.period_end)
+        
+        empty = dict.fromkeys(counters, 0)
+        results = {}
+        for member in staff:
+            pk = member.pk
+            group = groups.get(pk, {'count': 0, 'reach': None})
+            day = totals.get(pk, empty)
+            meetings = day['meetings']
+            
+            kpis = {
+                'farmer_engagement_score': score_farmer_engagement(group['count'], group['reach'] or 0, meetings),
+                # The ratio of summed attendance equals the ratio of average attendance
+                'meeting_facilitation_score': score_meeting_facilitation(
+                    meetings, day['actual_attendance'], day['expected_attendance'], day['meetings_completed']
+                ),
+                'attendance_management_score': score_attendance_management(
+                    meetings, day['meetings_with_qr'], day['checkins'], day['digital_checkins'],
+                    day['meetings_with_attendance']
+                ),
+                'video_call_engagement_score': score_video_call_engagement(
+                    day['calls_hosted'], day['calls_joined'], day['calls_completed'], day['hosted_call_participants']
+                ),
+                'app_usage_score': score_app_usage(
+                    meetings, day['calls_joined'], day['reviews'], active_days.get(pk, 0)
+                ),
+                'data_quality_score': score_data_quality(
+                    meetings, day['meetings_documented'], day['meetings_accurate'], day['meetings_timely']
+                ),
+            }
+            kpis['overall_performance_score'] = score_overall_performance(kpis)
+            results[pk] = kpis
+        return results
 
 def update_staff_performance_scores():
     """Update performance scores for all active staff members"""
     active_staff = StaffMember.objects.filter(is_active=True)
-    
-    for staff in active_staff:
-        calculator = PerformanceKPICalculator(staff)
-        kpis = calculator.calculate_all_kpis()
-        
-        # Update overall performance score
+    all_kpis = BatchKPICalculator(active_staff).calculate_all_kpis()
+    save_performance_scores(active_staff, all_kpis)
+
+def save_performance_scores(staff_members, all_kpis, period_start=None, period_end=None):
+    """Store overall scores and one PerformanceMetric per KPI with bulk writes in one transaction"""
+    now = timezone.now()
+    if period_start is None or period_end is None:
+        period_start, period_end = kpi_period(period_end)
+    metrics = []
+    for staff in staff_members:
+        kpis = all_kpis[staff.pk]
         staff.overall_performance_score = kpis['overall_performance_score']
-        staff.save()
-        
-        # Create/update performance metrics
-        for kpi_name, score in kpis.items():
-            if kpi_name != 'overall_performance_score':
-                PerformanceMetric.objects.update_or_create(
-                    staff=staff,
-                    metric_name=kpi_name,
-                    period_end=timezone.now().date(),
-                    defaults={
-                        'metric_category': 'productivity',
-                        'target_value': 100,
-                        'actual_value': score,
-                        'achievement_rate': score,
-                        'period_start': timezone.now().date() - timedelta(days=30),
-                    }
-                )
+        staff.updated_at = now  # bulk_update skips auto_now
+        
+        for kpi_name in KPI_WEIGHTS:
+            metric = PerformanceMetric(
+                staff=staff,
+                metric_name=kpi_name,
+                period_end=period_end,
+                metric_category='productivity',
+                target_value=100,
+                actual_value=kpis[kpi_name],
+                achievement_rate=kpis[kpi_name],
+                period_start=period_start,
+            )
+            metric.calculate_achievement_rate()
+            metrics.append(metric)
+    
+    with transaction.atomic():
+        StaffMember.objects.bulk_update(
+            staff_members, ['overall_performance_score', 'updated_at'], batch_size=BULK_BATCH_SIZE
+        )
+        # Insert new metrics and overwrite the ones already recorded for this period end
+        PerformanceMetric.objects.bulk_create(
+            metrics,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['staff', 'metric_name', 'period_end'],
+            update_fields=['metric_category', 'target_value', 'actual_value', 'achievement_rate',
+                           'period_start', 'updated_at'],
+        )
+
+# Sharded recomputation
+#
+# Staff are split into shards, by department or by contiguous primary-key
+# range. Each shard is computed independently, in a worker process for the
+# management command or as a Celery task for scheduled runs. The command merges
+# the results and stores them in a single transaction; each Celery task stores
+# its own shard. Shard results are keyed by the staff pk as a string.
+
+def plan_shards(staff_members, shard_by='id', shards=4):
+    """Shard specs covering staff_members: one per department, or up to `shards` pk ranges"""
+    if shard_by == 'department':
+        departments = staff_members.order_by().values_list('department', flat=True).distinct()
+        return [{'department': department} for department in sorted(departments)]
+    
+    pks = [str(pk) for pk in staff_members.order_by('pk').values_list('pk', flat=True)]
+    size = max(1, -(-len(pks) // shards))
+    return [{'pk_range': [pks[i], pks[min(i + size, len(pks)) - 1]]} for i in range(0, len(pks), size)]
+
+def shard_queryset(spec):
+    """Active staff members in a shard"""
+    staff = StaffMember.objects.filter(is_active=True)
+    if 'department' in spec:
+        return staff.filter(department=spec['department'])
+    first, last = spec['pk_range']
+    return staff.filter(pk__gte=first, pk__lte=last)
+
+def calculate_shard(spec, period_start, period_end):
+    """KPIs for every staff member in a shard, keyed by staff pk string"""
+    calculator = BatchKPICalculator(shard_queryset(spec), period_start, period_end)
+    return {str(pk): kpis for pk, kpis in calculator.calculate_all_kpis().items()}
+
+def merge_shard_results(results, period_start, period_end):
+    """Store the combined results of all shards; returns the number of staff updated"""
+    merged = {}
+    for result in results:
+        merged.update(result)
+    
+    staff = list(StaffMember.objects.filter(pk__in=list(merged)))
+    all_kpis = {member.pk: merged[str(member.pk)] for member in staff}
+    save_performance_scores(staff, all_kpis, timezone.localdate(period_start), timezone.localdate(period_end))
+    return len(staff)
+
+def recompute_staff_kpis(shard_by='id', shards=None, workers=None, period_start=None, period_end=None, progress=None):
+    """Recompute KPIs for all active staff, running shards in a process pool
+
+    `progress(done, total, spec)` is called as each shard finishes. With one
+    worker the shards run in this process. Returns the number of staff updated.
+    """
+    workers = workers or os.cpu_count() or 1
+    if period_start is None or period_end is None:
+        period_start, period_end = kpi_period_bounds()
+    specs = plan_shards(StaffMember.objects.filter(is_active=True), shard_by, shards or workers)
+    
+    results = []
+    if workers == 1:
+        for done, spec in enumerate(specs, start=1):
+            results.append(calculate_shard(spec, period_start, period_end))
+            if progress:
+                progress(done, len(specs), spec)
+    else:
+        # Forked workers must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            futures = {pool.submit(calculate_shard, spec, period_start, period_end): spec for spec in specs}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results.append(future.result())
+                if progress:
+                    progress(done, len(specs), futures[future])
+    
+    return merge_shard_results(results, period_start, period_end)
@@ -0,0 +1,97 @@
+# staff_performance/ledger.py
+"""
+Activity ledger
+
+UserActiveDay holds one row per user per day on which they used the app, for
+the consistency part of the app usage KPI. Days are recorded by
+ActiveDayMiddleware on every authenticated request and by the engagement and
+video-call signals. Each process buffers them: a (user, day) pair it has
+already stored costs a set lookup, and new pairs are written together in one
+bulk INSERT once ACTIVE_DAY_FLUSH_SIZE are waiting or ACTIVE_DAY_FLUSH_INTERVAL
+seconds have passed.
+"""
+
+import threading
+import time
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.utils import timezone
+from .models import StaffMember, UserActiveDay
+from farmer_engagement.models import CBOMeeting, FarmerAttendance
+from video_calls.models import VideoCallSession, CallParticipant
+
+ACTIVE_DAY_FLUSH_SIZE = 100
+ACTIVE_DAY_FLUSH_INTERVAL = 30
+
+# Model -> (staff path, date path) of the activity its rows record
+ACTIVE_DAY_PATHS = {
+    CBOMeeting: [('facilitator', 'meeting_date')],
+    FarmerAttendance: [('meeting__facilitator', 'check_in_time')],
+    VideoCallSession: [('host', 'actual_start_time')],
+    CallParticipant: [('staff_member', 'join_time')],
+}
+
+_lock = threading.Lock()
+_pending_users = set()
+_pending_staff = set()
+# Today's (user pk, day) pairs already stored by this process
+_stored = set()
+_last_flush = time.monotonic()
+
+def record_active_day(user_id, day=None):
+    """Note that a user was active on a day, today by default"""
+    key = (user_id, day or timezone.localdate())
+    if key in _stored:
+        return
+    with _lock:
+        _pending_users.add(key)
+
+def record_staff_active_days(buckets):
+    """Note (staff pk, day) pairs of activity; days still to come are ignored"""
+    today = timezone.localdate()
+    with _lock:
+        _pending_staff.update((staff_id, day) for staff_id, day in buckets if day <= today)
+
+def flush_active_days(force=False):
+    """Store the buffered days with one bulk insert when due; returns the number written"""
+    global _last_flush
+    with _lock:
+        waiting = len(_pending_users) + len(_pending_staff)
+        due = waiting >= ACTIVE_DAY_FLUSH_SIZE or time.monotonic() - _last_flush >= ACTIVE_DAY_FLUSH_INTERVAL
+        if not waiting or not (force or due):
+            return 0
+        pairs, staff = set(_pending_users), set(_pending_staff)
+        _pending_users.clear()
+        _pending_staff.clear()
+        _last_flush = time.monotonic()
+
+    if staff:
+        staff_users = dict(StaffMember.objects.filter(
+            pk__in={staff_id for staff_id, day in staff}
+        ).values_list('pk', 'user_id'))
+        pairs.update((staff_users[staff_id], day) for staff_id, day in staff if staff_id in staff_users)
+    pairs -= _stored
+    # Users deleted since their request was buffered
+    users = set(get_user_model().objects.filter(
+        pk__in={user_id for user_id, day in pairs}
+    ).values_list('pk', flat=True))
+    pairs = {(user_id, day) for user_id, day in pairs if user_id in users}
+    UserActiveDay.objects.bulk_create(
+        [UserActiveDay(user_id=user_id, day=day) for user_id, day in pairs], ignore_conflicts=True
+    )
+
+    today = timezone.localdate()
+    with _lock:
+        # Only today's pairs are worth remembering
+        for user_id, day in list(_stored):
+            if day != today:
+                _stored.discard((user_id, day))
+        _stored.update((user_id, day) for user_id, day in pairs if day == today)
+    return len(pairs)
+
+def active_day_counts(staff_members, start, end):
+    """{staff pk: number of active days from start to end} for staff with any"""
+    rows = UserActiveDay.objects.filter(
+        user__staff_profile__in=staff_members, day__range=[start, end]
+    ).values('user__staff_profile').annotate(days=Count('id')).order_by()
+    return {row['user__staff_profile']: row['days'] for row in rows}
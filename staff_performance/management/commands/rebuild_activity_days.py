@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from staff_performance.activity import rebuild_activity_days
+from staff_performance.kpi_calculations import KPI_WINDOW_DAYS
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily staff activity counters behind incremental KPIs from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=KPI_WINDOW_DAYS, help='Number of days ending today to rebuild')
+        parser.add_argument('--all', action='store_true', help='Rebuild every day instead')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            stored = rebuild_activity_days()
+        else:
+            today = timezone.localdate()
+            stored = rebuild_activity_days(start=today - timedelta(days=options['days'] - 1), end=today)
+        self.stdout.write(self.style.SUCCESS(f'Stored {stored} staff activity days'))
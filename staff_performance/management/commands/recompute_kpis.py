@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from staff_performance.kpi_calculations import kpi_period_bounds, recompute_staff_kpis
+
+class Command(BaseCommand):
+    help = 'Recompute staff performance KPIs, sharded over a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shard-by', choices=['id', 'department'], default='id', help='How to split staff into shards')
+        parser.add_argument('--shards', type=int, help='Number of id-range shards (default: one per worker)')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+        parser.add_argument('--days', type=int, default=30, help='Days in the KPI period ending today')
+
+    def handle(self, *args, **options):
+        period_start, period_end = kpi_period_bounds(days=options['days'])
+
+        def progress(done, total, spec):
+            self.stdout.write(f'Shard {done}/{total} done: {spec}')
+
+        started = time.monotonic()
+        updated = recompute_staff_kpis(
+            shard_by=options['shard_by'],
+            shards=options['shards'],
+            workers=options['workers'],
+            period_start=period_start,
+            period_end=period_end,
+            progress=progress,
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Updated KPIs for {updated} staff members in {elapsed:.1f}s'))
@@ -0,0 +1,17 @@
+# staff_performance/middleware.py
+from .ledger import flush_active_days, record_active_day
+
+class ActiveDayMiddleware:
+    """Record each authenticated request's day in the activity ledger"""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        # Checked after the view, so users authenticated by DRF are included
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            record_active_day(user.pk)
+            flush_active_days()
+        return response
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_performance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffActivityDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('meetings', models.PositiveIntegerField(default=0)),
+                ('meetings_completed', models.PositiveIntegerField(default=0)),
+                ('meetings_with_qr', models.PositiveIntegerField(default=0)),
+                ('meetings_with_attendance', models.PositiveIntegerField(default=0)),
+                ('meetings_documented', models.PositiveIntegerField(default=0)),
+                ('meetings_accurate', models.PositiveIntegerField(default=0)),
+                ('meetings_timely', models.PositiveIntegerField(default=0)),
+                ('expected_attendance', models.IntegerField(default=0)),
+                ('actual_attendance', models.IntegerField(default=0)),
+                ('checkins', models.PositiveIntegerField(default=0)),
+                ('digital_checkins', models.PositiveIntegerField(default=0)),
+                ('calls_hosted', models.PositiveIntegerField(default=0)),
+                ('calls_completed', models.PositiveIntegerField(default=0)),
+                ('hosted_call_participants', models.PositiveIntegerField(default=0)),
+                ('calls_joined', models.PositiveIntegerField(default=0)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_days', to='staff_performance.staffmember')),
+            ],
+            options={
+                'verbose_name': 'Staff Activity Day',
+                'verbose_name_plural': 'Staff Activity Days',
+                'db_table': 'staff_performance_activity_day',
+                'unique_together': {('staff', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_performance', '0002_staffactivityday'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActiveDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='active_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Active Day',
+                'verbose_name_plural': 'User Active Days',
+                'db_table': 'staff_performance_active_day',
+                'unique_together': {('user', 'day')},
+            },
+        ),
+    ]
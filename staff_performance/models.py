@@ -250,9 +250,13 @@ class PerformanceMetric(TimeStampedModel):
     
     def save(self, *args, **kwargs):
         """Calculate achievement rate automatically"""
+        self.calculate_achievement_rate()
+        super().save(*args, **kwargs)
+    
+    def calculate_achievement_rate(self):
+        """Achievement rate from target and actual values; call before bulk writes, which skip save()"""
         if self.target_value and self.actual_value and self.target_value > 0:
             self.achievement_rate = (self.actual_value / self.target_value) * 100
-        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.staff.full_name} - {self.metric_name} ({self.period_end})"
@@ -669,3 +673,53 @@ class TrainingDevelopment(TimeStampedModel):
         today = timezone.now().date()
         return (self.status == 'in_progress' and 
                 self.start_date <= today <= self.end_date)
+
+class StaffActivityDay(models.Model):
+    """One staff member's KPI activity counters for a day, maintained by staff_performance.activity"""
+    staff = models.ForeignKey(StaffMember, on_delete=models.CASCADE, related_name='activity_days')
+    day = models.DateField()
+    
+    # Meetings facilitated, bucketed by meeting date
+    meetings = models.PositiveIntegerField(default=0)
+    meetings_completed = models.PositiveIntegerField(default=0)
+    meetings_with_qr = models.PositiveIntegerField(default=0)
+    meetings_with_attendance = models.PositiveIntegerField(default=0)
+    meetings_documented = models.PositiveIntegerField(default=0)
+    meetings_accurate = models.PositiveIntegerField(default=0)
+    meetings_timely = models.PositiveIntegerField(default=0)
+    expected_attendance = models.IntegerField(default=0)
+    actual_attendance = models.IntegerField(default=0)
+    checkins = models.PositiveIntegerField(default=0)
+    digital_checkins = models.PositiveIntegerField(default=0)
+    
+    # Video calls hosted (by scheduled time) and joined (by join time)
+    calls_hosted = models.PositiveIntegerField(default=0)
+    calls_completed = models.PositiveIntegerField(default=0)
+    hosted_call_participants = models.PositiveIntegerField(default=0)
+    calls_joined = models.PositiveIntegerField(default=0)
+    
+    reviews = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'staff_performance_activity_day'
+        verbose_name = 'Staff Activity Day'
+        verbose_name_plural = 'Staff Activity Days'
+        unique_together = ['staff', 'day']
+    
+    def __str__(self):
+        return f"{self.staff_id} - {self.day}"
+
+class UserActiveDay(models.Model):
+    """A day on which a user was active in the app, recorded by staff_performance.ledger"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='active_days')
+    day = models.DateField()
+    
+    class Meta:
+        db_table = 'staff_performance_active_day'
+        verbose_name = 'User Active Day'
+        verbose_name_plural = 'User Active Days'
+        unique_together = ['user', 'day']
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.day}"
@@ -1,9 +1,13 @@
 # staff_performance/signals.py
 # Signal handlers for Staff Performance module
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from functools import partial
+from django.db import transaction
+from .activity import ACTIVITY_BUCKETS, activity_buckets, mark_activity, resolve, stored_buckets
+from .ledger import ACTIVE_DAY_PATHS, flush_active_days, record_staff_active_days
 from .models import StaffMember
 
 @receiver(post_save, sender=get_user_model())
@@ -19,7 +23,8 @@ def create_staff_profile(sender, instance, created, **kwargs):
                 'employee_id': f"EMP{instance.id:06d}",
                 'department': 'field_operations',
                 'position_title': 'Staff Member',
-                'position_level': 'officer'
+                'position_level': 'officer',
+                'hire_date': instance.date_joined.date(),
             }
         )
 
@@ -30,3 +35,34 @@ def update_performance_score(sender, instance, **kwargs):
     """
     # This will be implemented when we have performance calculations
     pass
+
+# Activity ledger: engagement and video-call activity marks the staff member's day as active
+def record_active_days(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_staff_active_days(activity_buckets(sender, lambda path: resolve(instance, path), ACTIVE_DAY_PATHS))
+    # Connected before the KPI counters below, so the days are stored before their refresh reads them
+    transaction.on_commit(partial(flush_active_days, force=True))
+
+for model in ACTIVE_DAY_PATHS:
+    post_save.connect(record_active_days, sender=model, dispatch_uid=f'active_day_{model.__name__}')
+
+# Incremental KPI counters: note the activity buckets a write touches, before
+# and after the change, so they are recomputed when the transaction commits
+ACTIVITY_MODELS = list(ACTIVITY_BUCKETS)
+
+def remember_activity_buckets(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._stored_activity_buckets = stored_buckets(sender, instance.pk)
+
+def record_activity(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    buckets = activity_buckets(sender, lambda path: resolve(instance, path))
+    mark_activity(buckets | getattr(instance, '_stored_activity_buckets', set()))
+
+for model in ACTIVITY_MODELS:
+    pre_save.connect(remember_activity_buckets, sender=model, dispatch_uid=f'activity_before_{model.__name__}')
+    post_save.connect(record_activity, sender=model, dispatch_uid=f'activity_save_{model.__name__}')
+    post_delete.connect(record_activity, sender=model, dispatch_uid=f'activity_delete_{model.__name__}')
@@ -0,0 +1,67 @@
+# staff_performance/tasks.py
+"""
+Scheduled KPI recomputation: one Celery task per shard of staff, each storing
+its own shard's scores, so no result backend is needed.
+Activity buckets touched by a write are refreshed by refresh_activity_task.
+"""
+
+import uuid
+from celery import shared_task
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+from datetime import date
+from .activity import refresh_activity
+from .kpi_calculations import calculate_shard, kpi_period_bounds, merge_shard_results, plan_shards
+from .models import StaffMember
+
+# Cache keys holding a run's shard count and finished shards
+PROGRESS_KEY = 'kpi_recompute:{run_id}'
+PROGRESS_TTL = 60 * 60 * 6
+
+@shared_task
+def recompute_staff_kpis_task(shard_by='department', shards=8):
+    """Fan the KPI recomputation out over one task per shard; returns the run id"""
+    run_id = uuid.uuid4().hex
+    period_start, period_end = kpi_period_bounds()
+    specs = plan_shards(StaffMember.objects.filter(is_active=True), shard_by, shards)
+    
+    key = PROGRESS_KEY.format(run_id=run_id)
+    cache.set_many({f'{key}:total': len(specs), f'{key}:done': 0}, PROGRESS_TTL)
+    period = [period_start.isoformat(), period_end.isoformat()]
+    for spec in specs:
+        calculate_kpi_shard_task.delay(spec, *period, run_id=run_id)
+    return run_id
+
+@shared_task
+def calculate_kpi_shard_task(spec, period_start, period_end, run_id=None):
+    """Compute and store KPIs for one shard of staff; returns the number of staff updated"""
+    period_start, period_end = parse_datetime(period_start), parse_datetime(period_end)
+    updated = merge_shard_results([calculate_shard(spec, period_start, period_end)], period_start, period_end)
+    if run_id:
+        count_finished_shard(run_id)
+    return updated
+
+def count_finished_shard(run_id):
+    """Count a finished shard, even where the worker's cache never saw the run start
+
+    Progress is only accurate with a cache shared by all workers (Redis); a
+    process-local cache counts the shards that worker ran.
+    """
+    key = f'{PROGRESS_KEY.format(run_id=run_id)}:done'
+    cache.add(key, 0, PROGRESS_TTL)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Expired between add and incr
+        pass
+
+def kpi_recompute_progress(run_id):
+    """Shards finished and in total for a recomputation run"""
+    key = PROGRESS_KEY.format(run_id=run_id)
+    progress = cache.get_many([f'{key}:done', f'{key}:total'])
+    return {'done': progress.get(f'{key}:done', 0), 'total': progress.get(f'{key}:total', 0)}
+
+@shared_task
+def refresh_activity_task(buckets):
+    """Recompute [staff pk, ISO day] activity buckets and refresh those staff members' scores"""
+    refresh_activity({(staff_id, date.fromisoformat(day)) for staff_id, day in buckets})
@@ -1,5 +1,4 @@
 # staff_performance/views.py
-import csv
 import json
 from django.http import HttpResponse, JsonResponse
 from django.views.generic import ListView, DetailView, CreateView, TemplateView, View
@@ -10,6 +9,7 @@ from django.db.models import Avg, Count, Sum
 from django.contrib import messages
 from django.urls import reverse
 
+from core.export_import import stream_csv
 from .models import StaffMember, PerformanceMetric, PerformanceReview, KeyPerformanceIndicator
 from .forms import PerformanceMetricUploadForm
 
@@ -110,27 +110,37 @@ class PerformanceReport(LoginRequiredMixin, TemplateView):
     template_name = 'staff_performance/performance_report.html'
 
 # Function-based views
+PERFORMANCE_METRIC_EXPORT_COLUMNS = [
+    ('Staff Name', 'staff__user__get_full_name'),
+    ('Metric Name', 'metric_name'),
+    ('Category', 'get_metric_category_display'),
+    ('Target', 'target_value'),
+    ('Actual', 'actual_value'),
+    ('Achievement Rate', 'achievement_rate'),
+    ('Period End', 'period_end'),
+]
+
+KPI_EXPORT_COLUMNS = [
+    ('KPI Name', 'name'),
+    ('Department', 'get_department_display'),
+    ('Type', 'get_kpi_type_display'),
+    ('Target', 'target_value'),
+    ('Current', 'current_value'),
+    ('Achievement %', 'achievement_percentage'),
+    ('Status', 'status'),
+]
+
+PERFORMANCE_REPORT_EXPORT_COLUMNS = [
+    ('Staff Name', 'user__get_full_name'),
+    ('Department', 'get_department_display'),
+    ('Position', 'position_title'),
+    ('Performance Score', 'overall_performance_score'),
+    ('Last Review', lambda staff: staff.last_performance_review or 'Never'),
+]
+
 def export_performance_metrics(request):
     """Export performance metrics to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="performance_metrics.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Staff Name', 'Metric Name', 'Category', 'Target', 'Actual', 'Achievement Rate', 'Period End'])
-    
-    metrics = PerformanceMetric.objects.select_related('staff__user').all()
-    for metric in metrics:
-        writer.writerow([
-            metric.staff.user.get_full_name(),
-            metric.metric_name,
-            metric.get_metric_category_display(),
-            metric.target_value,
-            metric.actual_value,
-            metric.achievement_rate,
-            metric.period_end.strftime('%Y-%m-%d')
-        ])
-    
-    return response
+    return stream_csv(PerformanceMetric.objects.all(), PERFORMANCE_METRIC_EXPORT_COLUMNS, 'performance_metrics.csv')
 
 def upload_performance_metrics(request):
     """Upload performance metrics via CSV"""
@@ -146,42 +156,10 @@ def upload_performance_metrics(request):
 
 def export_kpis(request):
     """Export KPIs to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="organizational_kpis.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['KPI Name', 'Department', 'Type', 'Target', 'Current', 'Achievement %', 'Status'])
-    
     kpis = KeyPerformanceIndicator.objects.filter(is_active=True)
-    for kpi in kpis:
-        writer.writerow([
-            kpi.name,
-            kpi.get_department_display(),
-            kpi.get_kpi_type_display(),
-            kpi.target_value,
-            kpi.current_value,
-            kpi.achievement_percentage,
-            kpi.status
-        ])
-    
-    return response
+    return stream_csv(kpis, KPI_EXPORT_COLUMNS, 'organizational_kpis.csv')
 
 def export_performance_report(request):
     """Export comprehensive performance report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="performance_report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Staff Name', 'Department', 'Position', 'Performance Score', 'Last Review'])
-    
-    staff_members = StaffMember.objects.filter(is_active=True).select_related('user')
-    for staff in staff_members:
-        writer.writerow([
-            staff.user.get_full_name(),
-            staff.get_department_display(),
-            staff.position_title,
-            staff.overall_performance_score,
-            staff.last_performance_review.strftime('%Y-%m-%d') if staff.last_performance_review else 'Never'
-        ])
-    
-    return response
+    staff_members = StaffMember.objects.filter(is_active=True)
+    return stream_csv(staff_members, PERFORMANCE_REPORT_EXPORT_COLUMNS, 'performance_report.csv')
@@ -14,6 +14,15 @@ if not settings.configured:
 
 User = get_user_model()
 
+# ---------------------------------------
+# Markers
+# ---------------------------------------
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'perf: latency budget with a wide margin over the expected time; deselect with -m "not perf"'
+    )
+
 # ---------------------------------------
 # Global Fixtures
 # ---------------------------------------
@@ -23,6 +32,12 @@ def client():
     """Provide Django test client."""
     return Client()
 
+@pytest.fixture
+def eager_celery(settings, tmp_path):
+    """Run Celery tasks inline and keep generated files out of the repo."""
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    settings.MEDIA_ROOT = str(tmp_path)
+
 @pytest.fixture
 def admin_user(db):
     """Fixture for system admin user."""
@@ -0,0 +1,169 @@
+import pytest
+from datetime import date, datetime, timezone as dt_timezone
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.analytics import DASHBOARD_CACHE_TTL, AnalyticsEngine, dashboard_cache_key
+from farmers.models import Farmer, FarmPlot, Household, Location
+from finances.models import Budget, Expense
+from indicators.models import PerformanceIndicator
+from projects.models import Project
+
+
+@pytest.fixture
+def dashboard_data(db):
+    active = Project.objects.create(name='Maize Yield', code='MZ001', budget=1000, status='active', progress=80)
+    Project.objects.create(name='Irrigation', code='IR001', budget=3000, status='completed', progress=100)
+    Project.objects.create(name='Storage', code='ST001', budget=2000, status='planned', progress=10)
+    budget = Budget.objects.create(
+        project=active, name='Seeds', allocated_amount=1000,
+        start_date='2025-01-01', end_date='2025-12-31'
+    )
+    for amount in (100, 400):
+        Expense.objects.create(project=active, budget=budget, description='Seeds', amount=amount, date='2025-02-01')
+
+    location = Location.objects.create(name='Kaduna North', district='Kaduna', region='North West')
+    household = Household.objects.create(head_of_household='Amina Bello', family_size=5, location=location)
+    young = Farmer.objects.create(
+        first_name='Musa', last_name='Bello', gender='male', household=household,
+        date_of_birth=date(date.today().year - 25, 1, 1)
+    )
+    Farmer.objects.create(
+        first_name='Hauwa', last_name='Bello', gender='female', household=household,
+        date_of_birth=date(date.today().year - 50, 1, 1)
+    )
+    Farmer.objects.create(first_name='Sani', last_name='Bello', gender='male', household=household)
+    FarmPlot.objects.create(farmer=young, size_acres=2)
+    FarmPlot.objects.create(farmer=young, size_acres=4)
+
+    PerformanceIndicator.objects.create(
+        project=active, category='yield', description='Yield per acre',
+        baseline_value=1, current_value=3, target_value=2, measurement_date='2025-03-01'
+    )
+    return active
+
+
+# =====================================================
+# ANALYTICS ENGINE TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestAnalyticsEngine:
+    def test_project_metrics(self, dashboard_data):
+        """Conditional aggregates give the same figures as separate queries."""
+        metrics = AnalyticsEngine.get_project_metrics()
+        assert metrics['total_projects'] == 3
+        assert metrics['active_projects'] == 1
+        assert metrics['completed_projects'] == 1
+        assert metrics['total_budget'] == 6000
+        assert metrics['projects_on_track'] == 2
+        assert metrics['projects_behind'] == 1
+        assert metrics['total_expenses'] == 500
+        assert metrics['remaining_budget'] == 5500
+
+    def test_farmer_metrics(self, dashboard_data):
+        """Farmer counts, gender split and ages come from one scan of farmers."""
+        metrics = AnalyticsEngine.get_farmer_metrics()
+        assert metrics['total_farmers'] == 3
+        assert metrics['total_households'] == 1
+        assert metrics['total_farm_plots'] == 2
+        assert metrics['gender_distribution'] == {'male': 2, 'female': 1}
+        assert metrics['young_farmers'] == 1
+        assert metrics['experienced_farmers'] == 1
+        assert metrics['average_farm_size'] == 3
+        assert metrics['total_land_area'] == 6
+
+    def test_gender_outside_choices_is_counted_as_unknown(self, dashboard_data):
+        """Blank or legacy gender values land in an "unknown" bucket instead of vanishing."""
+        Farmer.objects.filter(first_name='Sani').update(gender='')
+        metrics = AnalyticsEngine.get_farmer_metrics()
+        assert metrics['gender_distribution'] == {'male': 1, 'female': 1, 'unknown': 1}
+
+    def test_financial_metrics_and_indicators(self, dashboard_data):
+        finances = AnalyticsEngine.get_financial_metrics()
+        assert finances['total_expenses_count'] == 2
+        assert finances['budget_variance'] == 5500
+        indicators = AnalyticsEngine.get_performance_indicators()
+        assert indicators['Maize Yield - yield (2025-03-01)']['status'] == 'Achieved'
+
+    def test_dashboard_summary_query_count(self, dashboard_data, django_assert_num_queries):
+        """The summary costs one query per table however much data there is."""
+        with django_assert_num_queries(6):
+            summary = AnalyticsEngine.get_dashboard_summary()
+        assert 'error' not in summary
+
+        household = Household.objects.get()
+        for i in range(20):
+            Farmer.objects.create(first_name=f'Farmer{i}', last_name='Test', gender='other', household=household)
+        with django_assert_num_queries(6):
+            summary = AnalyticsEngine.get_dashboard_summary()
+        assert summary['farmers']['total_farmers'] == 23
+
+
+# =====================================================
+# DASHBOARD CACHE TESTS
+# =====================================================
+@pytest.fixture
+def dashboard_cache(dashboard_data, eager_celery):
+    """Start from an empty cache with refreshes run inline."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestDashboardCache:
+    def test_cache_hit_runs_no_queries(self, dashboard_cache, django_assert_num_queries):
+        AnalyticsEngine.get_cached_dashboard_summary()
+        with django_assert_num_queries(0):
+            summary = AnalyticsEngine.get_cached_dashboard_summary()
+        assert summary['farmers']['total_farmers'] == 3
+        assert 'error' not in summary
+
+    def test_write_invalidates_only_dependent_sections(
+            self, dashboard_cache, django_capture_on_commit_callbacks, django_assert_num_queries):
+        """A new farmer refreshes the farmer section; the other sections stay cached."""
+        AnalyticsEngine.get_cached_dashboard_summary()
+        with django_capture_on_commit_callbacks(execute=True):
+            Farmer.objects.create(first_name='Ada', last_name='Bello', gender='female',
+                                  household=Household.objects.get())
+
+        # The stale value is served while the refresh (inline here) recomputes it
+        with django_assert_num_queries(3):
+            summary = AnalyticsEngine.get_cached_dashboard_summary()
+        assert summary['farmers']['total_farmers'] == 3
+
+        with django_assert_num_queries(0):
+            summary = AnalyticsEngine.get_cached_dashboard_summary()
+        assert summary['farmers']['total_farmers'] == 4
+
+    def test_expired_section_served_stale_then_refreshed(self, dashboard_cache):
+        AnalyticsEngine.get_cached_dashboard_summary()
+        key = dashboard_cache_key('projects')
+        entry = cache.get(key)
+        entry['computed_at'] -= DASHBOARD_CACHE_TTL + 1
+        cache.set(key, entry)
+        Project.objects.create(name='Dairy', code='DY001', budget=500)
+
+        summary = AnalyticsEngine.get_cached_dashboard_summary()
+        assert summary['projects']['total_projects'] == 3
+        assert summary['last_updated'] == datetime.fromtimestamp(entry['computed_at'], tz=dt_timezone.utc).isoformat()
+        assert AnalyticsEngine.get_cached_dashboard_summary()['projects']['total_projects'] == 4
+
+    def test_dashboard_metrics_endpoint(self, dashboard_cache, field_officer):
+        assert APIClient().get(reverse('dashboard-metrics')).status_code == 401
+        client = APIClient()
+        client.force_authenticate(field_officer)
+        response = client.get(reverse('dashboard-metrics'))
+        assert response.status_code == 200
+        assert response.data['projects']['total_projects'] == 3
+
+    def test_dashboard_metrics_failure_hides_the_exception(self, field_officer, monkeypatch):
+        def fail():
+            raise RuntimeError('no such table: projects_project')
+
+        monkeypatch.setattr(AnalyticsEngine, 'get_cached_dashboard_summary', staticmethod(fail))
+        client = APIClient()
+        client.force_authenticate(field_officer)
+        response = client.get(reverse('dashboard-metrics'))
+        assert response.status_code == 500
+        assert response.data == {'error': 'Dashboard metrics are unavailable'}
@@ -0,0 +1,78 @@
+import pytest
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from gates_tracker.models import DashboardSnapshot
+from gates_tracker.snapshots import SNAPSHOT_AGE_HEADER, SNAPSHOT_RETENTION, build_dashboard_snapshot
+from gates_tracker.tasks import build_dashboard_snapshot_task
+from staff_performance.models import StaffMember
+
+
+def snapshot_at(days_ago, success_rate, hour=12):
+    day = timezone.now().replace(hour=hour, minute=0, second=0, microsecond=0)
+    return DashboardSnapshot.objects.create(
+        snapshot_date=day - timedelta(days=days_ago),
+        metrics={'success_rate': success_rate},
+    )
+
+
+# =====================================================
+# SNAPSHOT PIPELINE TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestDashboardSnapshots:
+    def test_snapshot_metrics(self, field_officer, project_manager):
+        StaffMember.objects.filter(user=field_officer).update(overall_performance_score=80)
+        StaffMember.objects.filter(user=project_manager).update(overall_performance_score=90, is_active=False)
+
+        metrics = build_dashboard_snapshot().metrics
+        assert metrics['total_staff'] == 2
+        assert metrics['active_staff'] == 1
+        assert metrics['average_performance_score'] == 80
+        assert metrics['success_rate'] == 80
+
+    def test_trend_from_history(self, db):
+        snapshot_at(3, 70)
+        snapshot_at(1, 60)
+        # Only the latest snapshot of a day counts
+        snapshot_at(1, 65, hour=18)
+        snapshot_at(9, 99)
+
+        trend = build_dashboard_snapshot().metrics['performance_trend']
+        assert trend == [0, 0, 0, 70, 0, 65, 0]
+
+    def test_expired_snapshots_pruned(self, db, settings):
+        settings.CELERY_TASK_ALWAYS_EAGER = True
+        expired = snapshot_at(SNAPSHOT_RETENTION.days + 1, 50)
+        build_dashboard_snapshot_task.delay()
+        assert not DashboardSnapshot.objects.filter(pk=expired.pk).exists()
+        assert DashboardSnapshot.objects.count() == 1
+
+
+# =====================================================
+# SNAPSHOT VIEW TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestSnapshotViews:
+    def test_dashboard_served_from_latest_snapshot(self, client, admin_user, django_assert_max_num_queries):
+        build_dashboard_snapshot()
+        DashboardSnapshot.objects.update(snapshot_date=timezone.now() - timedelta(minutes=5))
+        client.force_login(admin_user)
+
+        with django_assert_max_num_queries(3):
+            response = client.get(reverse('dashboard_statistics'))
+        assert response.status_code == 200
+        assert response.json()['total_staff'] == 1
+        assert response.json()['active_farmers'] == 0
+        assert 299 <= int(response[SNAPSHOT_AGE_HEADER]) <= 305
+
+    def test_older_snapshot_still_reports_active_farmers(self, client, admin_user):
+        DashboardSnapshot.objects.create(snapshot_date=timezone.now(), metrics={'farmers_engaged': 4})
+        client.force_login(admin_user)
+        assert client.get(reverse('dashboard_statistics')).json()['active_farmers'] == 4
+
+    def test_first_request_builds_snapshot(self, client, db):
+        response = client.get(reverse('dashboard'))
+        assert response.status_code == 200
+        assert response[SNAPSHOT_AGE_HEADER] == '0'
+        assert DashboardSnapshot.objects.count() == 1
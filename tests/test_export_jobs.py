@@ -0,0 +1,167 @@
+import csv
+import pytest
+from datetime import timedelta
+from io import BytesIO, StringIO
+from openpyxl import load_workbook
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.export_import import DELTA_COMMIT_LAG, write_export
+from finances.models import Budget, ExportJob
+from finances.tasks import EXPORT_JOB_STALE_AFTER, export_financial_data_async, requeue_stale_export_jobs
+from projects.models import Project
+
+
+@pytest.fixture
+def budgets(db):
+    project = Project.objects.create(name='Irrigation', code='IR001', budget=50000)
+    for i in range(5):
+        Budget.objects.create(
+            project=project, name=f'Budget {i}', budget_type='capital' if i % 2 else 'operational',
+            allocated_amount=1000 * (i + 1), start_date='2025-01-01', end_date='2025-12-31'
+        )
+    return project
+
+
+@pytest.fixture
+def api_client(finance_officer):
+    client = APIClient()
+    client.force_authenticate(finance_officer)
+    return client
+
+
+def read_job_file(job):
+    with job.file.open('rb') as handle:
+        return handle.read()
+
+
+# =====================================================
+# EXPORT TASK TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestExportTask:
+    def test_csv_job_completes(self, budgets, eager_celery):
+        """The task writes the export to storage and records progress."""
+        job = ExportJob.objects.create(model_label='finances.Budget', export_format='csv')
+        export_financial_data_async.delay(str(job.pk))
+        job.refresh_from_db()
+        assert job.status == 'completed'
+        assert job.total_rows == job.processed_rows == 5
+        assert job.progress == 100.0
+        rows = list(csv.reader(StringIO(read_job_file(job).decode())))
+        assert rows[0][0] == 'Project'
+        assert len(rows) == 6
+
+    def test_filters_and_formats(self, budgets, eager_celery):
+        """Filters narrow the queryset and every format produces a file."""
+        job = ExportJob.objects.create(model_label='finances.Budget', export_format='xlsx', filters={'budget_type': 'capital'})
+        export_financial_data_async.delay(str(job.pk))
+        job.refresh_from_db()
+        sheet = load_workbook(BytesIO(read_job_file(job)), read_only=True).active
+        assert len(list(sheet.iter_rows())) == 3
+
+        job = ExportJob.objects.create(model_label='farmers.Location', export_format='pdf')
+        export_financial_data_async.delay(str(job.pk))
+        job.refresh_from_db()
+        assert job.status == 'completed'
+        assert read_job_file(job).startswith(b'%PDF')
+
+    def test_progress_reported_per_chunk(self, budgets):
+        """Writers report the running row count after every chunk."""
+        seen = []
+        with BytesIO() as output:
+            write_export('csv', Budget.objects.all(), Budget.export_columns, output, 'Budgets', chunk_size=2, progress=seen.append)
+        assert seen == [2, 4, 5]
+
+    def test_failed_job_records_error(self, budgets, eager_celery):
+        """A failing export is marked failed instead of staying in progress."""
+        job = ExportJob.objects.create(model_label='finances.Budget', filters={'allocated_amount': 'lots'})
+        export_financial_data_async.delay(str(job.pk))
+        job.refresh_from_db()
+        assert job.status == 'failed'
+        assert job.error
+
+    def test_delta_job_records_watermark(self, budgets, eager_celery):
+        """A job with since exports only later changes and stores the next watermark."""
+        Budget.objects.update(updated_at=timezone.now() - DELTA_COMMIT_LAG * 2)
+        job = ExportJob.objects.create(model_label='finances.Budget')
+        export_financial_data_async.delay(str(job.pk))
+        job.refresh_from_db()
+        Budget.objects.filter(name='Budget 0').get().save()
+
+        delta = ExportJob.objects.create(model_label='finances.Budget', since=job.watermark)
+        export_financial_data_async.delay(str(delta.pk))
+        delta.refresh_from_db()
+        rows = list(csv.reader(StringIO(read_job_file(delta).decode())))
+        assert delta.total_rows == 1
+        assert [row[1] for row in rows] == ['Change', 'changed']
+        assert delta.watermark > job.watermark
+
+    def test_job_runs_once(self, budgets, eager_celery):
+        """A redelivered task does not run a job that was already claimed."""
+        job = ExportJob.objects.create(model_label='finances.Budget', status='completed')
+        assert export_financial_data_async.delay(str(job.pk)).get() is None
+
+    def test_stale_running_job_is_reclaimed(self, budgets, eager_celery):
+        """A job left silent by a dead worker is queued again; a long one still reporting progress is not."""
+        started = timezone.now() - EXPORT_JOB_STALE_AFTER - timedelta(minutes=1)
+        lost = ExportJob.objects.create(model_label='finances.Budget', status='running', started_at=started)
+        busy = ExportJob.objects.create(model_label='finances.Budget', status='running', started_at=started)
+        # update() leaves updated_at alone, like a worker that stopped reporting progress
+        ExportJob.objects.filter(pk=lost.pk).update(updated_at=started)
+
+        assert requeue_stale_export_jobs() == 1
+        lost.refresh_from_db()
+        busy.refresh_from_db()
+        assert (lost.status, lost.total_rows) == ('completed', 5)
+        assert busy.status == 'running'
+        assert export_financial_data_async.delay(str(busy.pk)).get() is None
+
+
+# =====================================================
+# EXPORT JOB API TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestExportJobAPI:
+    def test_submit_poll_download(self, api_client, budgets, eager_celery, django_capture_on_commit_callbacks):
+        """A submitted job is queued on commit, can be polled and then downloaded."""
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(
+                reverse('exportjob-list'),
+                {'model_label': 'finances.Budget', 'export_format': 'csv'}, format='json'
+            )
+        assert response.status_code == 202
+        job_id = response.data['id']
+
+        response = api_client.get(reverse('exportjob-detail', kwargs={'pk': job_id}))
+        assert response.data['status'] == 'completed'
+        assert response.data['download_url'].endswith(f'/api/v1/finances/export-jobs/{job_id}/download/')
+
+        response = api_client.get(reverse('exportjob-download', kwargs={'pk': job_id}))
+        assert response.status_code == 200
+        assert b''.join(response.streaming_content).startswith(b'Project,')
+
+    def test_download_before_completion(self, api_client, finance_officer):
+        """Downloading an unfinished job reports its status instead."""
+        job = ExportJob.objects.create(model_label='finances.Budget', requested_by=finance_officer)
+        response = api_client.get(reverse('exportjob-download', kwargs={'pk': job.pk}))
+        assert response.status_code == 409
+        assert response.data['status'] == 'pending'
+
+    @pytest.mark.parametrize('payload', [
+        {'model_label': 'users.User'},
+        {'model_label': 'finances.Nothing'},
+        {'model_label': 'finances.Budget', 'export_format': 'docx'},
+        {'model_label': 'finances.Budget', 'filters': {'project__created_by__password__startswith': 'a'}},
+    ])
+    def test_invalid_submissions_rejected(self, api_client, payload):
+        """Only exportable models, known formats and own-field filters are accepted."""
+        response = api_client.post(reverse('exportjob-list'), payload, format='json')
+        assert response.status_code == 400
+        assert not ExportJob.objects.exists()
+
+    def test_jobs_are_private(self, api_client, admin_user):
+        """Users only see their own export jobs."""
+        job = ExportJob.objects.create(model_label='finances.Budget', requested_by=admin_user)
+        response = api_client.get(reverse('exportjob-detail', kwargs={'pk': job.pk}))
+        assert response.status_code == 404
@@ -0,0 +1,321 @@
+import csv
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from decimal import Decimal
+from io import BytesIO, StringIO
+from openpyxl import load_workbook
+from django.apps import apps
+from django.db.models import Count, Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.export_import import DELTA_COMMIT_LAG, WATERMARK_HEADER, ExportColumn, ExportableModel, parse_since, stream_csv, write_export, xlsx_response
+from core.models import DeletedRecord
+from farmers.models import Farmer, Household, Location
+from finances.models import Budget, Expense
+from projects.models import Project
+
+
+def read_csv(response):
+    """Consume a streamed export and parse it back into rows."""
+    content = b''.join(response.streaming_content).decode()
+    return list(csv.reader(StringIO(content)))
+
+
+def read_xlsx(response):
+    """Consume an Excel download and return its sheet title and rows."""
+    workbook = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+    sheet = workbook.active
+    return sheet.title, [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+def read_parquet(response):
+    """Consume a Parquet download into an Arrow table."""
+    return pq.read_table(BytesIO(b''.join(response.streaming_content)))
+
+
+@pytest.fixture
+def farmers(db):
+    location = Location.objects.create(name='Kaduna North', district='Kaduna', region='North West')
+    household = Household.objects.create(head_of_household='Amina Bello', family_size=5, location=location)
+    project = Project.objects.create(name='Maize Yield', code='MZ001', budget=100000)
+    farmer = Farmer.objects.create(first_name='Musa', last_name='Bello', gender='male', household=household)
+    farmer.projects.add(project)
+    Farmer.objects.create(first_name='Hauwa', last_name='Bello', gender='female', household=household)
+    return household
+
+
+# =====================================================
+# STREAMING CSV ENGINE TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestStreamingCSVExport:
+    def test_model_export_streams(self, farmers):
+        """Model exports are streamed rather than buffered."""
+        response = Farmer.export_to_csv()
+        assert isinstance(response, StreamingHttpResponse)
+        assert response['Content-Disposition'] == 'attachment; filename="farmers.csv"'
+
+    def test_model_export_rows(self, farmers):
+        """Declared columns resolve field paths across relations."""
+        rows = read_csv(Farmer.export_to_csv())
+        assert rows[0][:3] == ['First Name', 'Last Name', 'Gender']
+        by_name = {row[0]: row for row in rows[1:]}
+        assert by_name['Musa'][6:] == ['Amina Bello', 'Kaduna North', '1']
+        assert by_name['Hauwa'][8] == '0'
+
+    def test_chunking_keeps_every_row(self, farmers):
+        """Rows are written in chunks without dropping a partial last chunk."""
+        for i in range(5):
+            Farmer.objects.create(first_name=f'Farmer{i}', last_name='Test', gender='male', household=farmers)
+        columns = [('First Name', 'first_name'), ExportColumn('Household', 'household', str)]
+        response = stream_csv(Farmer.objects.all(), columns, 'farmers.csv', chunk_size=2)
+        chunks = list(response.streaming_content)
+        assert len(chunks) == 5  # header + 7 rows in chunks of 2
+        rows = read_csv(stream_csv(Farmer.objects.all(), columns, 'farmers.csv', chunk_size=2))
+        assert len(rows) == 8
+
+    def test_formatted_columns(self, db):
+        """Formatters are applied to resolved values."""
+        project = Project.objects.create(name='Irrigation', code='IR001', budget=50000)
+        budget = Budget.objects.create(
+            project=project, name='Pumps', allocated_amount=1000,
+            start_date='2025-01-01', end_date='2025-12-31'
+        )
+        Expense.objects.create(
+            project=project, budget=budget, description='Pump parts',
+            amount=250, date='2025-02-01'
+        )
+        rows = read_csv(Budget.export_to_csv())
+        assert rows[1][0] == 'IR001'
+        assert rows[1][-1] == '25.0%'
+
+    def test_every_model_export_streams(self, farmers):
+        """Every exportable model has a working streamed CSV export."""
+        exportable = [model for model in apps.get_models() if issubclass(model, ExportableModel)]
+        assert exportable
+        for model in exportable:
+            rows = read_csv(model.export_to_csv())
+            assert rows[0], model
+
+
+# =====================================================
+# EXPORT QUERY PLANNING TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestExportQueryPlanning:
+    def count_export_queries(self, django_assert_max_num_queries, response, limit):
+        with django_assert_max_num_queries(limit):
+            return read_csv(response)
+
+    def test_relations_and_annotations_fixed_queries(self, farmers, django_assert_max_num_queries):
+        """Joins and Count annotations keep the export to a single query."""
+        for i in range(10):
+            Farmer.objects.create(first_name=f'Farmer{i}', last_name='Test', gender='male', household=farmers)
+        rows = self.count_export_queries(django_assert_max_num_queries, Farmer.export_to_csv(), 1)
+        assert len(rows) == 13
+
+    def test_to_many_paths_are_prefetched(self, farmers, django_assert_max_num_queries):
+        """A field path across a to-many relation is prefetched, not fetched per row."""
+        columns = [('Name', 'first_name'), ('Projects', 'projects__code'), ('Location', 'household__location__name')]
+        response = stream_csv(Farmer.objects.order_by('first_name'), columns, 'farmers.csv')
+        rows = self.count_export_queries(django_assert_max_num_queries, response, 2)
+        assert rows[1] == ['Hauwa', '', 'Kaduna North']
+        assert rows[2] == ['Musa', 'MZ001', 'Kaduna North']
+
+    def test_aggregates_over_different_relations_stay_exact(self, db):
+        """Aggregates over two to-many relations do not multiply each other."""
+        project = Project.objects.create(name='Irrigation', code='IR001', budget=50000)
+        budget = Budget.objects.create(
+            project=project, name='Pumps', allocated_amount=1000,
+            start_date='2025-01-01', end_date='2025-12-31'
+        )
+        for amount in (100, 150):
+            Expense.objects.create(project=project, budget=budget, description='Parts', amount=amount, date='2025-02-01')
+        columns = [('Budgets', Count('budgets')), ('Spent', Sum('expenses__amount'))]
+        rows = read_csv(stream_csv(Project.objects.all(), columns, 'projects.csv'))
+        assert rows[1][0] == '1'
+        assert Decimal(rows[1][1]) == 250
+
+
+# =====================================================
+# EXCEL EXPORT TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestExcelExport:
+    def test_model_export_is_file_response(self, farmers):
+        """Workbooks are served from a temporary file."""
+        response = Farmer.export_to_excel()
+        assert isinstance(response, FileResponse)
+        assert response['Content-Disposition'] == 'attachment; filename="farmers.xlsx"'
+        assert response['Content-Type'] == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        response.close()
+
+    def test_model_export_rows(self, farmers, django_assert_max_num_queries):
+        """Excel rows use the same column spec and query plan as CSV."""
+        with django_assert_max_num_queries(1):
+            response = Farmer.export_to_excel(Farmer.objects.order_by('first_name'))
+        title, rows = read_xlsx(response)
+        assert title == 'Farmers'
+        assert rows[0][:3] == ['First Name', 'Last Name', 'Gender']
+        assert rows[1][0] == 'Hauwa'
+        assert rows[2][6:] == ['Amina Bello', 'Kaduna North', 1]
+
+    def test_cell_types(self, farmers):
+        """Numbers stay numeric, aware datetimes are written naive and objects as text."""
+        columns = [
+            ('Household', 'household'),
+            ('Family Size', 'household__family_size'),
+            ('Created', 'created_at'),
+        ]
+        title, rows = read_xlsx(xlsx_response(Farmer.objects.all(), columns, 'farmers.xlsx', 'A' * 40))
+        assert title == 'A' * 31
+        assert rows[1][:2] == ['Amina Bello', 5]
+        assert rows[1][2].tzinfo is None
+
+    def test_every_model_export_builds(self, farmers):
+        """Every exportable model produces a readable workbook."""
+        for model in apps.get_models():
+            if issubclass(model, ExportableModel):
+                title, rows = read_xlsx(model.export_to_excel())
+                assert rows[0], model
+
+
+# =====================================================
+# COLUMNAR (PARQUET / ARROW) EXPORT TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestColumnarExport:
+    @pytest.fixture
+    def budget(self, db):
+        project = Project.objects.create(name='Irrigation', code='IR001', budget=50000)
+        budget = Budget.objects.create(
+            project=project, name='Pumps', allocated_amount='1000.50',
+            start_date='2025-01-01', end_date='2025-12-31'
+        )
+        Expense.objects.create(project=project, budget=budget, description='Parts', amount=250, date='2025-02-01')
+        return budget
+
+    def test_field_types_preserved(self, budget, django_assert_max_num_queries):
+        """Decimals, dates and annotations keep their types and formatters are skipped."""
+        with django_assert_max_num_queries(1):
+            table = read_parquet(Budget.export_to_parquet())
+        assert table.schema.field('Allocated Amount').type == pa.decimal128(15, 2)
+        assert table.schema.field('Start Date').type == pa.date32()
+        assert table.schema.field('Utilization Rate').type == pa.float64()
+        row = table.to_pylist()[0]
+        assert row['Allocated Amount'] == Decimal('1000.50')
+        assert row['Utilization Rate'] == pytest.approx(24.99, abs=0.01)
+        assert row['Project'] == 'IR001'
+
+    def test_compressed(self, budget):
+        """Parquet pages are compressed."""
+        response = Budget.export_to_parquet()
+        metadata = pq.ParquetFile(BytesIO(b''.join(response.streaming_content))).metadata
+        assert metadata.row_group(0).column(0).compression == 'ZSTD'
+
+    def test_keys_and_computed_columns(self, farmers):
+        """Foreign keys export as UUIDs; computed columns get inferred types."""
+        columns = [
+            ('Household', 'household'),
+            ('Name', 'household', str),
+            ('Created', 'created_at'),
+            ('Share', lambda farmer: Decimal('0.25')),
+            ('Age', 'age'),
+        ]
+        with BytesIO() as output:
+            write_export('parquet', Farmer.objects.all(), columns, output, None)
+            table = pq.read_table(BytesIO(output.getvalue()))
+        assert table.schema.field('Household').type == pa.uuid()
+        assert table.schema.field('Name').type == pa.string()
+        assert table.schema.field('Created').type == pa.timestamp('us', tz='UTC')
+        assert table.schema.field('Share').type == pa.decimal128(38, 2)
+        assert table.column('Name').to_pylist() == ['Amina Bello', 'Amina Bello']
+
+    def test_arrow_ipc_batches(self, farmers):
+        """Arrow IPC files hold one record batch per chunk."""
+        for i in range(3):
+            Farmer.objects.create(first_name=f'Farmer{i}', last_name='Test', gender='male', household=farmers)
+        with BytesIO() as output:
+            write_export('arrow', Farmer.objects.all(), [('Name', 'first_name')], output, None, chunk_size=2)
+            reader = pa.ipc.open_file(BytesIO(output.getvalue()))
+        assert reader.num_record_batches == 3
+        assert reader.read_all().num_rows == 5
+
+    def test_empty_export_has_schema(self, db):
+        """An empty queryset still produces a file with the full schema."""
+        table = read_parquet(Budget.export_to_parquet())
+        assert table.num_rows == 0
+        assert table.schema.names[0] == 'Project'
+
+
+# =====================================================
+# DELTA (WATERMARK) EXPORT TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestDeltaExport:
+    @pytest.fixture(autouse=True)
+    def settled(self, farmers):
+        """Fixture rows were written well before any watermark, outside the commit-lag margin."""
+        long_ago = timezone.now() - DELTA_COMMIT_LAG * 2
+        for model in (Location, Household, Farmer):
+            model.objects.update(updated_at=long_ago)
+
+    def test_delta_has_changes_and_tombstones(self, farmers):
+        """A delta holds rows changed since the watermark and tombstones for deleted ones."""
+        watermark = Farmer.export_to_csv()[WATERMARK_HEADER]
+        musa = Farmer.objects.get(first_name='Musa')
+        musa.phone_number = '0803'
+        musa.save()
+        hauwa_id = Farmer.objects.get(first_name='Hauwa').pk
+        Farmer.objects.filter(pk=hauwa_id).delete()
+
+        response = Farmer.export_to_csv(since=parse_since(watermark))
+        rows = read_csv(response)
+        assert rows[0][:3] == ['ID', 'Change', 'First Name']
+        assert rows[1][:3] == [str(musa.pk), 'changed', 'Musa']
+        assert rows[2] == [str(hauwa_id), 'deleted'] + [''] * (len(rows[0]) - 2)
+        assert len(rows) == 3
+        assert parse_since(response[WATERMARK_HEADER]) > parse_since(watermark)
+
+    def test_nothing_changed(self, farmers):
+        """A delta taken right after another is empty apart from the header."""
+        watermark = Farmer.export_to_csv()[WATERMARK_HEADER]
+        assert len(read_csv(Farmer.export_to_csv(since=parse_since(watermark)))) == 1
+
+    def test_tombstones_only_for_exportable_models(self, farmers, admin_user):
+        """Cascaded deletes leave tombstones; models without delta exports are not tracked."""
+        Location.objects.all().delete()
+        labels = sorted(DeletedRecord.objects.values_list('model_label', flat=True))
+        assert labels == ['farmers.Farmer', 'farmers.Farmer', 'farmers.Household', 'farmers.Location']
+        admin_user.delete()
+        assert DeletedRecord.objects.count() == 4
+
+    def test_late_commit_within_lag_is_exported(self, farmers):
+        """A row stamped just before the watermark but committed after it is still exported."""
+        watermark = parse_since(Farmer.export_to_csv()[WATERMARK_HEADER])
+        Farmer.objects.filter(first_name='Musa').update(updated_at=watermark - DELTA_COMMIT_LAG / 2)
+        rows = read_csv(Farmer.export_to_csv(since=watermark))
+        assert [row[2] for row in rows[1:]] == ['Musa']
+
+    def test_parquet_delta_keeps_types(self, farmers):
+        """Tombstones in columnar deltas keep the key type."""
+        since = parse_since(Farmer.export_to_csv()[WATERMARK_HEADER])
+        Farmer.objects.filter(first_name='Hauwa').delete()
+        table = read_parquet(Farmer.export_to_parquet(since=since))
+        assert table.schema.field('ID').type == pa.uuid()
+        assert table.column('Change').to_pylist() == ['deleted']
+
+    def test_since_parameter_on_endpoints(self, farmers, field_officer):
+        """Export endpoints accept since= and reject malformed timestamps."""
+        client = APIClient()
+        client.force_authenticate(field_officer)
+        url = reverse('farmer-export-csv')
+        watermark = client.get(url)[WATERMARK_HEADER]
+        Farmer.objects.create(first_name='Zainab', last_name='Umar', gender='female', household=farmers)
+
+        rows = read_csv(client.get(url, {'since': watermark}))
+        assert [row[2] for row in rows[1:]] == ['Zainab']
+        assert client.get(url, {'since': 'yesterday'}).status_code == 400
@@ -1,7 +1,21 @@
+import time
 import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from finances.models import Budget, Expense, FinancialReport
+from django.utils import timezone
+from django.core import mail
+from django.core.cache import cache
+from core.rollups import refresh_rollups
+from finances.budgets import budget_drift
+from finances.models import Budget, BudgetAlertState, Expense, FinancialReport
+from finances.reports import generate_monthly_reports
+from finances.tasks import check_budget_utilization, generate_monthly_financial_reports
 from projects.models import Project
 
 User = get_user_model()
@@ -11,16 +25,18 @@ User = get_user_model()
 # =====================================================
 @pytest.mark.django_db
 class TestFinancesAPI:
-    def test_budget_list_authenticated(self, client, admin_user):
+    def test_budget_list_authenticated(self, admin_user):
         """Ensure admin can view list of budgets."""
-        client.force_login(admin_user)
+        client = APIClient()
+        client.force_authenticate(admin_user)
         url = reverse('budget-list')
         response = client.get(url)
         assert response.status_code == 200
 
-    def test_create_budget(self, client, admin_user):
+    def test_create_budget(self, admin_user):
         """Ensure authenticated user can create a new budget."""
-        client.force_login(admin_user)
+        client = APIClient()
+        client.force_authenticate(admin_user)
         project = Project.objects.create(
             name="Test Project",
             code="TEST001",
@@ -30,6 +46,7 @@ class TestFinancesAPI:
         url = reverse('budget-list')
         data = {
             'project': project.id,
+            'name': 'Staff',
             'budget_type': 'personnel',
             'description': 'Test budget',
             'allocated_amount': 50000,
@@ -41,9 +58,10 @@ class TestFinancesAPI:
         assert response.status_code == 201
         assert Budget.objects.count() == 1
 
-    def test_expense_approval_permission(self, client, finance_officer):
+    def test_expense_approval_permission(self, finance_officer):
         """Ensure finance officer cannot approve expense without permission."""
-        client.force_login(finance_officer)
+        client = APIClient()
+        client.force_authenticate(finance_officer)
         project = Project.objects.create(
             name="Test",
             code="TEST",
@@ -52,6 +70,7 @@ class TestFinancesAPI:
         )
         budget = Budget.objects.create(
             project=project,
+            name='Staff',
             budget_type='personnel',
             allocated_amount=50000,
             start_date='2025-01-01',
@@ -59,10 +78,11 @@ class TestFinancesAPI:
             created_by=finance_officer
         )
         expense = Expense.objects.create(
+            project=project,
             budget=budget,
             description='Test expense',
             amount=1000,
-            expense_date='2025-01-15'
+            date='2025-01-15'
         )
         url = reverse('expense-approve', kwargs={'pk': expense.id})
         response = client.post(url)
@@ -86,6 +106,7 @@ class TestFinancialCalculations:
 
         budget = Budget.objects.create(
             project=project,
+            name='Staff',
             budget_type='personnel',
             allocated_amount=50000,
             start_date='2025-01-01',
@@ -94,10 +115,397 @@ class TestFinancialCalculations:
         )
 
         # Create expenses
-        Expense.objects.create(budget=budget, amount=10000, expense_date='2025-01-15')
-        Expense.objects.create(budget=budget, amount=15000, expense_date='2025-02-15')
+        Expense.objects.create(project=project, budget=budget, description='Salaries', amount=10000, date='2025-01-15')
+        Expense.objects.create(project=project, budget=budget, description='Salaries', amount=15000, date='2025-02-15')
 
         # Assertions
-        assert budget.total_expenses == 25000
+        budget.refresh_from_db()
+        assert budget.utilized_amount == 25000
         assert budget.remaining_amount == 25000
-        assert round(budget.utilization_percentage, 1) == 50.0
+        assert round(budget.utilization_rate, 1) == 50.0
+
+
+# =====================================================
+# BUDGET UTILIZATION TESTS
+# =====================================================
+def utilized(budget):
+    return Budget.objects.values_list('utilized_amount', flat=True).get(pk=budget.pk)
+
+
+@pytest.mark.django_db
+class TestBudgetUtilization:
+    @pytest.fixture
+    def budgets(self):
+        project = Project.objects.create(name='Irrigation', code='IR001', budget=50000)
+        return [
+            Budget.objects.create(
+                project=project, name=name, allocated_amount=1000, start_date='2025-01-01', end_date='2025-12-31'
+            )
+            for name in ('Pumps', 'Pipes')
+        ]
+
+    def expense(self, budget, amount, **fields):
+        return Expense.objects.create(
+            project=budget.project, budget=budget, description='Parts', amount=amount, date='2025-02-01', **fields
+        )
+
+    def test_expense_writes_move_utilized_amount(self, budgets):
+        pumps, pipes = budgets
+        first = self.expense(pumps, 250)
+        self.expense(pumps, 100)
+        assert utilized(pumps) == 350
+
+        first.amount = Decimal('300')
+        first.save()
+        assert utilized(pumps) == 400
+        first.status = 'rejected'
+        first.save()
+        assert utilized(pumps) == 100
+        first.status = 'approved'
+        first.budget = pipes
+        first.save()
+        assert (utilized(pumps), utilized(pipes)) == (100, 300)
+
+        first.delete()
+        assert utilized(pipes) == 0
+        pumps.refresh_from_db()
+        assert pumps.remaining_amount == 900
+        assert pumps.utilization_rate == 10
+
+    def test_stored_expense_is_read_inside_the_transaction(self, budgets):
+        expense = self.expense(budgets[0], 250)
+        expense.amount = Decimal('300')
+        with CaptureQueriesContext(connection) as queries:
+            expense.save()
+        statements = [query['sql'].split()[0] for query in queries]
+        # SAVEPOINT, read of the stored row, the UPDATEs, RELEASE
+        assert statements[:2] == ['SAVEPOINT', 'SELECT']
+        assert utilized(budgets[0]) == 300
+
+    def test_reading_utilization_runs_no_queries(self, budgets):
+        self.expense(budgets[0], 250)
+        budget = Budget.objects.get(pk=budgets[0].pk)
+        with CaptureQueriesContext(connection) as queries:
+            assert (budget.utilized_amount, budget.remaining_amount, budget.utilization_rate) == (250, 750, 25)
+        assert len(queries) == 0
+
+    def test_reconcile_command_repairs_drift(self, budgets):
+        pumps, pipes = budgets
+        self.expense(pumps, 250)
+        self.expense(pumps, 50, status='rejected')
+        Budget.objects.update(utilized_amount=999)
+        assert budget_drift().count() == 2
+
+        call_command('reconcile_budgets', '--check', stdout=None)
+        assert utilized(pumps) == 999
+        call_command('reconcile_budgets', stdout=None)
+        assert (utilized(pumps), utilized(pipes)) == (250, 0)
+        assert not budget_drift().exists()
+
+
+# =====================================================
+# BUDGET ALERT TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestBudgetAlerts:
+    @pytest.fixture
+    def project(self, finance_officer):
+        return Project.objects.create(name='Irrigation', code='IR001', budget=50000, project_manager=finance_officer)
+
+    def budget(self, project, name, spent):
+        budget = Budget.objects.create(
+            project=project, name=name, allocated_amount=1000, start_date='2025-01-01', end_date='2025-12-31',
+            created_by=project.project_manager
+        )
+        if spent:
+            self.spend(budget, spent)
+        return budget
+
+    def spend(self, budget, amount):
+        return Expense.objects.create(
+            project=budget.project, budget=budget, description='Parts', amount=amount, date='2025-02-01'
+        )
+
+    def alerted(self, budget):
+        return sorted(BudgetAlertState.objects.filter(budget=budget).values_list('threshold', flat=True))
+
+    def test_each_threshold_fires_once(self, project):
+        pumps = self.budget(project, 'Pumps', 850)
+        pipes = self.budget(project, 'Pipes', 960)
+        self.budget(project, 'Tanks', 100)
+
+        assert check_budget_utilization() == 2
+        assert len(mail.outbox) == 2
+        assert {message.subject for message in mail.outbox} == {'Budget Alert: operational - Irrigation'}
+        assert '95%' in next(message.body for message in mail.outbox if '96.0%' in message.body)
+        assert (self.alerted(pumps), self.alerted(pipes)) == ([80], [80, 90, 95])
+
+        assert check_budget_utilization() == 0
+        self.spend(pumps, 60)
+        assert check_budget_utilization() == 1
+        assert self.alerted(pumps) == [80, 90]
+        assert len(mail.outbox) == 3
+
+    def test_alert_rearms_when_utilization_falls(self, project):
+        pumps = self.budget(project, 'Pumps', 500)
+        expense = self.spend(pumps, 400)
+        check_budget_utilization()
+        expense.status = 'rejected'
+        expense.save()
+        check_budget_utilization()
+        assert self.alerted(pumps) == []
+
+        expense.status = 'approved'
+        expense.save()
+        assert check_budget_utilization() == 1
+        assert len(mail.outbox) == 2
+
+    def test_query_count_does_not_grow_with_budgets(self, project):
+        def run_queries(count):
+            for i in range(count):
+                self.budget(project, f'Budget {len(mail.outbox)}-{i}', 900)
+            with CaptureQueriesContext(connection) as queries:
+                assert check_budget_utilization() == count
+            return len(queries)
+
+        assert run_queries(2) == run_queries(30)
+
+
+# =====================================================
+# MONTHLY REPORT TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestMonthlyReports:
+    @pytest.fixture
+    def projects(self, project_manager):
+        projects = [
+            Project.objects.create(name=name, code=code, budget=50000, project_manager=project_manager)
+            for name, code in (('Irrigation', 'IR001'), ('Storage', 'ST001'))
+        ]
+        irrigation = projects[0]
+        for name, amount, start in (('Pumps', 1000, '2025-01-01'), ('Pipes', 500, '2025-03-01'), ('Wells', 700, '2024-01-01')):
+            Budget.objects.create(
+                project=irrigation, name=name, allocated_amount=amount, start_date=start,
+                end_date='2024-12-31' if name == 'Wells' else '2025-12-31'
+            )
+        pumps = Budget.objects.get(name='Pumps')
+        for amount, day, status in ((200, '2025-02-03', 'paid'), (50, '2025-02-27', 'approved'),
+                                    (75, '2025-02-10', 'rejected'), (300, '2025-03-01', 'paid')):
+            Expense.objects.create(
+                project=irrigation, budget=pumps, description='Parts', amount=amount, date=day, status=status
+            )
+        return projects
+
+    def test_reports_summarise_the_month(self, projects, project_manager):
+        assert generate_monthly_reports(date(2025, 2, 14)) == 2
+        irrigation = FinancialReport.objects.get(project=projects[0])
+        assert (irrigation.report_type, irrigation.report_period) == ('monthly', 'February 2025')
+        assert (irrigation.period_start, irrigation.period_end) == (date(2025, 2, 1), date(2025, 2, 28))
+        assert (irrigation.total_budget, irrigation.total_expenses, irrigation.balance) == (1000, 250, 750)
+        assert irrigation.net_position == -250
+        assert irrigation.prepared_by == project_manager
+        storage = FinancialReport.objects.get(project=projects[1])
+        assert (storage.total_budget, storage.total_expenses) == (0, 0)
+
+    def test_rerun_does_not_duplicate(self, projects):
+        generate_monthly_financial_reports('2025-02-01')
+        assert generate_monthly_financial_reports('2025-02-01') == 0
+        Project.objects.create(name='Dairy', code='DY001', budget=500)
+        assert generate_monthly_reports(date(2025, 2, 1)) == 1
+        assert FinancialReport.objects.filter(report_period='February 2025').count() == 3
+
+    def test_reports_written_by_a_concurrent_run_are_not_counted(self, projects, monkeypatch):
+        bulk_create = FinancialReport.objects.bulk_create
+
+        def concurrent_run_first(reports, **kwargs):
+            # Another run writes Storage's report between our read and our insert
+            storage = next(report for report in reports if report.project_id == projects[1].pk)
+            bulk_create([FinancialReport(
+                project=projects[1], title='Storage', report_type='monthly', report_period=storage.report_period,
+                period_start=storage.period_start, period_end=storage.period_end
+            )])
+            return bulk_create(reports, **kwargs)
+
+        monkeypatch.setattr(FinancialReport.objects, 'bulk_create', concurrent_run_first)
+        assert generate_monthly_reports(date(2025, 2, 1)) == 1
+        assert FinancialReport.objects.count() == 2
+
+    def test_query_count_does_not_grow_with_projects(self, projects):
+        def run_queries(month):
+            with CaptureQueriesContext(connection) as queries:
+                generate_monthly_reports(month)
+            return len(queries)
+
+        short = run_queries(date(2025, 1, 1))
+        Project.objects.bulk_create([Project(name=f'Project {i}', code=f'P{i:03d}') for i in range(20)])
+        assert run_queries(date(2025, 2, 1)) == short
+
+
+# =====================================================
+# FINANCIAL DASHBOARD TESTS
+# =====================================================
+@pytest.fixture
+def empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestFinancialDashboard:
+    @pytest.fixture
+    def projects(self, project_manager):
+        irrigation = Project.objects.create(name='Irrigation', code='IR001', budget=50000, project_manager=project_manager)
+        storage = Project.objects.create(name='Storage', code='ST001', budget=20000)
+        for project, name, budget_type, amount in ((irrigation, 'Pumps', 'capital', 1000), (irrigation, 'Staff', 'personnel', 400),
+                                                  (storage, 'Silos', 'capital', 2000)):
+            Budget.objects.create(
+                project=project, name=name, budget_type=budget_type, allocated_amount=amount,
+                start_date='2025-01-01', end_date='2025-12-31'
+            )
+        today = timezone.localdate()
+        for budget_name, amount, status in (('Pumps', 100, 'paid'), ('Pumps', 150, 'approved'), ('Pumps', 999, 'rejected'),
+                                            ('Staff', 40, 'paid'), ('Silos', 500, 'paid')):
+            budget = Budget.objects.get(name=budget_name)
+            Expense.objects.create(
+                project=budget.project, budget=budget, description=f'{budget_name} {amount}', amount=amount,
+                date=today, status=status
+            )
+        return irrigation, storage
+
+    def get(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(reverse('financial-dashboard'), params)
+
+    def test_totals_do_not_double_count_allocations(self, projects, finance_officer, empty_cache):
+        data = self.get(finance_officer).data
+        assert data['summary'] == {
+            'total_budgets': 3, 'total_allocated': 3400.0, 'total_expenses': 790.0,
+            'remaining_budget': 2610.0, 'overall_utilization': pytest.approx(23.24, abs=0.01),
+        }
+        capital = next(row for row in data['budget_utilization'] if row['budget_type'] == 'capital')
+        assert (capital['allocated'], capital['spent'], capital['utilization']) == (3000.0, 750.0, 25.0)
+        assert [row['total'] for row in data['monthly_trend']] == [790.0]
+        assert data['monthly_trend'][0]['month'] == timezone.localdate().replace(day=1).isoformat()
+        assert len(data['recent_expenses']) == 4
+
+    def test_monthly_trend_from_the_expense_rollup(self, projects, project_manager, finance_officer, empty_cache):
+        from_source = self.get(finance_officer).data['monthly_trend']
+        cache.clear()
+        refresh_rollups(['expenses'])
+        # The rollup leaves rejected expenses out, as the source query does
+        assert self.get(finance_officer).data['monthly_trend'] == from_source
+        assert [row['total'] for row in self.get(project_manager).data['monthly_trend']] == [290.0]
+
+    def test_project_scope(self, projects, project_manager, finance_officer, empty_cache):
+        irrigation, storage = projects
+        assert self.get(project_manager).data['summary']['total_allocated'] == 1400.0
+        assert self.get(project_manager, project=str(storage.pk)).data['summary']['total_budgets'] == 0
+        assert self.get(finance_officer, project=str(storage.pk)).data['summary']['total_allocated'] == 2000.0
+        assert self.get(finance_officer).data['summary']['total_allocated'] == 3400.0
+        assert self.get(finance_officer, project='nope').status_code == 400
+
+    def test_fixed_query_count_and_cache(self, projects, finance_officer, empty_cache):
+        def dashboard_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                assert self.get(finance_officer).status_code == 200
+            return len(queries)
+
+        few = dashboard_queries()
+        irrigation = projects[0]
+        for i in range(20):
+            budget = Budget.objects.create(
+                project=irrigation, name=f'Budget {i}', allocated_amount=100, start_date='2025-01-01', end_date='2025-12-31'
+            )
+            Expense.objects.create(project=irrigation, budget=budget, description='Parts', amount=10, date='2025-02-01')
+        assert dashboard_queries() == few == 4
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get(finance_officer)
+        assert len(queries) == 0
+
+
+# =====================================================
+# SPEND TIME SERIES TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestSpendTimeseries:
+    @pytest.fixture
+    def budgets(self):
+        project = Project.objects.create(name='Irrigation', code='IR001', budget=50000)
+        pumps, pipes = [
+            Budget.objects.create(
+                project=project, name=name, allocated_amount=amount, start_date='2025-01-01', end_date='2025-12-31'
+            )
+            for name, amount in (('Pumps', 1000), ('Pipes', 500))
+        ]
+        for budget, amount, day, category, status in (
+            (pumps, 100, '2025-01-05', 'equipment', 'paid'), (pumps, 50, '2025-01-20', 'transport', 'paid'),
+            (pumps, 75, '2025-03-02', 'equipment', 'approved'), (pumps, 999, '2025-03-03', 'equipment', 'rejected'),
+            (pipes, 40, '2025-02-14', 'equipment', 'paid'),
+        ):
+            Expense.objects.create(
+                project=project, budget=budget, description='Parts', amount=amount, date=day, category=category, status=status
+            )
+        return pumps, pipes
+
+    def get(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(reverse('financial-timeseries'), params)
+
+    def test_monthly_cumulative_spend_per_budget(self, budgets, finance_officer):
+        data = self.get(finance_officer).data
+        assert data['groups'] == {
+            'id': [str(budgets[1].pk), str(budgets[0].pk)], 'label': ['Pipes', 'Pumps'], 'allocated': [500.0, 1000.0]
+        }
+        pumps = [i for i, group in enumerate(data['points']['group']) if group == 1]
+        assert [data['points']['period'][i] for i in pumps] == ['2025-01-01', '2025-03-01']
+        assert [data['points']['spent'][i] for i in pumps] == [150.0, 75.0]
+        assert [data['points']['cumulative'][i] for i in pumps] == [150.0, 225.0]
+
+    def test_start_keeps_earlier_spend_in_running_total(self, budgets, finance_officer):
+        data = self.get(finance_officer, group_by='project', bucket='quarter', start='2025-02-10').data
+        assert data['groups']['allocated'] == [1500.0]
+        assert data['points'] == {'group': [0], 'period': ['2025-01-01'], 'spent': [265.0], 'cumulative': [265.0]}
+
+        data = self.get(finance_officer, group_by='category', bucket='week', start='2025-03-01', end='2025-03-31').data
+        assert data['groups']['label'] == ['equipment', 'transport']
+        assert data['groups']['allocated'] == [None, None]
+        assert (data['points']['period'], data['points']['cumulative']) == (['2025-02-24'], [215.0])
+
+    def test_invalid_parameters(self, budgets, finance_officer):
+        assert self.get(finance_officer, bucket='year').status_code == 400
+        assert self.get(finance_officer, start='2025-03-01', end='2025-01-01').status_code == 400
+
+    @pytest.fixture
+    def year_of_expenses(self):
+        project = Project.objects.create(name='Irrigation', code='IR001', budget=50000)
+        budgets = Budget.objects.bulk_create([
+            Budget(project=project, name=f'Budget {i}', allocated_amount=10000, start_date='2025-01-01', end_date='2025-12-31')
+            for i in range(10)
+        ])
+        Expense.objects.bulk_create([
+            Expense(project=project, budget=budget, description='Parts', amount=day % 7 + 1, date=date(2025, 1, 1) + timedelta(days=day))
+            for budget in budgets for day in range(365)
+        ])
+
+    def test_year_of_expenses_in_two_queries(self, year_of_expenses, finance_officer):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(finance_officer, bucket='week')
+        assert response.status_code == 200
+        assert len(queries) == 2
+        assert len(response.data['points']['period']) == 10 * 53
+        assert response.data['points']['cumulative'][52] == sum(day % 7 + 1 for day in range(365))
+
+    @pytest.mark.perf
+    def test_year_of_expenses_within_latency_budget(self, year_of_expenses, finance_officer):
+        # About a third of a second here; the wide budget fails only on order-of-magnitude regressions.
+        # The first request warms up URL resolution and imports, and is not timed
+        self.get(finance_officer, bucket='week')
+        started = time.monotonic()
+        response = self.get(finance_officer, bucket='week')
+        assert response.status_code == 200
+        assert time.monotonic() - started < 10
@@ -0,0 +1,332 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from farmer_engagement.models import CBOGroup, CBOMeeting, FarmerAttendance
+from farmers.models import Farmer, Household, Location
+from staff_performance import ledger
+from staff_performance.activity import rebuild_activity_days, refresh_staff_scores
+from staff_performance.kpi_calculations import (
+    KPI_WINDOW_DAYS, ActivityKPICalculator, BatchKPICalculator, PerformanceKPICalculator, kpi_period, plan_shards,
+    recompute_staff_kpis, shard_queryset, update_staff_performance_scores
+)
+from staff_performance.models import PerformanceMetric, PerformanceReview, StaffActivityDay, StaffMember, UserActiveDay
+from staff_performance.tasks import calculate_kpi_shard_task, kpi_recompute_progress, recompute_staff_kpis_task
+from video_calls.models import CallParticipant, VideoCallSession
+
+User = get_user_model()
+
+
+def make_staff(count):
+    for i in range(count):
+        User.objects.create_user(username=f'officer{i}', role='field_officer')
+    return list(StaffMember.objects.order_by('employee_id'))
+
+
+def add_activity(staff, other, farmers, scale):
+    """Give a staff member an amount of activity in every module proportional to scale"""
+    now = timezone.now()
+    group = CBOGroup.objects.create(
+        name=f'Group {staff.employee_id}', group_type='farmer_group', village='Kawo', parish='Kawo',
+        sub_county='Kaduna North', district='Kaduna', formation_date='2024-01-01',
+        assigned_staff=staff, total_members=40 * scale
+    )
+    meetings = CBOMeeting.objects.bulk_create([
+        CBOMeeting(
+            cbo_group=group, title=f'Meeting {n}', agenda='Season', venue='Hall', facilitator=staff,
+            meeting_date=now - timedelta(days=n + 1), expected_attendance=20, actual_attendance=12 + n,
+            status='completed' if n % 2 else 'scheduled', minutes='Agreed' if n % 3 else '',
+        )
+        for n in range(scale * 2)
+    ])
+    # An old meeting outside the 30-day window
+    CBOMeeting.objects.bulk_create([CBOMeeting(
+        cbo_group=group, title='Old', agenda='Old', venue='Hall', facilitator=staff,
+        meeting_date=now - timedelta(days=45), expected_attendance=20, actual_attendance=20,
+    )])
+    for n, farmer in enumerate(farmers[:scale * 2]):
+        FarmerAttendance.objects.create(
+            farmer=farmer, meeting=meetings[n % len(meetings)],
+            checkin_method='qr_code' if n % 2 else 'manual'
+        )
+    for n in range(scale):
+        call = VideoCallSession.objects.create(
+            title=f'Call {n}', call_type='team_meeting', host=staff, scheduled_time=now - timedelta(days=n + 1),
+            status='completed' if n % 2 == 0 else 'scheduled'
+        )
+        CallParticipant.objects.create(session=call, staff_member=other, join_time=now - timedelta(days=n + 1))
+        CallParticipant.objects.create(session=call, staff_member=staff, join_time=now - timedelta(days=n + 1),
+                                       left_at=now)
+    PerformanceReview.objects.create(
+        staff=staff, reviewer=other, review_type='quarterly', review_period_start='2025-01-01',
+        review_period_end='2025-03-31', work_quality_rating=4, productivity_rating=4, communication_rating=3,
+        teamwork_rating=5, initiative_rating=4, strengths='Field work', development_areas='Reporting',
+        goals_next_period='More groups'
+    )
+
+
+@pytest.fixture
+def kpi_activity(db):
+    """Six staff members, five of them with different amounts of activity"""
+    staff = make_staff(6)
+    location = Location.objects.create(name='Kaduna North', district='Kaduna', region='North West')
+    household = Household.objects.create(head_of_household='Amina Bello', family_size=5, location=location)
+    farmers = [
+        Farmer.objects.create(first_name=f'Farmer{i}', last_name='Bello', gender='female', household=household)
+        for i in range(10)
+    ]
+    for scale, member in enumerate(staff[:5], start=1):
+        add_activity(member, staff[-1], farmers, scale)
+    return staff
+
+
+# =====================================================
+# BATCH KPI CALCULATOR TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestBatchKPICalculator:
+    def test_batch_matches_per_staff_calculator(self, kpi_activity):
+        calculator = BatchKPICalculator(StaffMember.objects.all())
+        batch = calculator.calculate_all_kpis()
+        assert len(batch) == 6
+        for member in kpi_activity:
+            single = PerformanceKPICalculator(member)
+            single.period_start, single.period_end = calculator.period_start, calculator.period_end
+            assert batch[member.pk] == single.calculate_all_kpis()
+        # The fixture gives every KPI something to measure
+        assert all(score > 0 for score in batch[kpi_activity[4].pk].values())
+
+    def test_query_count_independent_of_headcount(self, kpi_activity, django_assert_num_queries):
+        with django_assert_num_queries(9):
+            BatchKPICalculator(StaffMember.objects.all()[:2]).calculate_all_kpis()
+        with django_assert_num_queries(9):
+            BatchKPICalculator(StaffMember.objects.all()).calculate_all_kpis()
+
+    def test_overall_score_does_not_recurse(self, kpi_activity):
+        calculator = PerformanceKPICalculator(kpi_activity[0])
+        assert calculator.calculate_overall_performance_score() == calculator.calculate_all_kpis()['overall_performance_score']
+
+
+# =====================================================
+# KPI RESULT STORAGE TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestUpdateStaffPerformanceScores:
+    def test_scores_and_metrics_written(self, kpi_activity):
+        expected = BatchKPICalculator(StaffMember.objects.all()).calculate_all_kpis()
+        update_staff_performance_scores()
+
+        member = StaffMember.objects.get(pk=kpi_activity[4].pk)
+        assert float(member.overall_performance_score) == pytest.approx(expected[member.pk]['overall_performance_score'])
+        metrics = PerformanceMetric.objects.filter(staff=member)
+        assert metrics.count() == 6
+        for metric in metrics:
+            score = expected[member.pk][metric.metric_name]
+            assert float(metric.actual_value) == pytest.approx(score, abs=0.005)
+            # Same rule as PerformanceMetric.save(): actual / target * 100
+            assert float(metric.achievement_rate) == pytest.approx(score, abs=0.005)
+
+    def test_rerun_updates_existing_metrics(self, kpi_activity):
+        update_staff_performance_scores()
+        first = set(PerformanceMetric.objects.values_list('pk', flat=True))
+        CBOMeeting.objects.filter(facilitator=kpi_activity[0]).update(minutes='Agreed')
+
+        update_staff_performance_scores()
+        assert set(PerformanceMetric.objects.values_list('pk', flat=True)) == first
+        quality = PerformanceMetric.objects.get(staff=kpi_activity[0], metric_name='data_quality_score')
+        assert quality.achievement_rate == quality.actual_value
+
+    def test_write_queries_independent_of_headcount(self, kpi_activity):
+        StaffMember.objects.exclude(pk__in=[m.pk for m in kpi_activity[:2]]).update(is_active=False)
+        with CaptureQueriesContext(connection) as few:
+            update_staff_performance_scores()
+        StaffMember.objects.update(is_active=True)
+        with CaptureQueriesContext(connection) as many:
+            update_staff_performance_scores()
+        assert len(few) == len(many)
+
+
+# =====================================================
+# SHARDED RECOMPUTATION TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestShardedRecomputation:
+    def test_id_shards_cover_all_staff_once(self, kpi_activity):
+        specs = plan_shards(StaffMember.objects.all(), 'id', 4)
+        assert len(specs) == 3
+        covered = [pk for spec in specs for pk in shard_queryset(spec).values_list('pk', flat=True)]
+        assert sorted(covered) == sorted(member.pk for member in kpi_activity)
+
+    def test_department_shards(self, kpi_activity):
+        StaffMember.objects.filter(pk=kpi_activity[0].pk).update(department='farmer_support')
+        specs = plan_shards(StaffMember.objects.all(), 'department')
+        assert specs == [{'department': 'farmer_support'}, {'department': 'field_operations'}]
+
+    def test_sharded_results_match_single_batch(self, kpi_activity):
+        period_end = timezone.now()
+        period_start = period_end - timedelta(days=30)
+        expected = BatchKPICalculator(StaffMember.objects.all(), period_start, period_end).calculate_all_kpis()
+        calls = []
+
+        updated = recompute_staff_kpis(
+            shards=4, workers=1, period_start=period_start, period_end=period_end,
+            progress=lambda done, total, spec: calls.append((done, total))
+        )
+        assert updated == 6
+        assert calls == [(1, 3), (2, 3), (3, 3)]
+        for member in StaffMember.objects.all():
+            assert float(member.overall_performance_score) == pytest.approx(
+                expected[member.pk]['overall_performance_score'], abs=0.005
+            )
+        assert PerformanceMetric.objects.count() == 36
+
+    def test_celery_run(self, kpi_activity, eager_celery):
+        run_id = recompute_staff_kpis_task.delay(shard_by='id', shards=2).get()
+        assert kpi_recompute_progress(run_id) == {'done': 2, 'total': 2}
+        assert PerformanceMetric.objects.count() == 36
+
+    def test_shard_progress_without_run_start(self, kpi_activity, eager_celery):
+        """A worker whose cache never saw the run start still counts its shard"""
+        spec = plan_shards(StaffMember.objects.all(), 'id', 1)[0]
+        period_end = timezone.now()
+        period = [(period_end - timedelta(days=30)).isoformat(), period_end.isoformat()]
+        assert calculate_kpi_shard_task.delay(spec, *period, run_id='unseen').get() == 6
+        assert kpi_recompute_progress('unseen')['done'] == 1
+
+
+# =====================================================
+# INCREMENTAL KPI TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestIncrementalKPIs:
+    def test_bucket_kpis_match_batch_calculator(self, kpi_activity):
+        rebuild_activity_days()
+        batch = BatchKPICalculator(StaffMember.objects.all()).calculate_all_kpis()
+        incremental = ActivityKPICalculator(StaffMember.objects.all()).calculate_all_kpis()
+        for member in kpi_activity:
+            assert incremental[member.pk] == pytest.approx(batch[member.pk], abs=0.01)
+        # The meeting 45 days ago is outside the 30 buckets
+        assert StaffActivityDay.objects.filter(staff=kpi_activity[0], day__lt=timezone.localdate() - timedelta(days=40)).exists()
+
+    def test_batch_and_bucket_scores_share_a_period(self, kpi_activity):
+        """Both calculators upsert the same PerformanceMetric rows with the same period"""
+        rebuild_activity_days()
+        update_staff_performance_scores()
+        refresh_staff_scores([member.pk for member in kpi_activity])
+        first, last = kpi_period()
+        assert last - first == timedelta(days=KPI_WINDOW_DAYS - 1)
+        assert set(PerformanceMetric.objects.values_list('period_start', 'period_end')) == {(first, last)}
+        assert PerformanceMetric.objects.count() == 36
+
+    def test_bucket_kpis_take_fixed_queries(self, kpi_activity, django_assert_num_queries):
+        rebuild_activity_days()
+        # Staff, CBO groups, summed buckets and active days
+        with django_assert_num_queries(4):
+            ActivityKPICalculator(StaffMember.objects.all()).calculate_all_kpis()
+
+    def test_activity_refreshes_score_on_commit(self, eager_celery, django_capture_on_commit_callbacks):
+        host, guest = make_staff(2)
+        yesterday = timezone.now() - timedelta(days=1)
+        with django_capture_on_commit_callbacks(execute=True):
+            call = VideoCallSession.objects.create(
+                title='Weekly', call_type='team_meeting', host=host, scheduled_time=yesterday
+            )
+            CallParticipant.objects.create(session=call, staff_member=guest, join_time=yesterday)
+
+        bucket = StaffActivityDay.objects.get(staff=host)
+        assert (bucket.day, bucket.calls_hosted, bucket.hosted_call_participants) == (timezone.localdate(yesterday), 1, 1)
+        assert StaffActivityDay.objects.get(staff=guest).calls_joined == 1
+        host.refresh_from_db()
+        expected = ActivityKPICalculator([host]).calculate_all_kpis()[host.pk]
+        assert float(host.overall_performance_score) == pytest.approx(expected['overall_performance_score'], abs=0.005)
+        assert PerformanceMetric.objects.filter(staff=host).count() == 6
+
+    def test_moved_and_deleted_activity_updates_buckets(self, eager_celery, django_capture_on_commit_callbacks):
+        host, = make_staff(1)
+        with django_capture_on_commit_callbacks(execute=True):
+            call = VideoCallSession.objects.create(
+                title='Weekly', call_type='team_meeting', host=host, scheduled_time=timezone.now() - timedelta(days=3)
+            )
+        with django_capture_on_commit_callbacks(execute=True):
+            call.scheduled_time = timezone.now() - timedelta(days=1)
+            call.save()
+        assert list(StaffActivityDay.objects.values_list('day', 'calls_hosted')) == [
+            (timezone.localdate(call.scheduled_time), 1)
+        ]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call.delete()
+        assert not StaffActivityDay.objects.exists()
+
+    def test_rebuild_command(self, kpi_activity):
+        call_command('rebuild_activity_days', stdout=None)
+        recent = StaffActivityDay.objects.filter(staff=kpi_activity[0])
+        assert recent.count() == 3
+        call_command('rebuild_activity_days', '--all', stdout=None)
+        assert StaffActivityDay.objects.filter(staff=kpi_activity[0]).count() == 4
+
+
+# =====================================================
+# ACTIVITY LEDGER TESTS
+# =====================================================
+@pytest.fixture
+def empty_ledger_buffer():
+    """Forget pairs buffered or stored by earlier tests, whose user ids may be reused"""
+    ledger.flush_active_days(force=True)
+    ledger._stored.clear()
+
+
+@pytest.mark.django_db
+class TestActivityLedger:
+    def test_requests_are_buffered_then_written_in_one_insert(self, client, empty_ledger_buffer, monkeypatch):
+        user = User.objects.create_user(username='officer', role='field_officer')
+        other = User.objects.create_user(username='manager', role='project_manager')
+        monkeypatch.setattr(ledger, '_last_flush', ledger.time.monotonic())
+        for member in (user, other, user):
+            client.force_login(member)
+            client.get('/no-such-page/')
+        assert not UserActiveDay.objects.exists()
+
+        monkeypatch.setattr(ledger, 'ACTIVE_DAY_FLUSH_INTERVAL', 0)
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/no-such-page/')
+        inserts = [q for q in queries if q['sql'].startswith('INSERT') and 'staff_performance_active_day' in q['sql']]
+        assert len(inserts) == 1
+        today = timezone.localdate()
+        assert set(UserActiveDay.objects.values_list('user', 'day')) == {(user.pk, today), (other.pk, today)}
+
+        # A pair already stored is not buffered again
+        client.get('/no-such-page/')
+        assert not ledger._pending_users
+
+    def test_anonymous_requests_are_not_recorded(self, client, empty_ledger_buffer):
+        client.get('/no-such-page/')
+        assert not ledger._pending_users
+
+    def test_signals_record_staff_activity_days(self, eager_celery, empty_ledger_buffer,
+                                                django_capture_on_commit_callbacks):
+        host, guest = make_staff(2)
+        joined = timezone.now() - timedelta(days=2)
+        with django_capture_on_commit_callbacks(execute=True):
+            call = VideoCallSession.objects.create(
+                title='Weekly', call_type='team_meeting', host=host, scheduled_time=joined + timedelta(days=5)
+            )
+            CallParticipant.objects.create(session=call, staff_member=guest, join_time=joined)
+        # The participant joining also starts the call, making it the host's activity today
+        assert set(UserActiveDay.objects.values_list('user', 'day')) == {
+            (guest.user_id, timezone.localdate(joined)), (host.user_id, timezone.localdate())
+        }
+
+    def test_active_days_count_towards_app_usage(self, db):
+        member, = make_staff(1)
+        today = timezone.localdate()
+        UserActiveDay.objects.bulk_create([
+            UserActiveDay(user=member.user, day=today - timedelta(days=n)) for n in range(15)
+        ] + [UserActiveDay(user=member.user, day=today - timedelta(days=60))])
+
+        assert PerformanceKPICalculator(member).calculate_app_usage_score() == 25.0
+        assert BatchKPICalculator([member]).calculate_all_kpis()[member.pk]['app_usage_score'] == 25.0
+        assert ActivityKPICalculator([member]).calculate_all_kpis()[member.pk]['app_usage_score'] == 25.0
@@ -0,0 +1,140 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.core.management import call_command
+from django.utils import timezone
+from core.models import RollupState
+from core.rollups import ROLLUP_MAX_AGE, ROLLUPS, refresh_rollup, refresh_rollups, rollup_is_fresh
+from farmer_engagement.models import CBOGroup, CBOMeeting, DailyAttendanceRollup
+from farmers.models import Location
+from finances.models import Budget, DailyExpenseRollup, Expense
+from projects.models import Project
+from sales.models import Customer, DailySalesRollup, Sale
+
+
+def make_sale(customer, amount, days_ago=0, **kwargs):
+    sale = Sale.objects.create(customer=customer, **kwargs)
+    # save() recomputes the amounts from the (empty) item list
+    Sale.objects.filter(pk=sale.pk).update(
+        final_amount=amount, sale_date=timezone.now() - timedelta(days=days_ago)
+    )
+    return sale
+
+
+@pytest.fixture
+def sales(db):
+    location = Location.objects.create(name='Kaduna North', district='Kaduna', region='North West')
+    customer = Customer.objects.create(name='Amina Bello', phone_number='08030000001', gender='female', age_range='26-35')
+    make_sale(customer, 100, status='paid', sale_location=location)
+    make_sale(customer, 300, status='paid', sale_location=location)
+    make_sale(customer, 50, status='paid', sales_channel='field')
+    make_sale(customer, 1000, days_ago=45, status='paid', sale_location=location)
+    make_sale(customer, 999, status='draft')
+    return location
+
+
+# =====================================================
+# ROLLUP MAINTENANCE TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestRollupRefresh:
+    def test_sales_grouped_by_day_location_and_channel(self, sales):
+        assert refresh_rollup(ROLLUPS['sales']) == 3
+        today = DailySalesRollup.objects.get(day=timezone.localdate(), location=sales, channel='store')
+        assert today.sales_count == 2
+        assert today.revenue == Decimal('400')
+        field = DailySalesRollup.objects.get(channel='field')
+        assert field.location is None
+        assert field.revenue == Decimal('50')
+
+    def test_incremental_refresh_only_rebuilds_changed_days(self, sales):
+        refresh_rollup(ROLLUPS['sales'])
+        old = DailySalesRollup.objects.get(day=timezone.localdate() - timedelta(days=45))
+        Sale.objects.filter(status='draft').update(status='paid', updated_at=timezone.now())
+
+        refresh_rollup(ROLLUPS['sales'])
+        promoted = DailySalesRollup.objects.get(day=timezone.localdate(), channel='store', location=None)
+        assert promoted.revenue == Decimal('999')
+        # Untouched days keep their row
+        assert DailySalesRollup.objects.filter(pk=old.pk).exists()
+
+    def test_status_change_removes_sale_from_rollup(self, sales):
+        refresh_rollup(ROLLUPS['sales'])
+        Sale.objects.filter(sales_channel='field').update(status='cancelled', updated_at=timezone.now())
+        refresh_rollup(ROLLUPS['sales'])
+        assert not DailySalesRollup.objects.filter(channel='field').exists()
+
+    def test_deletion_forces_full_rebuild(self, sales):
+        refresh_rollup(ROLLUPS['sales'])
+        Sale.objects.get(final_amount=1000).delete()
+        refresh_rollup(ROLLUPS['sales'])
+        assert not DailySalesRollup.objects.filter(day=timezone.localdate() - timedelta(days=45)).exists()
+
+    def test_expense_and_attendance_rollups(self, db, field_officer):
+        project = Project.objects.create(name='Irrigation', code='IR001', budget=5000)
+        budget = Budget.objects.create(
+            project=project, name='Pumps', allocated_amount=5000,
+            start_date='2025-01-01', end_date='2025-12-31'
+        )
+        for amount, category in ((100, 'equipment'), (200, 'equipment'), (50, 'transport')):
+            Expense.objects.create(project=project, budget=budget, description='Pump', amount=amount,
+                                   date='2025-02-01', category=category)
+        group = CBOGroup.objects.create(
+            name='Unity Farmers', group_type='farmer_group', village='Kawo', parish='Kawo',
+            sub_county='Kaduna North', district='Kaduna', formation_date='2024-01-01'
+        )
+        meeting_date = datetime(2025, 3, 1, 10, tzinfo=dt_timezone.utc)
+        CBOMeeting.objects.bulk_create([
+            CBOMeeting(cbo_group=group, title='Planning', agenda='Season', meeting_date=meeting_date,
+                       venue='Hall', facilitator=field_officer.staff_profile,
+                       expected_attendance=20, actual_attendance=attended)
+            for attended in (15, 10)
+        ])
+
+        call_command('refresh_rollups', 'expenses', 'attendance')
+        equipment = DailyExpenseRollup.objects.get(category='equipment')
+        assert (equipment.day, equipment.expenses_count, equipment.expenses_total) == (date(2025, 2, 1), 2, Decimal('300'))
+        attendance = DailyAttendanceRollup.objects.get()
+        assert (attendance.meetings_count, attendance.expected_attendance, attendance.actual_attendance) == (2, 40, 25)
+        assert not RollupState.objects.filter(name='sales').exists()
+
+        # A deleted meeting leaves a tombstone, so the next incremental refresh drops it
+        CBOMeeting.objects.filter(actual_attendance=10).delete()
+        call_command('refresh_rollups', 'attendance')
+        assert DailyAttendanceRollup.objects.get().meetings_count == 1
+
+
+# =====================================================
+# ROLLUP READER TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestRollupReaders:
+    def test_sales_metrics_match_source_table(self, sales):
+        from_source = Sale.get_sales_metrics()
+        refresh_rollups(['sales'])
+        assert rollup_is_fresh('sales')
+        assert Sale.get_sales_metrics() == from_source
+        assert from_source['total_sales'] == 4
+        assert from_source['recent_sales_count'] == 3
+        assert from_source['recent_revenue'] == Decimal('450')
+
+    def test_stale_rollup_falls_back_to_source(self, sales):
+        refresh_rollups(['sales'])
+        RollupState.objects.filter(name='sales').update(refreshed_at=timezone.now() - ROLLUP_MAX_AGE * 2)
+        make_sale(Customer.objects.get(), 10, status='paid')
+        assert not rollup_is_fresh('sales')
+        assert Sale.get_sales_metrics()['total_sales'] == 5
+
+    def test_monthly_spending_from_rollup(self, db):
+        project = Project.objects.create(name='Irrigation', code='IR001', budget=5000)
+        budget = Budget.objects.create(
+            project=project, name='Pumps', allocated_amount=5000,
+            start_date='2025-01-01', end_date='2025-12-31'
+        )
+        for day, status in (('2025-02-01', 'paid'), ('2025-02-20', 'approved'), ('2025-02-21', 'rejected'),
+                            ('2025-03-05', 'submitted')):
+            Expense.objects.create(project=project, budget=budget, description='Pump', amount=100, date=day, status=status)
+        from_source = Expense.get_monthly_spending(date(2025, 2, 1))
+        refresh_rollups(['expenses'])
+        assert Expense.get_monthly_spending(date(2025, 2, 1)) == from_source
+        assert [row['total'] for row in from_source] == [Decimal('200'), Decimal('100')]
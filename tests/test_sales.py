@@ -0,0 +1,476 @@
+import threading
+import pytest
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import NumberSequence
+from core.sequences import allocate_numbers, document_numbers
+from sales.inventory import create_sale_items, record_movements, stock_drift
+from sales.customers import recompute_customer_metrics
+from sales.totals import recompute_sale_totals
+from sales.models import (
+    Customer, Product, ProductCategory, Purchase, PurchaseItem, Sale, SaleBatch, SaleItem, StockMovement
+)
+
+
+@pytest.fixture
+def customer(db):
+    return Customer.objects.create(name='Amina Bello', phone_number='08030000001', gender='female', age_range='26-35')
+
+
+@pytest.fixture
+def products(db):
+    category = ProductCategory.objects.create(name='Seeds')
+    products = [
+        Product.objects.create(
+            name=name, product_category=category, unit_measure='bag', cost_price=10, selling_price=15, sku=name.upper()
+        )
+        for name in ('Maize', 'Sorghum')
+    ]
+    record_movements([StockMovement(product=product, quantity=100, reason='opening') for product in products])
+    return products
+
+
+def stock(product):
+    return Product.objects.values_list('current_stock', flat=True).get(pk=product.pk)
+
+
+def today():
+    return timezone.now().strftime('%Y%m%d')
+
+
+# =====================================================
+# DOCUMENT NUMBER ALLOCATION TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestDocumentNumbers:
+    def test_sale_and_purchase_numbers_are_sequential_per_prefix(self, customer):
+        sales = [Sale.objects.create(customer=customer) for _ in range(3)]
+        purchase = Purchase.objects.create(customer=customer)
+        assert [sale.sale_number for sale in sales] == [f'SALE-{today()}-{n:04d}' for n in (1, 2, 3)]
+        assert purchase.purchase_number == f'PUR-{today()}-0001'
+
+    def test_new_sequence_continues_after_existing_numbers(self, customer):
+        Sale.objects.create(customer=customer, sale_number=f'SALE-{today()}-0041')
+        assert Sale.objects.create(customer=customer).sale_number == f'SALE-{today()}-0042'
+
+    def test_allocation_is_one_update_once_the_sequence_exists(self, customer, django_assert_num_queries):
+        allocate_numbers('TEST')
+        # Savepoint, UPDATE, read back, release
+        with django_assert_num_queries(4):
+            assert allocate_numbers('TEST') == 2
+
+    def test_block_reservation(self, customer):
+        Sale.objects.create(customer=customer)
+        block = document_numbers(Sale, 'sale_number', 'SALE', count=5)
+        assert block == [f'SALE-{today()}-{n:04d}' for n in range(2, 7)]
+        assert Sale.objects.create(customer=customer).sale_number == f'SALE-{today()}-0007'
+        assert NumberSequence.objects.get(key=f'SALE-{today()}').last_value == 7
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_writers_get_distinct_numbers(customer):
+    writers, per_writer = 6, 10
+    numbers, collisions = [], []
+    start = threading.Barrier(writers)
+
+    def write():
+        start.wait()
+        try:
+            for _ in range(per_writer):
+                while True:
+                    try:
+                        sale = Sale.objects.create(customer=customer)
+                    except OperationalError:
+                        # The shared-cache SQLite test database reports a held lock instead of waiting on it
+                        continue
+                    except IntegrityError as error:
+                        collisions.append(error)
+                    else:
+                        numbers.append(sale.sale_number)
+                    break
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=write) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert collisions == []
+    # A retried write may leave a gap, never a duplicate
+    assert len(set(numbers)) == len(numbers) == writers * per_writer
+
+
+# =====================================================
+# STOCK LEDGER TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestStockLedger:
+    def test_sale_item_takes_stock_through_the_ledger(self, customer, products):
+        maize = products[0]
+        item = SaleItem.objects.create(sale=Sale.objects.create(customer=customer), product=maize, quantity=3, unit_price=15)
+        assert stock(maize) == 97
+        movement = StockMovement.objects.get(sale_item=item)
+        assert (movement.product_id, movement.quantity, movement.reason) == (maize.pk, -3, 'sale')
+
+    def test_stale_product_copies_do_not_lose_updates(self, customer, products):
+        sale = Sale.objects.create(customer=customer)
+        first, second = Product.objects.get(pk=products[0].pk), Product.objects.get(pk=products[0].pk)
+        SaleItem.objects.create(sale=sale, product=first, quantity=3, unit_price=15)
+        SaleItem.objects.create(sale=sale, product=second, quantity=2, unit_price=15)
+        assert stock(products[0]) == 95
+
+    def test_received_purchase_items_add_stock(self, customer, products):
+        maize = products[0]
+        for status in ('received', 'ordered'):
+            PurchaseItem.objects.create(
+                purchase=Purchase.objects.create(customer=customer, status=status), product_category=maize.product_category,
+                product_name='Maize', unit_measure='bag', quantity=20, unit_price=10
+            )
+        assert stock(maize) == 120
+        assert StockMovement.objects.filter(reason='purchase').count() == 1
+
+    def test_purchase_item_edits_status_changes_and_deletes_move_stock(self, customer, products):
+        maize, sorghum = products
+        purchase = Purchase.objects.create(customer=customer)
+        item = PurchaseItem.objects.create(purchase=purchase, product_category=maize.product_category,
+                                           product_name='Maize', unit_measure='bag', quantity=20, unit_price=10)
+        assert stock(maize) == 100
+
+        purchase.status = 'received'
+        purchase.save()
+        assert stock(maize) == 120
+
+        item.quantity = 25
+        item.save()
+        assert stock(maize) == 125
+
+        item.product_name = 'Sorghum'
+        item.save()
+        assert (stock(maize), stock(sorghum)) == (100, 125)
+
+        purchase.status = 'cancelled'
+        purchase.save()
+        assert stock(sorghum) == 100
+
+        purchase.status = 'received'
+        purchase.save()
+        item.delete()
+        assert stock(sorghum) == 100
+        assert not stock_drift().exists()
+
+    def test_deleting_a_received_purchase_returns_its_stock(self, customer, products):
+        maize = products[0]
+        purchase = Purchase.objects.create(customer=customer, status='received')
+        PurchaseItem.objects.create(purchase=purchase, product_category=maize.product_category,
+                                    product_name='Maize', unit_measure='bag', quantity=20, unit_price=10)
+        # Items need not belong to a purchase, and then hold no stock
+        PurchaseItem.objects.create(product_category=maize.product_category, product_name='Maize',
+                                    unit_measure='bag', quantity=5, unit_price=10)
+        assert stock(maize) == 120
+
+        purchase.delete()
+        assert stock(maize) == 100
+        assert not stock_drift().exists()
+
+    def test_deleting_a_product_archives_its_ledger(self, customer, products):
+        maize = products[0]
+        maize.current_stock = 80
+        maize.save()
+        maize.delete()
+
+        movements = StockMovement.objects.filter(archived_product='MAIZE Maize')
+        assert list(movements.values_list('product', 'reason', 'quantity').order_by('created_at')) == [
+            (None, 'opening', 100), (None, 'adjustment', -20)
+        ]
+
+    def test_bulk_sale_items_update_each_product_once(self, customer, products):
+        maize, sorghum = products
+        sale = Sale.objects.create(customer=customer)
+        lines = [SaleItem(product=maize, quantity=1, unit_price=15), SaleItem(product=maize, quantity=2, unit_price=15),
+                 SaleItem(product=sorghum, quantity=5, unit_price=15)]
+        with CaptureQueriesContext(connection) as queries:
+            create_sale_items(sale, lines)
+        updates = [q for q in queries if q['sql'].startswith('UPDATE "sales_product"')]
+        assert len(updates) == 2
+        assert (stock(maize), stock(sorghum)) == (97, 95)
+        assert sale.items.count() == 3
+
+    def test_stock_set_on_the_product_is_recorded(self, customer, products):
+        category = products[0].product_category
+        millet = Product.objects.create(
+            name='Millet', product_category=category, unit_measure='bag', cost_price=10, selling_price=15,
+            sku='MILLET', current_stock=25
+        )
+        assert not stock_drift().exists()
+
+        millet.current_stock = 30
+        millet.save()
+        assert list(StockMovement.objects.filter(product=millet).values_list('reason', 'quantity')) == [
+            ('opening', 25), ('adjustment', 5)
+        ]
+        # A copy loaded before a sale does not put the sold stock back when saved
+        stale = Product.objects.get(pk=millet.pk)
+        SaleItem.objects.create(sale=Sale.objects.create(customer=customer), product=millet, quantity=4, unit_price=15)
+        stale.selling_price = 16
+        stale.save()
+        assert stock(millet) == 26
+        assert not stock_drift().exists()
+
+    def test_sale_item_edits_and_deletes_move_stock(self, customer, products):
+        maize, sorghum = products
+        sale = Sale.objects.create(customer=customer)
+        item = SaleItem.objects.create(sale=sale, product=maize, quantity=3, unit_price=15)
+        item.quantity = 5
+        item.save()
+        assert stock(maize) == 95
+
+        item.product = sorghum
+        item.save()
+        assert (stock(maize), stock(sorghum)) == (100, 95)
+
+        item.delete()
+        assert stock(sorghum) == 100
+        SaleItem.objects.create(sale=sale, product=maize, quantity=2, unit_price=15)
+        sale.delete()
+        assert (stock(maize), stock(sorghum)) == (100, 100)
+        assert not stock_drift().exists()
+
+    def test_reconcile_command_rebuilds_stock_from_ledger(self, customer, products):
+        maize, sorghum = products
+        SaleItem.objects.create(sale=Sale.objects.create(customer=customer), product=maize, quantity=4, unit_price=15)
+        Product.objects.filter(pk=maize.pk).update(current_stock=Decimal('500'))
+
+        assert [product.ledger_stock for product in stock_drift()] == [96]
+        call_command('reconcile_stock', '--check', stdout=None)
+        assert stock(maize) == 500
+
+        call_command('reconcile_stock', stdout=None)
+        assert (stock(maize), stock(sorghum)) == (96, 100)
+        assert not stock_drift().exists()
+
+
+# =====================================================
+# SALE AND PURCHASE TOTALS TESTS
+# =====================================================
+@pytest.mark.django_db
+class TestTotals:
+    def test_item_changes_maintain_sale_totals(self, customer, products):
+        maize, sorghum = products
+        sale = Sale.objects.create(customer=customer, tax_amount=5)
+        first = SaleItem.objects.create(sale=sale, product=maize, quantity=2, unit_price=15)
+        second = SaleItem.objects.create(sale=sale, product=sorghum, quantity=1, unit_price=20)
+        sale.refresh_from_db()
+        assert (sale.total_amount, sale.final_amount) == (50, 55)
+
+        first.quantity = 3
+        first.save()
+        second.delete()
+        sale.refresh_from_db()
+        assert (sale.total_amount, sale.final_amount) == (45, 50)
+
+    def test_sale_save_totals_items_in_one_query(self, customer, products, django_assert_num_queries):
+        sale = Sale.objects.create(customer=customer)
+        for product in products:
+            SaleItem.objects.create(sale=sale, product=product, quantity=2, unit_price=15)
+        sale.discount_amount = 10
+        # Items aggregate, previous paid state, and the UPDATE inside a savepoint
+        with django_assert_num_queries(5):
+            sale.save()
+        assert (sale.total_amount, sale.final_amount) == (60, 50)
+
+    def test_purchase_total_follows_items(self, customer, products):
+        purchase = Purchase.objects.create(customer=customer)
+        item = PurchaseItem.objects.create(
+            purchase=purchase, product_category=products[0].product_category, product_name='Maize',
+            unit_measure='bag', quantity=4, unit_price=10
+        )
+        purchase.refresh_from_db()
+        assert purchase.total_amount == 40
+        item.delete()
+        purchase.refresh_from_db()
+        assert purchase.total_amount == 0
+
+    def test_bulk_recompute_is_one_update(self, customer, products):
+        sales = [Sale.objects.create(customer=customer, discount_amount=1) for _ in range(3)]
+        create_sale_items(sales[0], [SaleItem(product=products[0], quantity=1, unit_price=15)])
+        for sale in sales[1:]:
+            SaleItem.objects.create(sale=sale, product=products[1], quantity=2, unit_price=10)
+        Sale.objects.update(total_amount=0, final_amount=0)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert recompute_sale_totals([sale.pk for sale in sales]) == 3
+        assert len(queries) == 1
+        assert sorted(Sale.objects.values_list('total_amount', 'final_amount')) == [(15, 14), (20, 19), (20, 19)]
+        call_command('recompute_totals', stdout=None)
+        assert sorted(Sale.objects.values_list('final_amount', flat=True)) == [14, 19, 19]
+
+
+# =====================================================
+# CUSTOMER METRICS TESTS
+# =====================================================
+def sale_of(customer, product, amount, status='draft'):
+    sale = Sale.objects.create(customer=customer)
+    SaleItem.objects.create(sale=sale, product=product, quantity=1, unit_price=amount)
+    sale.refresh_from_db()
+    if status != 'draft':
+        sale.status = status
+        sale.save()
+    return sale
+
+
+def metrics(customer):
+    return Customer.objects.values_list('total_purchases', 'paid_sales_count', 'average_order_value').get(pk=customer.pk)
+
+
+@pytest.mark.django_db
+class TestCustomerMetrics:
+    def test_status_transitions_move_running_totals(self, customer, products):
+        first = sale_of(customer, products[0], 50, 'paid')
+        assert metrics(customer) == (50, 1, 50)
+        sale_of(customer, products[0], 30, 'paid')
+        assert metrics(customer) == (80, 2, 40)
+
+        first.status = 'cancelled'
+        first.save()
+        assert metrics(customer) == (30, 1, 30)
+        first.status = 'paid'
+        first.save()
+        assert metrics(customer) == (80, 2, 40)
+
+        first.delete()
+        assert metrics(customer) == (30, 1, 30)
+
+    def test_item_changes_on_a_paid_sale_move_running_totals(self, customer, products):
+        sale = sale_of(customer, products[0], 50, 'paid')
+        item = SaleItem.objects.create(sale=sale, product=products[1], quantity=1, unit_price=20)
+        assert metrics(customer) == (70, 1, 70)
+        item.quantity = 2
+        item.save()
+        assert metrics(customer) == (90, 1, 90)
+        item.delete()
+        assert metrics(customer) == (50, 1, 50)
+        assert recompute_customer_metrics() == 0
+
+        Sale.objects.filter(pk=sale.pk).delete()
+        assert metrics(customer) == (0, 0, 0)
+
+    def test_checkout_cost_does_not_grow_with_history(self, customer, products):
+        def checkout_queries():
+            sale = sale_of(customer, products[0], 10)
+            sale.status = 'paid'
+            with CaptureQueriesContext(connection) as queries:
+                sale.save()
+            return len(queries)
+
+        short = checkout_queries()
+        for _ in range(10):
+            sale_of(customer, products[0], 10, 'paid')
+        assert checkout_queries() == short
+        assert metrics(customer) == (120, 12, 10)
+
+    def test_recompute_command_corrects_drift(self, customer, products):
+        sale_of(customer, products[0], 20, 'paid')
+        sale_of(customer, products[0], 40, 'paid')
+        sale_of(customer, products[0], 99)
+        Customer.objects.update(total_purchases=1, paid_sales_count=7, average_order_value=3)
+
+        call_command('recompute_customer_metrics', stdout=None)
+        assert metrics(customer) == (60, 2, 30)
+        assert recompute_customer_metrics() == 0
+
+
+# =====================================================
+# BULK INGESTION TESTS
+# =====================================================
+@pytest.fixture
+def agent_client(field_officer):
+    client = APIClient()
+    client.force_authenticate(field_officer)
+    return client
+
+
+def offline_sales(customer, products, count):
+    return [
+        {
+            'customer': str(customer.pk),
+            'payment_method': 'mobile_money',
+            'status': 'paid' if i % 2 else 'confirmed',
+            'items': [
+                {'product': str(products[0].pk), 'quantity': '2', 'unit_price': '15.00'},
+                {'product': str(products[1].pk), 'quantity': '1', 'unit_price': '20.00'},
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestBulkIngestion:
+    def post(self, client, batch_key, sales):
+        return client.post(reverse('salebatch-list'), {'batch_key': batch_key, 'sales': sales}, format='json')
+
+    def test_batch_creates_sales_stock_and_customer_totals(self, agent_client, customer, products):
+        response = self.post(agent_client, 'agent-1-0001', offline_sales(customer, products, 4))
+        assert response.status_code == 201
+        assert response.data['created'] is True
+        assert response.data['sales_count'] == 4
+        assert response.data['sale_numbers'] == [f'SALE-{today()}-{n:04d}' for n in range(1, 5)]
+
+        sales = Sale.objects.filter(batch__batch_key='agent-1-0001')
+        assert sales.count() == 4
+        assert set(sales.values_list('final_amount', flat=True)) == {Decimal('50')}
+        assert set(sales.values_list('sales_channel', flat=True)) == {'field'}
+        assert SaleItem.objects.filter(sale__in=sales).count() == 8
+        assert (stock(products[0]), stock(products[1])) == (92, 96)
+        assert not stock_drift().exists()
+        assert metrics(customer) == (100, 2, 50)
+
+    def test_resubmitted_batch_is_a_no_op(self, agent_client, customer, products):
+        first = self.post(agent_client, 'agent-1-0002', offline_sales(customer, products, 3))
+        replay = self.post(agent_client, 'agent-1-0002', offline_sales(customer, products, 3))
+        assert replay.status_code == 200
+        assert replay.data['created'] is False
+        assert replay.data['sale_numbers'] == first.data['sale_numbers']
+        assert Sale.objects.count() == 3
+        assert SaleBatch.objects.count() == 1
+        assert stock(products[0]) == 94
+        assert metrics(customer) == (50, 1, 50)
+
+    def test_unknown_references_reject_the_whole_batch(self, agent_client, customer, products):
+        sales = offline_sales(customer, products, 2)
+        sales[1]['items'][0]['product'] = '00000000-0000-0000-0000-000000000000'
+        response = self.post(agent_client, 'agent-1-0003', sales)
+        assert response.status_code == 400
+        assert 'product' in response.data
+        assert not Sale.objects.exists()
+        assert not SaleBatch.objects.exists()
+
+    def test_offline_sale_keeps_its_sale_date(self, agent_client, customer, products):
+        sales = offline_sales(customer, products, 2)
+        sales[0]['sale_date'] = '2025-03-01T09:30:00Z'
+        assert self.post(agent_client, 'agent-1-0007', sales).status_code == 201
+        dates = sorted(Sale.objects.values_list('sale_date', flat=True))
+        assert dates[0].isoformat() == '2025-03-01T09:30:00+00:00'
+        assert dates[1].date() == timezone.now().date()
+
+    def test_body_that_is_not_an_object_is_rejected(self, agent_client):
+        response = agent_client.post(reverse('salebatch-list'), [{'batch_key': 'agent-1-0008'}], format='json')
+        assert response.status_code == 400
+        assert not SaleBatch.objects.exists()
+
+    def test_query_count_does_not_grow_with_batch_size(self, agent_client, customer, products):
+        def ingest_queries(batch_key, count):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(agent_client, batch_key, offline_sales(customer, products, count))
+            assert response.status_code == 201
+            return len(queries)
+
+        ingest_queries('agent-1-0004', 1)  # creates the day's number sequence
+        assert ingest_queries('agent-1-0005', 2) == ingest_queries('agent-1-0006', 40)
@@ -39,4 +39,22 @@ class User(AbstractUser):
     # *********************************************
 
     def __str__(self):
-        return f"{self.username} ({self.get_role_display()})"
\ No newline at end of file
+        return f"{self.username} ({self.get_role_display()})"
+
+    # Role checks, matching the roles allowed by core.decorators
+    @property
+    def can_manage_projects(self):
+        return self.role in ('system_admin', 'project_manager')
+
+    @property
+    def can_manage_finances(self):
+        return self.role in ('system_admin', 'finance_officer')
+
+    @property
+    def can_approve_budgets(self):
+        # Spending is approved by the project side, not by whoever records it
+        return self.role in ('system_admin', 'project_manager')
+
+    @property
+    def can_view_reports(self):
+        return True
\ No newline at end of file